@@ -1027,6 +1027,9 @@ class MacroSettingsWidget(QtWidgets.QWidget):
         """Creates the UI elements"""
         # Create UI elements
         self.exclusive_checkbox = QtWidgets.QCheckBox("Exclusive")
+        self.batch_inputs_checkbox = QtWidgets.QCheckBox(
+            "Send consecutive inputs together"
+        )
         self.repeat_dropdown = QtWidgets.QComboBox()
         self.repeat_dropdown.addItems(["None", "Count", "Toggle", "Hold"])
         self.repeat_widget = None
@@ -1040,6 +1043,7 @@ class MacroSettingsWidget(QtWidgets.QWidget):
 
         # Populate UI elements
         self.exclusive_checkbox.setChecked(self.action_data.exclusive)
+        self.batch_inputs_checkbox.setChecked(self.action_data.batch_inputs)
         if self.action_data.repeat is not None:
             mode_name = MacroSettingsWidget.storage_to_name[
                 type(self.action_data.repeat)
@@ -1051,10 +1055,12 @@ class MacroSettingsWidget(QtWidgets.QWidget):
 
         # Connect signals
         self.exclusive_checkbox.clicked.connect(self._update_settings)
+        self.batch_inputs_checkbox.clicked.connect(self._update_settings)
         self.repeat_dropdown.currentTextChanged.connect(self._update_settings)
 
         # Place UI elements
         self.group_layout.addWidget(self.exclusive_checkbox)
+        self.group_layout.addWidget(self.batch_inputs_checkbox)
         self.group_layout.addWidget(self.repeat_dropdown)
         if self.repeat_widget is not None:
             self.group_layout.addWidget(self.repeat_widget)
@@ -1065,6 +1071,7 @@ class MacroSettingsWidget(QtWidgets.QWidget):
         :param value the value of a change (ignored)
         """
         self.action_data.exclusive = self.exclusive_checkbox.isChecked()
+        self.action_data.batch_inputs = self.batch_inputs_checkbox.isChecked()
 
         # Only create a new repeat widget if it changed
         widget_type = MacroSettingsWidget.name_to_widget.get(
@@ -1483,6 +1490,7 @@ class MacroFunctor(AbstractFunctor):
         for seq in action.sequence:
             self.macro.add_action(seq)
         self.macro.exclusive = action.exclusive
+        self.macro.batch_inputs = action.batch_inputs
         self.macro.repeat = action.repeat
 
     def process_event(self, event, value):
@@ -1521,6 +1529,7 @@ class Macro(AbstractAction):
         super().__init__(parent)
         self.sequence = []
         self.exclusive = False
+        self.batch_inputs = False
         self.repeat = None
 
     def icon(self):
@@ -1540,12 +1549,15 @@ class Macro(AbstractAction):
         # Reset storage
         self.sequence = []
         self.exclusive = False
+        self.batch_inputs = False
         self.repeat = None
 
         # Read properties
         for child in node.find("properties"):
             if child.tag == "exclusive":
                 self.exclusive = True
+            elif child.tag == "batch-inputs":
+                self.batch_inputs = True
             elif child.tag == "repeat":
                 repeat_type = child.get("type")
                 if repeat_type == "count":
@@ -1623,6 +1635,9 @@ class Macro(AbstractAction):
         if self.exclusive:
             prop_node = ElementTree.Element("exclusive")
             properties.append(prop_node)
+        if self.batch_inputs:
+            prop_node = ElementTree.Element("batch-inputs")
+            properties.append(prop_node)
         if self.repeat:
             properties.append(self.repeat.to_xml())
         node.append(properties)
@@ -45,6 +45,8 @@ class NoOpActionFunctor(AbstractFunctor):
 
     """Functor, executing the NoOp action."""
 
+    thread_safe = True
+
     def __init__(self, action):
         super().__init__(action)
 
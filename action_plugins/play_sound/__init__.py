@@ -22,6 +22,7 @@ from xml.etree import ElementTree
 
 from gremlin.base_classes import AbstractAction, AbstractFunctor
 from gremlin.common import InputType
+import gremlin.event_handler
 import gremlin.ui.input_item
 
 
@@ -81,13 +82,18 @@ class PlaySoundFunctor(AbstractFunctor):
         self.volume = action.volume
 
     def process_event(self, event, value):
+        # The media player belongs to the GUI thread while callbacks may run
+        # on a dispatch thread
+        gremlin.event_handler.EventHandler().run_in_gui_thread(self._play)
+        return True
+
+    def _play(self):
         PlaySoundFunctor.player.setMedia(
             QtMultimedia.QMediaContent(
                 QtCore.QUrl.fromLocalFile(self.sound_file)
             ))
         PlaySoundFunctor.player.setVolume(self.volume)
         PlaySoundFunctor.player.play()
-        return True
 
 
 class PlaySound(AbstractAction):
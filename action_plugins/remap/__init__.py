@@ -212,6 +212,9 @@ class RemapFunctor(gremlin.base_classes.AbstractFunctor):
         self.axis_scaling = action.axis_scaling
 
         self.needs_auto_release = self._check_for_auto_release(action)
+        # Auto release registers with the shared ButtonReleaseActions
+        self.thread_safe = self.input_type != InputType.JoystickButton or \
+            not self.needs_auto_release
         self.thread_running = False
         self.should_stop_thread = False
         self.thread_last_update = time.time()
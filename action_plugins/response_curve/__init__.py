@@ -781,8 +781,10 @@ class CurveView(QtWidgets.QGraphicsScene):
             path = QtGui.QPainterPath(
                 QtCore.QPointF(-g_scene_size, -g_scene_size*curve_fn(-1))
             )
-            for x in range(-int(g_scene_size), int(g_scene_size+1), 2):
-                path.lineTo(x, -g_scene_size * curve_fn(x / g_scene_size))
+            xs = list(range(-int(g_scene_size), int(g_scene_size+1), 2))
+            ys = curve_fn.evaluate([x / g_scene_size for x in xs])
+            for x, y in zip(xs, ys):
+                path.lineTo(x, -g_scene_size * y)
             self.addPath(path, QtGui.QPen(QtGui.QColor(0, 200, 0)))
 
         # Update editor widget fields
@@ -1226,6 +1228,9 @@ class ResponseCurveWidget(gremlin.ui.input_item.AbstractActionWidget):
 
 class ResponseCurveFunctor(AbstractFunctor):
 
+    # Only transforms the value of the event
+    thread_safe = True
+
     def __init__(self, action):
         super().__init__(action)
         self.deadzone_fn = lambda value: gremlin.input_devices.deadzone(
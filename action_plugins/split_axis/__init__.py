@@ -165,6 +165,9 @@ class SplitAxisWidget(gremlin.ui.input_item.AbstractActionWidget):
 
 class SplitAxisFunctor(AbstractFunctor):
 
+    # Only writes vJoy axes
+    thread_safe = True
+
     def __init__(self, action):
         super().__init__(action)
         self.action = action
@@ -16,12 +16,14 @@
 # along with this program.  If not, see <http://www.gnu.org/licenses/>.
 
 
+import functools
 import os
 from PyQt5 import QtWidgets
 from xml.etree import ElementTree
 
 from gremlin.base_classes import AbstractAction, AbstractFunctor
 from gremlin.common import InputType
+import gremlin.event_handler
 import gremlin.ui.input_item
 
 
@@ -54,7 +56,14 @@ class TextToSpeechFunctor(AbstractFunctor):
         self.text = action.text
 
     def process_event(self, event, value):
-        TextToSpeechFunctor.tts.speak(gremlin.tts.text_substitution(self.text))
+        # The speech COM object belongs to the GUI thread while callbacks
+        # may run on a dispatch thread
+        gremlin.event_handler.EventHandler().run_in_gui_thread(
+            functools.partial(
+                TextToSpeechFunctor.tts.speak,
+                gremlin.tts.text_substitution(self.text)
+            )
+        )
         return True
 
 
@@ -0,0 +1,305 @@
+# -*- coding: utf-8; -*-
+
+# Copyright (C) 2015 - 2019 Lionel Ott
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+
+"""Replaces the device facing parts of Gremlin with in-memory versions.
+
+install() has to be called before gremlin, dill, or vjoy.vjoy are imported
+as the DILL library and the vJoy interface are bound at import time. Once
+installed Gremlin can be run on systems without DILL, vJoy, or the Windows
+API, such as a Linux build machine.
+"""
+
+import collections
+import ctypes
+import importlib.util
+import os
+import sys
+import tempfile
+import types
+
+from vjoy import memory_interface
+
+
+# Windows modules imported by Gremlin which are replaced by stubs if they
+# are unavailable
+_windows_modules = [
+    "pywintypes",
+    "win32api",
+    "win32com",
+    "win32com.client",
+    "win32con",
+    "win32gui",
+    "win32process",
+    "winreg"
+]
+
+
+class _StubValue(int):
+
+    """Value of a stubbed Windows module attribute.
+
+    Behaves as the constant 0 and, when called as a function, does nothing
+    and returns 0.
+    """
+
+    def __call__(self, *args, **kwargs):
+        return 0
+
+
+class _StubModule(types.ModuleType):
+
+    """Module standing in for a Windows module that cannot be imported.
+
+    Every attribute that is not explicitly set is a _StubValue, which
+    satisfies both constants and functions.
+    """
+
+    def __getattr__(self, name):
+        if name.startswith("__"):
+            raise AttributeError(name)
+        return _StubValue()
+
+
+class _FakeFunction:
+
+    """Stands in for a function of a shared library.
+
+    Accepts argtypes and restype assignments and returns 0 when called.
+    """
+
+    def __call__(self, *args):
+        return 0
+
+
+class _FakeLibrary:
+
+    """Stands in for the DILL library and the Windows system libraries."""
+
+    def __init__(self, name=None):
+        pass
+
+    def __getattr__(self, name):
+        if name.startswith("__"):
+            raise AttributeError(name)
+        fn = _FakeFunction()
+        setattr(self, name, fn)
+        return fn
+
+
+class _FakeLibraryLoader:
+
+    """Stands in for ctypes.windll, returning fake libraries."""
+
+    def __getattr__(self, name):
+        if name.startswith("__"):
+            raise AttributeError(name)
+        library = _FakeLibrary(name)
+        setattr(self, name, library)
+        return library
+
+
+class FakeDILL:
+
+    """Stands in for the DILL functions used while a profile is running.
+
+    No physical devices are enumerated, however, any device queried by GUID
+    is reported as a generic joystick with eight axes, 32 buttons, and four
+    hats. Input state queries return the neutral state of the requested
+    input, the InputStateCache holds the actual state of every input events
+    were generated for.
+    """
+
+    @staticmethod
+    def init():
+        pass
+
+    @staticmethod
+    def set_input_event_callback(callback):
+        pass
+
+    @staticmethod
+    def set_device_change_callback(callback):
+        pass
+
+    @staticmethod
+    def get_device_count():
+        return 0
+
+    @staticmethod
+    def get_axis(guid, index):
+        return 0
+
+    @staticmethod
+    def get_button(guid, index):
+        return False
+
+    @staticmethod
+    def get_hat(guid, index):
+        return -1
+
+    @staticmethod
+    def get_device_information_by_guid(guid):
+        import dill
+        data = dill._DeviceSummary()
+        data.device_guid = guid.ctypes
+        data.name = b"Benchmark device"
+        data.axis_count = 8
+        data.button_count = 32
+        data.hat_count = 4
+        for i in range(8):
+            data.axis_map[i].linear_index = i + 1
+            data.axis_map[i].axis_index = i + 1
+        return dill.DeviceSummary(data)
+
+    @staticmethod
+    def get_device_name(guid):
+        return "Benchmark device"
+
+    @staticmethod
+    def device_exists(guid):
+        return True
+
+
+# Number of inputs handed to SendInput, by input type
+sent_inputs = collections.Counter()
+
+
+def _flush_input_buffer(buffer):
+    """Discards the inputs of an InputBuffer instead of sending them.
+
+    :param buffer the sendinput.InputBuffer to flush
+    :return number of discarded inputs
+    """
+    count = buffer._count
+    for i in range(count):
+        sent_inputs[buffer._inputs[i].type] += 1
+    buffer._count = 0
+    return count
+
+
+def _install_windows_stubs():
+    """Registers stubs for all Windows modules that cannot be imported.
+
+    On systems other than Windows ctypes additionally lacks the Windows
+    specific library loaders which are replaced with fake libraries.
+    """
+    if not hasattr(ctypes, "WinDLL"):
+        ctypes.WinDLL = _FakeLibrary
+        ctypes.WINFUNCTYPE = ctypes.CFUNCTYPE
+        ctypes.windll = _FakeLibraryLoader()
+
+    for name in _windows_modules:
+        if name in sys.modules:
+            continue
+        try:
+            importlib.import_module(name)
+        except ImportError:
+            module = _StubModule(name)
+            sys.modules[name] = module
+            parent, _, child = name.rpartition(".")
+            if parent:
+                setattr(sys.modules[parent], child, module)
+
+
+def _install_dill():
+    """Loads the dill module without its shared library.
+
+    The module's types, such as GUID, are used unchanged while the library
+    is replaced by a _FakeLibrary. This has to happen before dill is
+    imported by anything else, otherwise the real library has already been
+    loaded, or failed to load on systems other than Windows.
+
+    :return the dill module
+    """
+    if "dill" in sys.modules:
+        return sys.modules["dill"]
+
+    spec = importlib.util.spec_from_file_location(
+        "dill",
+        os.path.join(
+            os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+            "dill",
+            "__init__.py"
+        )
+    )
+    module = importlib.util.module_from_spec(spec)
+    sys.modules["dill"] = module
+    load_library = ctypes.cdll.LoadLibrary
+    ctypes.cdll.LoadLibrary = lambda path: _FakeLibrary()
+    try:
+        spec.loader.exec_module(module)
+    except Exception:
+        del sys.modules["dill"]
+        raise
+    finally:
+        ctypes.cdll.LoadLibrary = load_library
+    return module
+
+
+def install(vjoy_ids=range(1, 17)):
+    """Installs the in-memory DILL, vJoy, and SendInput backends.
+
+    :param vjoy_ids ids of the simulated vJoy devices
+    """
+    _install_windows_stubs()
+    memory_interface.install()
+    for vjoy_id in vjoy_ids:
+        memory_interface.MemoryVJoyInterface.configure(vjoy_id)
+
+    dill = _install_dill()
+    for name, fn in vars(FakeDILL).items():
+        if isinstance(fn, staticmethod):
+            setattr(dill.DILL, name, fn)
+
+    import gremlin.sendinput
+    gremlin.sendinput.InputBuffer.flush = _flush_input_buffer
+
+
+def install_headless(prefix="gremlin_benchmark_"):
+    """Prepares running Gremlin without a display, devices, or user data.
+
+    Qt is run without a display and all device access is replaced before
+    any module binding it is imported. Gremlin locates its resources
+    relative to the script it was started from. The configuration is read
+    from a new temporary directory, such that the default options are used
+    rather than the user's.
+
+    :param prefix prefix of the temporary directory's name
+    :return path of the temporary directory used as the user profile
+    """
+    repository_path = os.path.dirname(
+        os.path.dirname(os.path.abspath(__file__))
+    )
+    work_dir = tempfile.mkdtemp(prefix=prefix)
+    os.environ["QT_QPA_PLATFORM"] = "offscreen"
+    os.environ["userprofile"] = work_dir
+    os.makedirs(os.path.join(work_dir, "Joystick Gremlin"))
+    sys.argv[0] = os.path.join(repository_path, "joystick_gremlin.py")
+    install()
+    return work_dir
+
+
+def shutdown():
+    """Stops the event listener thread started when Gremlin is imported.
+
+    Has to be called before exiting as the thread otherwise keeps the
+    process alive.
+    """
+    event_handler = sys.modules.get("gremlin.event_handler")
+    if event_handler is not None:
+        event_handler.EventListener().terminate()
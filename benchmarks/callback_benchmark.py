@@ -0,0 +1,196 @@
+# -*- coding: utf-8; -*-
+
+# Copyright (C) 2015 - 2019 Lionel Ott
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+
+"""Measures the cost of running the callbacks of individual inputs.
+
+Every input of the benchmark profile is exercised by calling the callbacks
+generated by its containers directly, i.e. without the EventHandler, which
+isolates the creation of the Value and the walk through the execution
+graphs. In addition copying a Value via copy(), as done by the tempo and
+double tap containers, is compared against copy.deepcopy.
+
+Run from the repository root:
+
+    python -m benchmarks.callback_benchmark [profile.xml] [--json out.json]
+"""
+
+import argparse
+import copy
+import os
+import shutil
+
+from benchmarks import backends, measurement, profile_benchmark
+
+
+def collect_callbacks(profile, mode_name):
+    """Returns the callbacks run in response to the profile's inputs.
+
+    Only callbacks triggered by the physical input itself are returned,
+    callbacks of virtual buttons are run by those in response.
+
+    :param profile the profile whose callbacks to create
+    :param mode_name name of the mode whose inputs to use
+    :return list of (name, device, input_type, input_id, callbacks) tuples
+    """
+    import gremlin.common
+    import gremlin.instrumentation
+
+    joystick_types = [
+        gremlin.common.InputType.JoystickAxis,
+        gremlin.common.InputType.JoystickButton,
+        gremlin.common.InputType.JoystickHat
+    ]
+
+    inputs = []
+    for device in profile.devices.values():
+        mode = device.modes.get(mode_name)
+        while mode is not None:
+            for input_type in joystick_types:
+                for input_item in mode.config[input_type].values():
+                    callbacks = [
+                        cb_data.callback
+                        for container in input_item.containers
+                        if container.is_valid()
+                        for cb_data in container.generate_callbacks()
+                        if cb_data.event is None
+                    ]
+                    if len(callbacks) == 0:
+                        continue
+                    inputs.append((
+                        "{}/{}".format(
+                            device.name,
+                            gremlin.instrumentation.input_name(
+                                input_type,
+                                input_item.input_id
+                            )
+                        ),
+                        device,
+                        input_type,
+                        input_item.input_id,
+                        callbacks
+                    ))
+            mode = device.modes.get(mode.inherit) if mode.inherit else None
+    return inputs
+
+
+def benchmark_callbacks(fname, work_dir, args):
+    """Measures the callbacks of all inputs of a profile.
+
+    :param fname path of the profile to use
+    :param work_dir directory holding a copy of the profile
+    :param args the parsed command line arguments
+    :return dictionary of results per operation
+    """
+    import gremlin.common
+    from gremlin.actions import Value
+
+    profile = profile_benchmark.load_profile(fname, work_dir)
+    mode_name = profile_benchmark.start_mode(profile)
+
+    results = {}
+    axis_values = [
+        Value(event.value) for event in profile_benchmark.generate_storm(
+            None,
+            gremlin.common.InputType.JoystickAxis,
+            1,
+            args.events
+        )
+    ]
+    results["Value deepcopy"] = {
+        "ns_per_call": measurement.time_per_call(
+            copy.deepcopy,
+            axis_values,
+            args.rounds
+        )
+    }
+    results["Value.copy"] = {
+        "ns_per_call": measurement.time_per_call(
+            Value.copy,
+            axis_values,
+            args.rounds
+        )
+    }
+
+    for name, device, input_type, input_id, callbacks in \
+            collect_callbacks(profile, mode_name):
+        def run(event, callbacks=tuple(callbacks)):
+            for callback in callbacks:
+                callback(event)
+
+        events = profile_benchmark.generate_storm(
+            device.device_guid,
+            input_type,
+            input_id,
+            args.events
+        )
+        results["callbacks {}".format(name)] = {
+            "ns_per_call":
+                measurement.time_per_call(run, events, args.rounds),
+            "callbacks": len(callbacks)
+        }
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Benchmarks the callbacks of a profile's inputs"
+    )
+    parser.add_argument(
+        "profile",
+        nargs="?",
+        default=os.path.join(
+            os.path.dirname(os.path.abspath(__file__)),
+            "profiles",
+            "benchmark.xml"
+        ),
+        help="Profile whose callbacks to run"
+    )
+    parser.add_argument(
+        "--events",
+        type=int,
+        default=2000,
+        help="Number of events generated per input"
+    )
+    parser.add_argument(
+        "--rounds",
+        type=int,
+        default=5,
+        help="Number of timed rounds per measurement"
+    )
+    parser.add_argument(
+        "--json",
+        help="File to write the results to"
+    )
+    args = parser.parse_args()
+
+    work_dir = backends.install_headless()
+    from PyQt5 import QtWidgets
+    app = QtWidgets.QApplication([])
+
+    try:
+        results = benchmark_callbacks(args.profile, work_dir, args)
+    finally:
+        import gremlin.joystick_handling
+        gremlin.joystick_handling.VJoyProxy.reset()
+        shutil.rmtree(work_dir, ignore_errors=True)
+        backends.shutdown()
+    measurement.report(results, args.json)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,194 @@
+# -*- coding: utf-8; -*-
+
+# Copyright (C) 2015 - 2019 Lionel Ott
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+
+"""Measures the evaluation of activation conditions.
+
+Sets of keyboard, joystick, and input action conditions are evaluated via
+the compiled ActivationCondition and via a generic loop calling every
+condition in the order they were configured, as done before conditions
+were compiled. The joystick state is placed in the InputStateCache up
+front so that no device is queried.
+
+Run from the repository root:
+
+    python -m benchmarks.condition_benchmark [--events 10000] [--json out]
+"""
+
+import argparse
+
+from benchmarks import backends, measurement
+
+
+# GUID of the device the joystick conditions refer to
+device_guid_string = "{B4CA5720-11D0-11E9-8002-444553540000}"
+
+
+def joystick_condition(device_guid, input_type, input_id, comparison):
+    """Returns the data of a joystick condition.
+
+    :param device_guid GUID of the device the condition refers to
+    :param input_type the type of the input to check
+    :param input_id the index of the input to check
+    :param comparison the comparison operation to perform
+    :return base_classes.JoystickCondition instance
+    """
+    import gremlin.base_classes
+
+    condition = gremlin.base_classes.JoystickCondition()
+    condition.device_guid = device_guid
+    condition.input_type = input_type
+    condition.input_id = input_id
+    condition.comparison = comparison
+    condition.range = [-0.5, 0.5]
+    return condition
+
+
+def create_condition_sets(device_guid):
+    """Returns the condition sets to benchmark.
+
+    The conditions are listed in an order a user may well configure them
+    in, i.e. not sorted by the cost of evaluating them.
+
+    :param device_guid GUID of the device the joystick conditions refer to
+    :return dictionary of condition lists keyed by their name
+    """
+    from gremlin.actions import InputActionCondition, JoystickCondition, \
+        KeyboardCondition
+    from gremlin.common import InputType
+
+    def joystick(input_type, input_id, comparison):
+        return JoystickCondition(joystick_condition(
+            device_guid,
+            input_type,
+            input_id,
+            comparison
+        ))
+
+    return {
+        "action": [InputActionCondition("pressed")],
+        "joystick": [
+            joystick(InputType.JoystickAxis, 1, "inside"),
+            joystick(InputType.JoystickButton, 1, "pressed"),
+            joystick(InputType.JoystickHat, 1, "north")
+        ],
+        "mixed": [
+            KeyboardCondition(0x1e, False, "released"),
+            joystick(InputType.JoystickAxis, 1, "outside"),
+            joystick(InputType.JoystickButton, 1, "pressed"),
+            InputActionCondition("pressed")
+        ]
+    }
+
+
+def benchmark_conditions(args):
+    """Measures compiled and generic evaluation of all condition sets.
+
+    :param args the parsed command line arguments
+    :return dictionary of results per operation
+    """
+    import gremlin.base_classes
+    import gremlin.event_handler
+    import gremlin.profile
+    from gremlin.actions import ActivationCondition, Value
+    from gremlin.common import InputType
+
+    from benchmarks.profile_benchmark import generate_storm
+
+    device_guid = gremlin.profile.parse_guid(device_guid_string)
+    state = gremlin.event_handler.InputStateCache()
+    state.update(device_guid, InputType.JoystickAxis, 1, 0.25)
+    state.update(device_guid, InputType.JoystickButton, 1, True)
+    state.update(device_guid, InputType.JoystickHat, 1, (0, 1))
+
+    arguments = [
+        (event, Value(event.is_pressed)) for event in generate_storm(
+            device_guid,
+            InputType.JoystickButton,
+            2,
+            args.events
+        )
+    ]
+
+    generic_rules = {
+        gremlin.base_classes.ActivationRule.All: all,
+        gremlin.base_classes.ActivationRule.Any: any
+    }
+    results = {}
+    for set_name, conditions in create_condition_sets(device_guid).items():
+        for rule, reduce_fn in generic_rules.items():
+            rule_name = "all" if reduce_fn is all else "any"
+
+            def generic(argument, reduce_fn=reduce_fn, conditions=conditions):
+                event, value = argument
+                return reduce_fn(c(event, value) for c in conditions)
+
+            compiled_fn = ActivationCondition(conditions, rule).process_event
+
+            def compiled(argument, compiled_fn=compiled_fn):
+                return compiled_fn(*argument)
+
+            if [generic(a) for a in arguments] != \
+                    [compiled(a) for a in arguments]:
+                raise RuntimeError(
+                    "Compiled {} {} conditions disagree with the generic "
+                    "evaluation".format(set_name, rule_name)
+                )
+
+            for name, fn in [("generic", generic), ("compiled", compiled)]:
+                results["{} {} {}".format(set_name, rule_name, name)] = {
+                    "ns_per_call": measurement.time_per_call(
+                        fn,
+                        arguments,
+                        args.rounds
+                    )
+                }
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Benchmarks the evaluation of activation conditions"
+    )
+    parser.add_argument(
+        "--events",
+        type=int,
+        default=10000,
+        help="Number of events to evaluate the conditions with"
+    )
+    parser.add_argument(
+        "--rounds",
+        type=int,
+        default=5,
+        help="Number of timed rounds per measurement"
+    )
+    parser.add_argument(
+        "--json",
+        help="File to write the results to"
+    )
+    args = parser.parse_args()
+
+    backends.install_headless()
+    try:
+        results = benchmark_conditions(args)
+    finally:
+        backends.shutdown()
+    measurement.report(results, args.json)
+
+
+if __name__ == "__main__":
+    main()
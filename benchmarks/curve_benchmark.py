@@ -0,0 +1,139 @@
+# -*- coding: utf-8; -*-
+
+# Copyright (C) 2015 - 2019 Lionel Ott
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+
+"""Measures the evaluation of vJoy axis deadzones and response curves.
+
+The composition of deadzone and response curve, as applied by vjoy.Axis, is
+evaluated directly and through lookup tables of several resolutions, as
+used when the "axis_lookup_resolution" option is set. Besides the time per
+evaluation the maximum deviation of each table from the direct evaluation
+and the time needed to build it are reported.
+
+Run from the repository root:
+
+    python -m benchmarks.curve_benchmark [--samples 100000] [--json out.json]
+"""
+
+import argparse
+import random
+import time
+
+from benchmarks import backends, measurement
+
+
+# Control points of the benchmarked curves, an S-curve with a flat center
+# and a Bezier curve consisting of three segments
+spline_points = [
+    (-1.0, -1.0), (-0.5, -0.2), (0.0, 0.0), (0.5, 0.2), (1.0, 1.0)
+]
+bezier_points = [
+    (-1.0, -1.0), (-0.9, -0.5), (-0.6, -0.3), (-0.4, -0.2),
+    (-0.2, -0.1), (0.2, 0.1), (0.4, 0.2),
+    (0.6, 0.3), (0.9, 0.5), (1.0, 1.0)
+]
+
+# Deadzone applied in front of the curves
+deadzone_limits = (-0.95, -0.05, 0.05, 0.95)
+
+# Lookup table resolutions to compare, 65535 covers every DILL axis step
+resolutions = [1024, 4096, 65535]
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Benchmarks axis deadzone and response curve evaluation"
+    )
+    parser.add_argument(
+        "--samples",
+        type=int,
+        default=100000,
+        help="Number of axis values to evaluate"
+    )
+    parser.add_argument(
+        "--rounds",
+        type=int,
+        default=5,
+        help="Number of timed rounds per measurement"
+    )
+    parser.add_argument(
+        "--seed",
+        type=int,
+        default=0,
+        help="Seed used to generate the axis values"
+    )
+    parser.add_argument(
+        "--json",
+        help="File to write the results to"
+    )
+    args = parser.parse_args()
+
+    backends.install_headless()
+    try:
+        results = benchmark_curves(args)
+    finally:
+        backends.shutdown()
+    measurement.report(results, args.json)
+
+
+def benchmark_curves(args):
+    """Measures the evaluation of all curves.
+
+    :param args the parsed command line arguments
+    :return dictionary of results per curve and evaluation method
+    """
+    import gremlin.spline
+    from vjoy.vjoy import deadzone
+
+    rng = random.Random(args.seed)
+    samples = [rng.uniform(-1.0, 1.0) for _ in range(args.samples)]
+
+    curves = [
+        ("cubic spline", gremlin.spline.CubicSpline(spline_points)),
+        ("bezier spline", gremlin.spline.CubicBezierSpline(bezier_points)),
+    ]
+    results = {}
+    for curve_name, curve_fn in curves:
+        def transform_fn(x, curve_fn=curve_fn):
+            return curve_fn(deadzone(x, *deadzone_limits))
+
+        results["{} direct".format(curve_name)] = {
+            "ns_per_call": measurement.time_per_call(
+                transform_fn,
+                samples,
+                args.rounds
+            )
+        }
+        expected = [transform_fn(x) for x in samples]
+
+        for resolution in resolutions:
+            start = time.perf_counter()
+            table = gremlin.spline.LookupTable(transform_fn, resolution)
+            build_ms = (time.perf_counter() - start) * 1000.0
+            results["{} table {:d}".format(curve_name, resolution)] = {
+                "ns_per_call":
+                    measurement.time_per_call(table, samples, args.rounds),
+                "max_error": max(
+                    abs(table(x) - y) for x, y in zip(samples, expected)
+                ),
+                "build_ms": build_ms
+            }
+    return results
+
+
+if __name__ == "__main__":
+    main()
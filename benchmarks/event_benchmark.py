@@ -0,0 +1,207 @@
+# -*- coding: utf-8; -*-
+
+# Copyright (C) 2015 - 2019 Lionel Ott
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+
+"""Measures the cost of creating, hashing, and dispatching events.
+
+The slotted Event with its precomputed input key is compared against a
+replica of the previous Event, which stored its fields in a dictionary and
+computed its hash on every call. As operations are timed per call the
+nanoseconds per call equal the milliseconds spent per million events.
+
+Run from the repository root:
+
+    python -m benchmarks.event_benchmark [--events 100000] [--json out.json]
+"""
+
+import argparse
+import random
+
+from benchmarks import backends, measurement
+
+
+class ReferenceEvent:
+
+    """Replica of the Event implementation without slots and cached key."""
+
+    def __init__(
+            self,
+            event_type,
+            identifier,
+            device_guid,
+            value=None,
+            is_pressed=None,
+            raw_value=None
+    ):
+        self.event_type = event_type
+        self.identifier = identifier
+        self.device_guid = device_guid
+        self.is_pressed = is_pressed
+        self.value = value
+        self.raw_value = raw_value
+
+    def __eq__(self, other):
+        return self.__hash__() == other.__hash__()
+
+    def __ne__(self, other):
+        return not (self == other)
+
+    def __hash__(self):
+        return hash((
+            self.device_guid,
+            self.event_type.value,
+            self.identifier,
+            0
+        ))
+
+
+def generate_arguments(count, seed):
+    """Returns the constructor arguments of random joystick events.
+
+    :param count number of events to generate
+    :param seed seed of the random number generator
+    :return list of argument tuples
+    """
+    import dill
+    from gremlin.common import InputType
+
+    rng = random.Random(seed)
+    devices = [dill.GUID_Virtual, dill.GUID_Invalid]
+    arguments = []
+    for _ in range(count):
+        input_type = rng.choice([
+            InputType.JoystickAxis,
+            InputType.JoystickButton,
+            InputType.JoystickHat
+        ])
+        value = None
+        is_pressed = None
+        if input_type == InputType.JoystickAxis:
+            value = rng.uniform(-1.0, 1.0)
+        elif input_type == InputType.JoystickButton:
+            is_pressed = rng.random() < 0.5
+        else:
+            value = (rng.randint(-1, 1), rng.randint(-1, 1))
+        arguments.append((
+            input_type,
+            rng.randint(1, 8),
+            rng.choice(devices),
+            value,
+            is_pressed
+        ))
+    return arguments
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Benchmarks event creation, hashing, and dispatch"
+    )
+    parser.add_argument(
+        "--events",
+        type=int,
+        default=100000,
+        help="Number of events to generate"
+    )
+    parser.add_argument(
+        "--rounds",
+        type=int,
+        default=5,
+        help="Number of timed rounds per measurement"
+    )
+    parser.add_argument(
+        "--seed",
+        type=int,
+        default=0,
+        help="Seed used to generate the events"
+    )
+    parser.add_argument(
+        "--json",
+        help="File to write the results to"
+    )
+    args = parser.parse_args()
+
+    backends.install_headless()
+    from gremlin.event_handler import Event
+
+    try:
+        arguments = generate_arguments(args.events, args.seed)
+        templates = {}
+        for argument in arguments:
+            key = argument[:3]
+            if key not in templates:
+                templates[key] = Event(*key)
+        template_arguments = [
+            (templates[argument[:3]], argument[3], argument[4])
+            for argument in arguments
+        ]
+        events = [Event(*argument) for argument in arguments]
+        reference_events = [
+            ReferenceEvent(*argument) for argument in arguments
+        ]
+
+        # Dispatch tables as built by the EventHandler, keyed by input
+        lookup = {hash(event): (None,) for event in templates.values()}
+        pairs = list(zip(events, events[1:] + events[:1]))
+        reference_pairs = list(zip(
+            reference_events,
+            reference_events[1:] + reference_events[:1]
+        ))
+
+        operations = [
+            ("create ReferenceEvent", lambda a: ReferenceEvent(*a), arguments),
+            ("create Event", lambda a: Event(*a), arguments),
+            (
+                "create Event.from_template",
+                lambda a: Event.from_template(a[0], a[1], a[2]),
+                template_arguments
+            ),
+            ("hash ReferenceEvent", hash, reference_events),
+            ("hash Event", hash, events),
+            (
+                "compare ReferenceEvent",
+                lambda p: p[0] == p[1],
+                reference_pairs
+            ),
+            ("compare Event", lambda p: p[0] == p[1], pairs),
+            (
+                "dispatch lookup ReferenceEvent",
+                lambda e: lookup.get(hash(e), ()),
+                reference_events
+            ),
+            (
+                "dispatch lookup Event",
+                lambda e: lookup.get(hash(e), ()),
+                events
+            ),
+        ]
+        results = {}
+        for name, fn, fn_arguments in operations:
+            results[name] = {
+                "ns_per_call":
+                    measurement.time_per_call(fn, fn_arguments, args.rounds)
+            }
+            if name.startswith("create"):
+                results[name]["bytes_per_call"] = \
+                    measurement.bytes_per_call(fn, fn_arguments)
+    finally:
+        backends.shutdown()
+
+    measurement.report(results, args.json)
+
+
+if __name__ == "__main__":
+    main()
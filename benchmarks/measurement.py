@@ -0,0 +1,235 @@
+# -*- coding: utf-8; -*-
+
+# Copyright (C) 2015 - 2019 Lionel Ott
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+
+import gc
+import json
+import statistics
+import time
+import tracemalloc
+
+
+class Measurement:
+
+    """Timing and allocation results of processing a set of events."""
+
+    def __init__(self):
+        """Creates a new empty instance."""
+        self.events = 0
+        self.elapsed = 0.0
+        self.latencies = []
+        self.peak_bytes = None
+        self.retained_bytes = 0
+
+    def merge(self, other):
+        """Adds the results of another measurement to this one.
+
+        :param other the measurement to add
+        """
+        self.events += other.events
+        self.elapsed += other.elapsed
+        self.latencies.extend(other.latencies)
+        if other.peak_bytes is not None:
+            self.peak_bytes = (self.peak_bytes or 0) + other.peak_bytes
+        self.retained_bytes += other.retained_bytes
+
+    def summary(self):
+        """Returns the key figures of the measurement.
+
+        :return dictionary containing events per second, latency
+            percentiles in microseconds and bytes allocated per event
+        """
+        latencies = sorted(self.latencies)
+        return {
+            "events": self.events,
+            "events_per_second":
+                self.events / self.elapsed if self.elapsed > 0 else 0.0,
+            "p50_us": percentile(latencies, 0.50) / 1000.0,
+            "p99_us": percentile(latencies, 0.99) / 1000.0,
+            "peak_bytes_per_event":
+                None if self.peak_bytes is None
+                else self.peak_bytes / max(1, self.events),
+            "retained_bytes_per_event":
+                self.retained_bytes / max(1, self.events)
+        }
+
+
+def percentile(values, fraction):
+    """Returns the percentile of a sorted list of values.
+
+    :param values sorted list of values
+    :param fraction the percentile to compute in the range [0, 1]
+    :return value at the requested percentile
+    """
+    if len(values) == 0:
+        return 0.0
+    index = min(len(values) - 1, int(round(fraction * (len(values) - 1))))
+    return values[index]
+
+
+def measure(process_event, update_state, events, rounds=5):
+    """Measures the processing of a sequence of events.
+
+    The sequence is processed once to warm up caches, followed by the
+    timed rounds. Throughput is taken from the round with the median
+    duration, latencies are pooled across all rounds. A final round runs
+    with tracemalloc enabled to determine the memory allocated per event.
+
+    :param process_event function processing a single event
+    :param update_state function updating the input state with an event
+        before it is processed, as the EventListener would
+    :param events the sequence of events to process
+    :param rounds number of timed rounds
+    :return Measurement holding the results
+    """
+    timer = time.perf_counter_ns
+    result = Measurement()
+
+    for event in events:
+        update_state(event)
+        process_event(event)
+
+    durations = []
+    for _ in range(rounds):
+        gc.collect()
+        samples = [0] * len(events)
+        start = timer()
+        for i, event in enumerate(events):
+            update_state(event)
+            t_start = timer()
+            process_event(event)
+            samples[i] = timer() - t_start
+        durations.append(timer() - start)
+        result.latencies.extend(samples)
+
+    result.events = len(events)
+    result.elapsed = statistics.median(durations) / 1e9
+    result.peak_bytes, result.retained_bytes = \
+        _measure_allocations(process_event, update_state, events)
+    return result
+
+
+def _measure_allocations(process_event, update_state, events):
+    """Returns the memory allocated while processing the events.
+
+    The peak is only available with Python versions providing
+    tracemalloc.reset_peak.
+
+    :param process_event function processing a single event
+    :param update_state function updating the input state with an event
+    :param events the sequence of events to process
+    :return sum of the per event allocation peaks, or None if unavailable,
+        and the memory still held after processing all events
+    """
+    reset_peak = getattr(tracemalloc, "reset_peak", None)
+    gc.collect()
+    tracemalloc.start()
+    try:
+        peak_total = 0
+        base = tracemalloc.get_traced_memory()[0]
+        for event in events:
+            update_state(event)
+            if reset_peak is not None:
+                reset_peak()
+            before = tracemalloc.get_traced_memory()[0]
+            process_event(event)
+            peak_total += tracemalloc.get_traced_memory()[1] - before
+        gc.collect()
+        retained = tracemalloc.get_traced_memory()[0] - base
+    finally:
+        tracemalloc.stop()
+    return peak_total if reset_peak is not None else None, retained
+
+
+def time_per_call(fn, arguments, rounds=5):
+    """Measures the duration of calling a function.
+
+    The function is called once with every argument to warm up caches,
+    followed by the timed rounds. The duration is taken from the round
+    with the median duration.
+
+    :param fn function to measure, called with a single argument
+    :param arguments sequence of arguments to call the function with
+    :param rounds number of timed rounds
+    :return median duration of a single call in nanoseconds
+    """
+    timer = time.perf_counter_ns
+    for argument in arguments:
+        fn(argument)
+
+    durations = []
+    for _ in range(rounds):
+        gc.collect()
+        start = timer()
+        for argument in arguments:
+            fn(argument)
+        durations.append(timer() - start)
+    return statistics.median(durations) / max(1, len(arguments))
+
+
+def bytes_per_call(fn, arguments):
+    """Measures the memory held by the results of a function.
+
+    :param fn function to measure, called with a single argument
+    :param arguments sequence of arguments to call the function with
+    :return number of bytes held by a single result
+    """
+    results = [None] * len(arguments)
+    gc.collect()
+    tracemalloc.start()
+    try:
+        base = tracemalloc.get_traced_memory()[0]
+        for i, argument in enumerate(arguments):
+            results[i] = fn(argument)
+        held = tracemalloc.get_traced_memory()[0] - base
+    finally:
+        tracemalloc.stop()
+    return held / max(1, len(arguments))
+
+
+def report(results, fname=None):
+    """Prints the results of a micro benchmark and optionally stores them.
+
+    Figures other than the duration and memory per call are printed as
+    name and value pairs following the fixed columns.
+
+    :param results dictionary mapping the name of each measured operation
+        to a dictionary of figures, containing at least "ns_per_call"
+    :param fname file to write the results to as JSON, if not None
+    """
+    print("{:<48s} {:>12s} {:>14s}".format(
+        "operation",
+        "ns/call",
+        "bytes/call"
+    ))
+    for name, figures in results.items():
+        held = figures.get("bytes_per_call")
+        extra = [
+            "{}={:.3g}".format(key, value)
+            for key, value in sorted(figures.items())
+            if key not in ("ns_per_call", "bytes_per_call")
+        ]
+        print("{:<48s} {:>12.1f} {:>14s}  {}".format(
+            name,
+            figures["ns_per_call"],
+            "" if held is None else "{:.1f}".format(held),
+            " ".join(extra)
+        ).rstrip())
+
+    if fname is not None:
+        with open(fname, "w") as out:
+            json.dump(results, out, indent=2, sort_keys=True)
@@ -0,0 +1,518 @@
+# -*- coding: utf-8; -*-
+
+# Copyright (C) 2015 - 2019 Lionel Ott
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+
+"""Measures how fast profiles process joystick events.
+
+Profiles are started with the CodeRunner against in-memory DILL, vJoy, and
+SendInput backends after which synthetic axis, button, and hat event
+storms are published via EventListener.joystick_event. As in the running
+application this delivers them to EventHandler.process_event and to the
+button release handling. Throughput and latency are
+reported per input, per profile, and for a replayed event log. A separate
+pass with latency recording enabled attributes the processing time to the
+individual containers and the functors of actions and conditions.
+
+Run from the repository root:
+
+    python -m benchmarks.profile_benchmark [profile.xml ...]
+        [--json results.json] [--baseline previous.json]
+
+Without explicit profiles every profile found in benchmarks/profiles/ and
+examples/ is used. With a baseline the run fails if any result got slower
+than the tolerance permits. benchmarks/baseline.json holds the results of
+a reference run.
+"""
+
+import argparse
+import glob
+import json
+import logging
+import math
+import os
+import random
+import shutil
+import sys
+from xml.etree import ElementTree
+
+from benchmarks import backends, measurement
+
+
+# Hat directions cycled through by hat storms
+_hat_directions = [
+    (0, 1), (1, 1), (1, 0), (1, -1), (0, -1), (-1, -1), (-1, 0), (-1, 1),
+    (0, 0)
+]
+
+_repository_path = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def find_profiles():
+    """Returns the paths of all profiles in benchmarks/profiles/ and
+    examples/.
+
+    :return list of profile paths
+    """
+    profiles = []
+    fnames = []
+    for directory in [("benchmarks", "profiles"), ("examples",)]:
+        pattern = os.path.join(_repository_path, *directory, "**", "*.xml")
+        fnames.extend(sorted(glob.glob(pattern, recursive=True)))
+    for fname in fnames:
+        try:
+            root = ElementTree.parse(fname).getroot()
+        except ElementTree.ParseError:
+            continue
+        if root.tag in ["profile", "devices"]:
+            profiles.append(fname)
+    return profiles
+
+
+def load_profile(fname, work_dir):
+    """Loads a profile from a copy of its directory.
+
+    Outdated profiles are converted in place when loaded, working on a copy
+    leaves the original files untouched.
+
+    :param fname path of the profile to load
+    :param work_dir directory in which to place the copy
+    :return the loaded profile
+    """
+    import gremlin.profile
+
+    source_dir, name = os.path.split(os.path.abspath(fname))
+    target_dir = os.path.join(work_dir, os.path.basename(source_dir))
+    if not os.path.exists(target_dir):
+        shutil.copytree(source_dir, target_dir)
+    profile = gremlin.profile.Profile()
+    profile.from_xml(os.path.join(target_dir, name))
+    return profile
+
+
+def start_mode(profile):
+    """Returns the mode the profile starts in.
+
+    :param profile the profile for which to determine the start mode
+    :return name of the start mode
+    """
+    import gremlin.profile
+
+    if profile.settings.startup_mode in gremlin.profile.mode_list(profile):
+        return profile.settings.startup_mode
+    return list(profile.build_inheritance_tree().keys())[0]
+
+
+def collect_inputs(profile, mode_name):
+    """Returns the joystick inputs of a mode which have callbacks.
+
+    Inputs of modes the given mode inherits from are included as they are
+    active as well.
+
+    :param profile the profile containing the inputs
+    :param mode_name name of the mode whose inputs to return
+    :return list of (device, input_type, input_id) tuples
+    """
+    import gremlin.common
+
+    joystick_types = [
+        gremlin.common.InputType.JoystickAxis,
+        gremlin.common.InputType.JoystickButton,
+        gremlin.common.InputType.JoystickHat
+    ]
+
+    inputs = []
+    for device in profile.devices.values():
+        mode = device.modes.get(mode_name)
+        while mode is not None:
+            for input_type in joystick_types:
+                for input_item in mode.config[input_type].values():
+                    if any(c.is_valid() for c in input_item.containers):
+                        inputs.append((
+                            device,
+                            input_type,
+                            input_item.input_id
+                        ))
+            mode = device.modes.get(mode.inherit) if mode.inherit else None
+    return inputs
+
+
+def generate_storm(device_guid, input_type, input_id, count):
+    """Returns a sequence of events exercising a single input.
+
+    Axes sweep their full range, buttons alternate between being pressed
+    and released, and hats cycle through all directions.
+
+    :param device_guid GUID of the device the input belongs to
+    :param input_type the type of the input
+    :param input_id the index of the input
+    :param count number of events to generate
+    :return list of events
+    """
+    import gremlin.common
+    from gremlin.event_handler import Event
+
+    template = Event(
+        event_type=input_type,
+        identifier=input_id,
+        device_guid=device_guid
+    )
+    events = []
+    for i in range(count):
+        if input_type == gremlin.common.InputType.JoystickAxis:
+            value = math.sin(i * 0.05)
+            events.append(Event.from_template(
+                template,
+                value=value,
+                raw_value=int(value * 32767)
+            ))
+        elif input_type == gremlin.common.InputType.JoystickButton:
+            events.append(Event.from_template(template, is_pressed=i % 2 == 0))
+        elif input_type == gremlin.common.InputType.JoystickHat:
+            events.append(Event.from_template(
+                template,
+                value=_hat_directions[i % len(_hat_directions)]
+            ))
+    return events
+
+
+def benchmark_profile(fname, work_dir, args):
+    """Runs all benchmarks of a single profile.
+
+    Inputs and the profile as a whole are timed with latency recording
+    disabled. Afterwards all inputs are exercised once more with latency
+    recording enabled, which attributes the time to the containers and to
+    the functors they run, i.e. actions, activation conditions, and the
+    container's own functor. The timing code adds a fraction of a
+    microsecond to every recorded call.
+
+    :param fname path of the profile to benchmark
+    :param work_dir directory holding copies of the profiles
+    :param args parsed command line arguments
+    :return dictionary of Measurement results and dictionary of
+        LatencyHistogram instances per container and functor
+    """
+    import gremlin.code_runner
+    import gremlin.config
+    import gremlin.event_handler
+    import gremlin.event_log
+    import gremlin.instrumentation
+
+    profile = load_profile(fname, work_dir)
+    mode_name = start_mode(profile)
+    inputs = collect_inputs(profile, mode_name)
+    key = os.path.relpath(fname, _repository_path)
+
+    runner = gremlin.code_runner.CodeRunner()
+    update_state = gremlin.event_log.update_input_state
+    publish = gremlin.event_handler.EventListener().joystick_event.emit
+
+    def start(record_latencies):
+        gremlin.config.Configuration().record_latencies = record_latencies
+        runner.start(
+            profile.build_inheritance_tree(),
+            profile.settings,
+            mode_name,
+            profile
+        )
+
+    def run(events):
+        # Mode switching actions must not affect subsequent measurements
+        runner.event_handler.change_mode(mode_name)
+        return measurement.measure(
+            publish,
+            update_state,
+            events,
+            args.rounds
+        )
+
+    rng = random.Random(0)
+    storms = []
+    for device, input_type, input_id in inputs:
+        storms.append((
+            "{}/{}".format(
+                device.name,
+                gremlin.instrumentation.input_name(input_type, input_id)
+            ),
+            generate_storm(
+                device.device_guid,
+                input_type,
+                input_id,
+                args.events
+            )
+        ))
+    # All inputs of the profile at once, interleaved in a fixed random order
+    mixed = [event for _, events in storms for event in events]
+    rng.shuffle(mixed)
+
+    profile_results = {}
+    start(False)
+    try:
+        for name, events in storms:
+            profile_results["input:{}:{}".format(key, name)] = run(events)
+        if len(mixed) > 0:
+            profile_results["profile:{}".format(key)] = run(mixed)
+        if args.log is not None:
+            events = [
+                event for _, event
+                in gremlin.event_log.read_event_log(args.log)
+            ]
+            profile_results["log:{}".format(key)] = run(events)
+    finally:
+        runner.stop()
+
+    plugin_results = {}
+    start(True)
+    try:
+        runner.event_handler.change_mode(mode_name)
+        for event in mixed:
+            update_state(event)
+            publish(event)
+        histograms = gremlin.instrumentation.Instrumentation().histograms()
+        for histogram_key, histogram in histograms.items():
+            # Histograms without a container time the entire event
+            if histogram_key.container is None:
+                continue
+            if histogram_key.action is None:
+                name = "container:{}".format(histogram_key.container)
+            else:
+                name = "functor:{}".format(histogram_key.action)
+            plugin_results.setdefault(
+                name,
+                gremlin.instrumentation.LatencyHistogram()
+            ).merge(histogram.merged())
+    finally:
+        runner.stop()
+        gremlin.config.Configuration().record_latencies = False
+
+    return profile_results, plugin_results
+
+
+def summarize_histogram(histogram):
+    """Returns the key figures of a plugin's latency histogram.
+
+    :param histogram the LatencyHistogram to summarize
+    :return dictionary containing the number of calls and the latency
+        percentiles in microseconds
+    """
+    summary = histogram.to_dict()
+    return {
+        "calls": summary["count"],
+        "mean_us": summary["mean_us"],
+        "p50_us": summary["p50_us"],
+        "p99_us": summary["p99_us"],
+        "p999_us": summary["p999_us"]
+    }
+
+
+def compare(results, baseline, tolerance):
+    """Returns the results which regressed compared to a baseline.
+
+    Throughput is compared if present, plugin results only contain
+    latencies.
+
+    :param results dictionary of result summaries
+    :param baseline dictionary of baseline result summaries
+    :param tolerance relative change permitted before a result counts as
+        a regression
+    :return list of (name, metric, baseline value, current value) tuples
+    """
+    regressions = []
+    for name, current in sorted(results.items()):
+        reference = baseline.get(name)
+        if reference is None:
+            continue
+        if "events_per_second" in current and \
+                current["events_per_second"] < \
+                reference["events_per_second"] * (1.0 - tolerance):
+            regressions.append((
+                name,
+                "events_per_second",
+                reference["events_per_second"],
+                current["events_per_second"]
+            ))
+        if current["p99_us"] > reference["p99_us"] * (1.0 + tolerance):
+            regressions.append((
+                name,
+                "p99_us",
+                reference["p99_us"],
+                current["p99_us"]
+            ))
+    return regressions
+
+
+def print_results(results):
+    """Prints a table of result summaries.
+
+    :param results dictionary of result summaries
+    """
+    header = "{:<72s} {:>9s} {:>12s} {:>9s} {:>9s} {:>11s} {:>11s}".format(
+        "name", "events", "events/s", "p50 us", "p99 us",
+        "peak B/ev", "kept B/ev"
+    )
+    print(header)
+    print("-" * len(header))
+    for name, summary in sorted(results.items()):
+        peak = summary["peak_bytes_per_event"]
+        print("{:<72s} {:>9d} {:>12.0f} {:>9.2f} {:>9.2f} {:>11s} {:>11.1f}"
+              .format(
+                  name[:72],
+                  summary["events"],
+                  summary["events_per_second"],
+                  summary["p50_us"],
+                  summary["p99_us"],
+                  "n/a" if peak is None else "{:.0f}".format(peak),
+                  summary["retained_bytes_per_event"]
+              ))
+
+
+def print_plugin_results(results):
+    """Prints a table of plugin latency summaries.
+
+    :param results dictionary of plugin result summaries
+    """
+    header = "{:<72s} {:>9s} {:>9s} {:>9s} {:>9s} {:>9s}".format(
+        "plugin", "calls", "mean us", "p50 us", "p99 us", "p99.9 us"
+    )
+    print(header)
+    print("-" * len(header))
+    for name, summary in sorted(results.items()):
+        print("{:<72s} {:>9d} {:>9.2f} {:>9.2f} {:>9.2f} {:>9.2f}".format(
+            name[:72],
+            summary["calls"],
+            summary["mean_us"],
+            summary["p50_us"],
+            summary["p99_us"],
+            summary["p999_us"]
+        ))
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Benchmarks the event processing of profiles"
+    )
+    parser.add_argument(
+        "profiles",
+        nargs="*",
+        help="Profiles to benchmark, defaults to the ones in "
+             "benchmarks/profiles/ and examples/"
+    )
+    parser.add_argument(
+        "--events",
+        type=int,
+        default=2000,
+        help="Number of events generated per input"
+    )
+    parser.add_argument(
+        "--rounds",
+        type=int,
+        default=5,
+        help="Number of timed rounds per measurement"
+    )
+    parser.add_argument(
+        "--log",
+        help="Event log to replay through every profile"
+    )
+    parser.add_argument(
+        "--json",
+        help="File to write the results to"
+    )
+    parser.add_argument(
+        "--baseline",
+        help="Results of a previous run to compare against"
+    )
+    parser.add_argument(
+        "--tolerance",
+        type=float,
+        default=0.15,
+        help="Relative slowdown tolerated before reporting a regression"
+    )
+    args = parser.parse_args()
+
+    work_dir = backends.install_headless()
+
+    from PyQt5 import QtWidgets
+    app = QtWidgets.QApplication(sys.argv[:1])
+
+    logging.getLogger("system").addHandler(logging.StreamHandler())
+    logging.getLogger("system").setLevel(logging.WARNING)
+
+    import gremlin.instrumentation
+
+    profiles = args.profiles if len(args.profiles) > 0 else find_profiles()
+    measurements = {}
+    histograms = {}
+    try:
+        for fname in profiles:
+            try:
+                profile_measurements, profile_histograms = \
+                    benchmark_profile(fname, work_dir, args)
+            except Exception as e:
+                print("Skipping {}: {}".format(fname, e), file=sys.stderr)
+                continue
+            measurements.update(profile_measurements)
+            for name, histogram in profile_histograms.items():
+                histograms.setdefault(
+                    name,
+                    gremlin.instrumentation.LatencyHistogram()
+                ).merge(histogram)
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+        backends.shutdown()
+
+    results = {
+        name: result.summary() for name, result in measurements.items()
+    }
+    plugins = {
+        name: summarize_histogram(histogram)
+        for name, histogram in histograms.items()
+    }
+    print_results(results)
+    print()
+    print_plugin_results(plugins)
+
+    if args.json is not None:
+        with open(args.json, "w") as out:
+            json.dump(
+                {"results": results, "plugins": plugins},
+                out,
+                indent=2,
+                sort_keys=True
+            )
+
+    if args.baseline is not None:
+        with open(args.baseline) as baseline_file:
+            baseline = json.load(baseline_file)
+        regressions = compare(results, baseline["results"], args.tolerance)
+        regressions.extend(compare(
+            plugins,
+            baseline.get("plugins", {}),
+            args.tolerance
+        ))
+        for name, metric, reference, current in regressions:
+            print("REGRESSION {} {}: {:.2f} -> {:.2f}".format(
+                name,
+                metric,
+                reference,
+                current
+            ))
+        if len(regressions) > 0:
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,128 @@
+# -*- coding: utf-8; -*-
+
+# Copyright (C) 2015 - 2019 Lionel Ott
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+
+"""Measures sending macro inputs individually and batched.
+
+Sequences of key, mouse button, and mouse motion actions are sent one
+action at a time, as macros do by default, and together via an
+InputBatchAction, as done when the "batch_inputs" macro option is set.
+The headless backends discard the inputs instead of calling SendInput,
+the timings therefore cover preparing the inputs only. The number of
+calls into the operating system per sequence is reported alongside, each
+of which adds the cost of a system call on Windows.
+
+Run from the repository root:
+
+    python -m benchmarks.sendinput_benchmark [--repeats 2000] [--json out]
+"""
+
+import argparse
+
+from benchmarks import backends, measurement
+
+
+def create_sequences():
+    """Returns the action sequences to benchmark.
+
+    :return dictionary of action lists keyed by their name
+    """
+    from gremlin.common import MouseButton
+    from gremlin.macro import KeyAction, MouseButtonAction, \
+        MouseMotionAction, key_from_name
+
+    keys = [key_from_name(name) for name in ["leftcontrol", "leftshift", "f1"]]
+    return {
+        "key tap": [
+            KeyAction(keys[-1], True),
+            KeyAction(keys[-1], False)
+        ],
+        "key chord": [KeyAction(key, True) for key in keys] +
+                     [KeyAction(key, False) for key in reversed(keys)],
+        "mouse click": [
+            MouseButtonAction(MouseButton.Left, True),
+            MouseButtonAction(MouseButton.Left, False)
+        ],
+        "mouse drag": [MouseButtonAction(MouseButton.Left, True)] +
+                      [MouseMotionAction(4, -2) for _ in range(8)] +
+                      [MouseButtonAction(MouseButton.Left, False)]
+    }
+
+
+def benchmark_sequences(args):
+    """Measures individual and batched sending of all sequences.
+
+    :param args the parsed command line arguments
+    :return dictionary of results per operation
+    """
+    from gremlin.macro import InputBatchAction
+
+    def run(actions):
+        for action in actions:
+            action()
+
+    results = {}
+    for name, actions in create_sequences().items():
+        arguments = [actions] * args.repeats
+        results["{} individual".format(name)] = {
+            "ns_per_call":
+                measurement.time_per_call(run, arguments, args.rounds),
+            "system_calls": len(actions)
+        }
+        results["{} batched".format(name)] = {
+            "ns_per_call": measurement.time_per_call(
+                lambda batch: batch(),
+                [InputBatchAction(actions)] * args.repeats,
+                args.rounds
+            ),
+            "system_calls": 1
+        }
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Benchmarks individual and batched macro inputs"
+    )
+    parser.add_argument(
+        "--repeats",
+        type=int,
+        default=2000,
+        help="Number of times each sequence is sent per round"
+    )
+    parser.add_argument(
+        "--rounds",
+        type=int,
+        default=5,
+        help="Number of timed rounds per measurement"
+    )
+    parser.add_argument(
+        "--json",
+        help="File to write the results to"
+    )
+    args = parser.parse_args()
+
+    backends.install_headless()
+    try:
+        results = benchmark_sequences(args)
+    finally:
+        backends.shutdown()
+    measurement.report(results, args.json)
+
+
+if __name__ == "__main__":
+    main()
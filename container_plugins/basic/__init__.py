@@ -113,6 +113,14 @@ class BasicContainerFunctor(gremlin.base_classes.AbstractFunctor):
             container.action_sets[0]
         )
 
+    @property
+    def thread_safe(self):
+        """Returns whether or not the container's actions are thread safe.
+
+        :return True if all actions of the container are thread safe
+        """
+        return self.action_set.thread_safe
+
     def process_event(self, event, value):
         """Executes the content with the provided data.
 
@@ -15,15 +15,14 @@
 # You should have received a copy of the GNU General Public License
 # along with this program.  If not, see <http://www.gnu.org/licenses/>.
 
-import copy
 import logging
-import threading
 import time
 from xml.etree import ElementTree
 
 from PyQt5 import QtWidgets
 
 import gremlin
+import gremlin.scheduler
 import gremlin.ui.common
 import gremlin.ui.input_item
 
@@ -225,6 +224,9 @@ class DoubleTapContainerFunctor(gremlin.base_classes.AbstractFunctor):
         self.activate_on = container.activate_on
 
         self.start_time = 0
+        # Delayed actions are run by the scheduler's worker thread, which
+        # runs all scheduled callbacks one after the other, and thus must
+        # not block
         self.double_action_timer = None
         self.tap_type = None
         self.value_press = None
@@ -243,7 +245,7 @@ class DoubleTapContainerFunctor(gremlin.base_classes.AbstractFunctor):
 
         # Copy state when input is pressed
         if value.current:
-            self.value_press = copy.deepcopy(value)
+            self.value_press = value.copy()
             self.event_press = event.clone()
 
         # Execute double tap logic
@@ -261,19 +263,22 @@ class DoubleTapContainerFunctor(gremlin.base_classes.AbstractFunctor):
                 self.tap_type = "single"
                 if self.activate_on == "exclusive":
                     self.double_action_timer = \
-                        threading.Timer(self.delay, self._single_tap)
-                    self.double_action_timer.start()
+                        gremlin.scheduler.Scheduler().schedule(
+                            self.delay,
+                            self._single_tap
+                        )
 
         # Input is being released at this point
-        elif self.double_action_timer and self.double_action_timer.is_alive():
+        elif self.double_action_timer and self.double_action_timer.is_pending:
             # if releasing single tap before delay
             # we will want to send a short press and release
             self.double_action_timer.cancel()
-            self.double_action_timer = threading.Timer(
+            self.double_action_timer = gremlin.scheduler.Scheduler().schedule(
                 (self.start_time + self.delay) - time.time(),
-                lambda: self._single_tap(event, value)
+                self._single_tap,
+                event,
+                value
             )
-            self.double_action_timer.start()
 
         if self.tap_type == "double":
             self.double_tap.process_event(event, value)
@@ -286,8 +291,12 @@ class DoubleTapContainerFunctor(gremlin.base_classes.AbstractFunctor):
         """Callback executed, when the delay expires."""
         self.single_tap.process_event(self.event_press, self.value_press)
         if event_release:
-            time.sleep(0.05)
-            self.single_tap.process_event(event_release, value_release)
+            gremlin.scheduler.Scheduler().schedule(
+                0.05,
+                self.single_tap.process_event,
+                event_release,
+                value_release
+            )
 
 
 class DoubleTapContainer(gremlin.base_classes.AbstractContainer):
@@ -15,15 +15,14 @@
 # You should have received a copy of the GNU General Public License
 # along with this program.  If not, see <http://www.gnu.org/licenses/>.
 
-import copy
 import logging
-import threading
 import time
 from xml.etree import ElementTree
 
 from PyQt5 import QtWidgets
 
 import gremlin
+import gremlin.scheduler
 import gremlin.ui.common
 import gremlin.ui.input_item
 
@@ -223,6 +222,9 @@ class TempoContainerFunctor(gremlin.base_classes.AbstractFunctor):
         self.activate_on = container.activate_on
 
         self.start_time = 0
+        # Delayed actions are run by the scheduler's worker thread, which
+        # runs all scheduled callbacks one after the other, and thus must
+        # not block
         self.timer = None
         self.value_press = None
         self.event_press = None
@@ -240,14 +242,19 @@ class TempoContainerFunctor(gremlin.base_classes.AbstractFunctor):
 
         # Copy state when input is pressed
         if value.current:
-            self.value_press = copy.deepcopy(value)
+            self.value_press = value.copy()
             self.event_press = event.clone()
 
         # Execute tempo logic
         if value.current:
             self.start_time = time.time()
-            self.timer = threading.Timer(self.delay, self._long_press)
-            self.timer.start()
+            if self.timer is None:
+                self.timer = gremlin.scheduler.Scheduler().schedule(
+                    self.delay,
+                    self._long_press
+                )
+            else:
+                self.timer.reschedule(self.delay)
 
             if self.activate_on == "press":
                 self.short_set.process_event(self.event_press, self.value_press)
@@ -257,12 +264,12 @@ class TempoContainerFunctor(gremlin.base_classes.AbstractFunctor):
                 self.timer.cancel()
 
                 if self.activate_on == "release":
-                    threading.Thread(target=lambda: self._short_press(
+                    self._short_press(
                         self.event_press,
                         self.value_press,
                         event,
                         value
-                    )).start()
+                    )
                 else:
                     self.short_set.process_event(event, value)
             # Long press
@@ -271,8 +278,6 @@ class TempoContainerFunctor(gremlin.base_classes.AbstractFunctor):
                 if self.activate_on == "press":
                     self.short_set.process_event(event, value)
 
-            self.timer = None
-
         return True
 
     def _short_press(self, event_p, value_p, event_r, value_r):
@@ -284,8 +289,12 @@ class TempoContainerFunctor(gremlin.base_classes.AbstractFunctor):
         :param value_r value to release the action
         """
         self.short_set.process_event(event_p, value_p)
-        time.sleep(0.05)
-        self.short_set.process_event(event_r, value_r)
+        gremlin.scheduler.Scheduler().schedule(
+            0.05,
+            self.short_set.process_event,
+            event_r,
+            value_r
+        )
 
     def _long_press(self):
         """Callback executed, when the delay expires."""
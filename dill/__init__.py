@@ -146,6 +146,20 @@ class GUID:
             (guid.Data4[4] << 24) + (guid.Data4[5] << 16) +
             (guid.Data4[6] << 8) + guid.Data4[7]
         )
+        # The GUID never changes, hence the hash only needs computing once
+        self._hash = hash((
+            self._ctypes_guid.Data1,
+            self._ctypes_guid.Data2,
+            self._ctypes_guid.Data3,
+            self._ctypes_guid.Data4[0],
+            self._ctypes_guid.Data4[1],
+            self._ctypes_guid.Data4[2],
+            self._ctypes_guid.Data4[3],
+            self._ctypes_guid.Data4[4],
+            self._ctypes_guid.Data4[5],
+            self._ctypes_guid.Data4[6],
+            self._ctypes_guid.Data4[7]
+        ))
 
     @property
     def ctypes(self):
@@ -212,19 +226,7 @@ class GUID:
         int
             The has computed from this GUID
         """
-        return hash((
-            self._ctypes_guid.Data1,
-            self._ctypes_guid.Data2,
-            self._ctypes_guid.Data3,
-            self._ctypes_guid.Data4[0],
-            self._ctypes_guid.Data4[1],
-            self._ctypes_guid.Data4[2],
-            self._ctypes_guid.Data4[3],
-            self._ctypes_guid.Data4[4],
-            self._ctypes_guid.Data4[5],
-            self._ctypes_guid.Data4[6],
-            self._ctypes_guid.Data4[7]
-        ))
+        return self._hash
 
 
 GUID_Keyboard = GUID(_GUID_SysKeyboard)
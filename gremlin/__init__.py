@@ -24,17 +24,20 @@ import gremlin.config
 import gremlin.control_action
 import gremlin.error
 import gremlin.event_handler
+import gremlin.event_log
 import gremlin.execution_graph
 import gremlin.fsm
 import gremlin.hid_guardian
 import gremlin.hints
 import gremlin.input_devices
+import gremlin.instrumentation
 import gremlin.joystick_handling
 import gremlin.macro
 import gremlin.plugin_manager
 import gremlin.process_monitor
 import gremlin.profile
 import gremlin.repeater
+import gremlin.scheduler
 import gremlin.shared_state
 import gremlin.sendinput
 import gremlin.spline
@@ -16,7 +16,6 @@
 # along with this program.  If not, see <http://www.gnu.org/licenses/>.
 
 from abc import abstractmethod, ABCMeta
-from functools import partial
 import logging
 
 import dill
@@ -25,37 +24,98 @@ from . import base_classes, common, event_handler, fsm, input_devices, \
     joystick_handling, macro, util
 
 
-def smart_all(conditions):
-    """Returns True if all conditions are True, False otherwise.
+def compile_all(predicates):
+    """Returns a function evaluating to True if all predicates are True.
 
     Employs short circuiting in order to prevent unnecessary evaluations.
 
-    :param conditions the conditions to check
-    :return True if all conditions are True, False otherwise
+    :param predicates the predicates to check, each accepting the event and
+        value being processed
+    :return function evaluating the predicates for an event and value
     """
-    for condition in conditions:
-        if not condition():
-            return False
-    return True
+    if len(predicates) == 1:
+        return predicates[0]
+
+    def evaluate(event, value):
+        for predicate in predicates:
+            if not predicate(event, value):
+                return False
+        return True
+    return evaluate
 
 
-def smart_any(conditions):
-    """Returns True if any conditions is True, False if none is True.
+def compile_any(predicates):
+    """Returns a function evaluating to True if any predicate is True.
 
     Employs short circuiting in order to prevent unnecessary evaluations.
 
-    :param conditions the conditions to check
-    :return True if at least one condition is True, False otherwise
+    :param predicates the predicates to check, each accepting the event and
+        value being processed
+    :return function evaluating the predicates for an event and value
     """
-    for condition in conditions:
-        if condition():
-            return True
-    return False
+    if len(predicates) == 1:
+        return predicates[0]
+
+    def evaluate(event, value):
+        for predicate in predicates:
+            if predicate(event, value):
+                return True
+        return False
+    return evaluate
+
+
+def compile_input_state_condition(
+        input_type,
+        comparison,
+        device_guid,
+        input_id,
+        value_range
+):
+    """Returns a predicate checking the state of a joystick input.
+
+    :param input_type the type of the input to check
+    :param comparison the comparison operation to perform
+    :param device_guid GUID of the device the input belongs to
+    :param input_id the index of the input
+    :param value_range the range an axis value has to be inside or outside of
+    :return predicate checking the input's state, None if the input type is
+        not supported
+    """
+    state = event_handler.InputStateCache()
+
+    if input_type == common.InputType.JoystickAxis:
+        low, high = value_range
+        if comparison == "inside":
+            return lambda event, value: \
+                low <= state.axis(device_guid, input_id) <= high
+        elif comparison == "outside":
+            return lambda event, value: \
+                not low <= state.axis(device_guid, input_id) <= high
+        else:
+            return lambda event, value: False
+    elif input_type == common.InputType.JoystickButton:
+        if comparison == "pressed":
+            return lambda event, value: state.button(device_guid, input_id)
+        else:
+            return lambda event, value: \
+                not state.button(device_guid, input_id)
+    elif input_type == common.InputType.JoystickHat:
+        direction = util.hat_direction_to_tuple(comparison)
+        return lambda event, value: \
+            state.hat(device_guid, input_id) == direction
+    else:
+        return None
 
 
 class Value:
 
-    """Represents an input value, keeping track of raw and "seen" value."""
+    """Represents an input value, keeping track of raw and "seen" value.
+
+    Both raw and current value are immutable, i.e. float, bool, or tuple,
+    which allows copying a value instance without copying its contents.
+    """
+
+    __slots__ = ("_raw", "_current")
 
     def __init__(self, raw):
         """Creates a new value and initializes it.
@@ -65,6 +125,16 @@ class Value:
         self._raw = raw
         self._current = raw
 
+    def copy(self):
+        """Returns an independent copy of this value.
+
+        :return new Value instance with the same raw and current value
+        """
+        value = Value.__new__(Value)
+        value._raw = self._raw
+        value._current = self._current
+        return value
+
     @property
     def raw(self):
         """Returns the raw unmodified value.
@@ -99,14 +169,28 @@ class ActivationCondition:
     True or False.
     """
 
+    # Conditions only read state and can be evaluated by any thread
+    thread_safe = True
+
     rule_function = {
-        base_classes.ActivationRule.All: smart_all,
-        base_classes.ActivationRule.Any: smart_any
+        base_classes.ActivationRule.All: compile_all,
+        base_classes.ActivationRule.Any: compile_any
     }
 
     def __init__(self, conditions, rule):
+        """Creates a new instance.
+
+        The conditions are compiled into a single function once, with the
+        cheapest conditions being evaluated first.
+
+        :param conditions the conditions to evaluate
+        :param rule the ActivationRule used to combine the conditions
+        """
         self._conditions = conditions
         self._rule = rule
+        self._evaluate = ActivationCondition.rule_function[rule]([
+            c.compile() for c in sorted(conditions, key=lambda c: c.cost)
+        ])
 
     def process_event(self, event, value):
         """Returns whether or not a condition is satisfied, i.e. true.
@@ -115,9 +199,7 @@ class ActivationCondition:
         :param value process event value
         :return True if all conditions are satisfied, False otherwise
         """
-        return ActivationCondition.rule_function[self._rule](
-            [partial(c, event, value) for c in self._conditions]
-        )
+        return self._evaluate(event, value)
 
 
 class AbstractCondition(metaclass=ABCMeta):
@@ -128,6 +210,10 @@ class AbstractCondition(metaclass=ABCMeta):
     as possibly processed Value when being evaluated.
     """
 
+    # Relative cost of evaluating the condition, cheaper conditions are
+    # evaluated first
+    cost = 0
+
     def __init__(self, comparison):
         """Creates a new condition with a specific comparision operation.
 
@@ -145,6 +231,16 @@ class AbstractCondition(metaclass=ABCMeta):
         """
         pass
 
+    def compile(self):
+        """Returns a function evaluating this condition.
+
+        Subclasses return functions specialized to their configuration,
+        avoiding the evaluation of the configuration on every call.
+
+        :return function accepting the event and value to evaluate
+        """
+        return self
+
 
 class KeyboardCondition(AbstractCondition):
 
@@ -154,6 +250,8 @@ class KeyboardCondition(AbstractCondition):
     particular key is pressed or released.
     """
 
+    cost = 2
+
     def __init__(self, scan_code, is_extended, comparison):
         """Creates a new instance.
 
@@ -164,6 +262,18 @@ class KeyboardCondition(AbstractCondition):
         super().__init__(comparison)
         self.key = macro.key_from_code(scan_code, is_extended)
 
+    def compile(self):
+        """Returns a function evaluating this condition.
+
+        :return function accepting the event and value to evaluate
+        """
+        keyboard = input_devices.Keyboard()
+        key = self.key
+        if self.comparison == "pressed":
+            return lambda event, value: keyboard.is_pressed(key)
+        else:
+            return lambda event, value: not keyboard.is_pressed(key)
+
     def __call__(self, event, value):
         """Evaluates the condition using the condition and provided data.
 
@@ -188,6 +298,8 @@ class JoystickCondition(AbstractCondition):
     one of eight possible directions.
     """
 
+    cost = 1
+
     def __init__(self, condition):
         """Creates a new instance.
 
@@ -199,6 +311,20 @@ class JoystickCondition(AbstractCondition):
         self.input_id = condition.input_id
         self.condition = condition
 
+    def compile(self):
+        """Returns a function evaluating this condition.
+
+        :return function accepting the event and value to evaluate
+        """
+        predicate = compile_input_state_condition(
+            self.input_type,
+            self.comparison,
+            self.device_guid,
+            self.input_id,
+            self.condition.range
+        )
+        return self if predicate is None else predicate
+
     def __call__(self, event, value):
         """Evaluates the condition using the condition and provided data.
 
@@ -206,11 +332,11 @@ class JoystickCondition(AbstractCondition):
         :param value the possibly modified value
         :return True if the condition is satisfied, False otherwise
         """
-        joy = input_devices.JoystickProxy()[self.device_guid]
+        state = event_handler.InputStateCache()
 
         if self.input_type == common.InputType.JoystickAxis:
             in_range = self.condition.range[0] <= \
-                       joy.axis(self.input_id).value <= \
+                       state.axis(self.device_guid, self.input_id) <= \
                        self.condition.range[1]
 
             if self.comparison in ["inside", "outside"]:
@@ -219,11 +345,11 @@ class JoystickCondition(AbstractCondition):
                 return False
         elif self.input_type == common.InputType.JoystickButton:
             if self.comparison == "pressed":
-                return joy.button(self.input_id).is_pressed
+                return state.button(self.device_guid, self.input_id)
             else:
-                return not joy.button(self.input_id).is_pressed
+                return not state.button(self.device_guid, self.input_id)
         elif self.input_type == common.InputType.JoystickHat:
-            return joy.hat(self.input_id).direction == \
+            return state.hat(self.device_guid, self.input_id) == \
                    util.hat_direction_to_tuple(self.comparison)
         else:
             logging.getLogger("system").warning(
@@ -242,6 +368,8 @@ class VJoyCondition(AbstractCondition):
     one of eight possible directions.
     """
 
+    cost = 1
+
     def __init__(self, condition):
         """Creates a new instance.
 
@@ -249,15 +377,29 @@ class VJoyCondition(AbstractCondition):
         """
         super().__init__(condition.comparison)
         self.vjoy_id = condition.vjoy_id
-        self.device_guid = None
-        for dev in joystick_handling.vjoy_devices():
-            if dev.vjoy_id == self.vjoy_id:
-                self.device_guid = dev.device_guid
-                break
+        self.device_guid = self._find_device_guid()
         self.input_type = condition.input_type
         self.input_id = condition.input_id
         self.condition = condition
 
+    def compile(self):
+        """Returns a function evaluating this condition.
+
+        :return function accepting the event and value to evaluate
+        """
+        # Without a device the condition has to keep looking for it
+        if self.device_guid is None:
+            return self
+
+        predicate = compile_input_state_condition(
+            self.input_type,
+            self.comparison,
+            self.device_guid,
+            self.input_id,
+            self.condition.range
+        )
+        return self if predicate is None else predicate
+
     def __call__(self, event, value):
         """Evaluates the condition using the condition and provided data.
 
@@ -265,16 +407,20 @@ class VJoyCondition(AbstractCondition):
         :param value the possibly modified value
         :return True if the condition is satisfied, False otherwise
         """
+        if self.device_guid is None:
+            # The device may have been unavailable when the condition was
+            # created
+            self.device_guid = self._find_device_guid()
         if self.device_guid is None:
             logging.getLogger("system").warning(
                 "GUID for vJoy {} not found".format(self.vjoy_id)
             )
             return False
-        joy = input_devices.JoystickProxy()[self.device_guid]
+        state = event_handler.InputStateCache()
 
         if self.input_type == common.InputType.JoystickAxis:
             in_range = self.condition.range[0] <= \
-                       joy.axis(self.input_id).value <= \
+                       state.axis(self.device_guid, self.input_id) <= \
                        self.condition.range[1]
 
             if self.comparison in ["inside", "outside"]:
@@ -283,11 +429,11 @@ class VJoyCondition(AbstractCondition):
                 return False
         elif self.input_type == common.InputType.JoystickButton:
             if self.comparison == "pressed":
-                return joy.button(self.input_id).is_pressed
+                return state.button(self.device_guid, self.input_id)
             else:
-                return not joy.button(self.input_id).is_pressed
+                return not state.button(self.device_guid, self.input_id)
         elif self.input_type == common.InputType.JoystickHat:
-            return joy.hat(self.input_id).direction == \
+            return state.hat(self.device_guid, self.input_id) == \
                    util.hat_direction_to_tuple(self.comparison)
         else:
             logging.getLogger("system").warning(
@@ -295,6 +441,16 @@ class VJoyCondition(AbstractCondition):
             )
             return False
 
+    def _find_device_guid(self):
+        """Returns the GUID of the vJoy device the condition refers to.
+
+        :return GUID of the vJoy device, None if it could not be found
+        """
+        for dev in joystick_handling.vjoy_devices():
+            if dev.vjoy_id == self.vjoy_id:
+                return dev.device_guid
+        return None
+
 
 class InputActionCondition(AbstractCondition):
 
@@ -311,6 +467,20 @@ class InputActionCondition(AbstractCondition):
         """
         super().__init__(comparison)
 
+    def compile(self):
+        """Returns a function evaluating this condition.
+
+        :return function accepting the event and value to evaluate
+        """
+        if self.comparison == "pressed":
+            return lambda event, value: value.current
+        elif self.comparison == "released":
+            return lambda event, value: not value.current
+        elif self.comparison == "always":
+            return lambda event, value: True
+        else:
+            return lambda event, value: False
+
     def __call__(self, event, value):
         """Evaluates the condition using the condition and provided data.
 
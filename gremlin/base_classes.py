@@ -453,6 +453,10 @@ class AbstractFunctor(metaclass=ABCMeta):
     These classes are used in the internal code execution system.
     """
 
+    # Whether or not the functor may run concurrently with the functors of
+    # other inputs, i.e. it does not modify state shared between inputs
+    thread_safe = False
+
     def __init__(self, instance):
         """Creates a new instance, extracting needed information.
 
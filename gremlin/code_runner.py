@@ -23,10 +23,12 @@ import string
 import sys
 import time
 
+from PyQt5 import QtCore
+
 import dill
 
 import gremlin
-from gremlin import event_handler, input_devices, \
+from gremlin import config, event_handler, input_devices, instrumentation, \
     joystick_handling, macro, sendinput, user_plugin, util
 import vjoy as vjoy_module
 
@@ -46,6 +48,8 @@ class CodeRunner:
         self._vjoy_curves = VJoyCurves()
         self._merge_axes = []
         self._running = False
+        self._direct_dispatch = False
+        self._process_event = self.event_handler.process_event
 
     def is_running(self):
         """Returns whether or not the code runner is executing code.
@@ -73,8 +77,18 @@ class CodeRunner:
             if settings.startup_mode in gremlin.profile.mode_list(profile):
                 start_mode = settings.startup_mode
 
-        # Set default macro action delay
+        # Select how vJoy axes evaluate deadzone and response curve
+        vjoy_module.vjoy.Axis.lookup_resolution = \
+            config.Configuration().axis_lookup_resolution
+
+        # Configure macro execution
         gremlin.macro.MacroManager().default_delay = settings.default_delay
+        gremlin.macro.MacroManager().precise_timing = \
+            config.Configuration().precise_macro_timing
+
+        # Replace callbacks with timed versions if latencies are recorded
+        record_latencies = config.Configuration().record_latencies
+        instrumentation.Instrumentation().clear()
 
         # Retrieve list of current paths searched by Python
         system_paths = [os.path.normcase(os.path.abspath(p)) for p in sys.path]
@@ -172,15 +186,30 @@ class CodeRunner:
                                         "Incomplete container ignored"
                                     )
                                     continue
-                                callbacks.extend(container.generate_callbacks())
-
-                            for cb_data in callbacks:
+                                callbacks.extend(
+                                    (container, cb_data) for cb_data
+                                    in container.generate_callbacks()
+                                )
+
+                            for container, cb_data in callbacks:
+                                callback = cb_data.callback
+                                if record_latencies:
+                                    callback = \
+                                        instrumentation.instrument_callback(
+                                            callback,
+                                            device.name,
+                                            instrumentation.input_name(
+                                                input_item.input_type,
+                                                input_item.input_id
+                                            ),
+                                            container.name
+                                        )
                                 if cb_data.event is None:
                                     self.event_handler.add_callback(
                                         device.device_guid,
                                         mode.name,
                                         event,
-                                        cb_data.callback,
+                                        callback,
                                         input_item.always_execute
                                     )
                                 else:
@@ -188,7 +217,7 @@ class CodeRunner:
                                         dill.GUID_Virtual,
                                         mode.name,
                                         cb_data.event,
-                                        cb_data.callback,
+                                        callback,
                                         input_item.always_execute
                                     )
 
@@ -245,18 +274,64 @@ class CodeRunner:
                     vjoy_proxy.axis(linear_index=aid).set_absolute_value(value)
 
             # Connect signals
+            self._process_event = self.event_handler.process_event
+            if record_latencies:
+                device_names = {
+                    guid: device.name
+                    for guid, device in profile.devices.items()
+                }
+                self._process_event = instrumentation.timed_event_handler(
+                    self.event_handler.process_event,
+                    device_names
+                )
+
+                # Trace events from their reception to the outputs they cause
+                tracer = instrumentation.LatencyTracer()
+                tracer.start(device_names)
+                self.event_handler.tracer = tracer
+                vjoy_module.vjoy.output_hook = tracer.record_output
+                sendinput.output_hook = tracer.record_output
             evt_listener = event_handler.EventListener()
             kb = input_devices.Keyboard()
-            evt_listener.keyboard_event.connect(
-                self.event_handler.process_event
-            )
-            evt_listener.joystick_event.connect(
-                self.event_handler.process_event
-            )
-            evt_listener.virtual_event.connect(
-                self.event_handler.process_event
+            self.event_handler.batch_vjoy_updates = \
+                config.Configuration().batch_vjoy_updates
+            self.event_handler.start_lanes(
+                config.Configuration().dispatch_lanes
             )
+            self._direct_dispatch = config.Configuration().direct_dispatch
+            if self._direct_dispatch:
+                # Process all events on the dispatch thread such that
+                # callbacks never run concurrently with each other
+                evt_listener.start_direct_dispatch(
+                    self._process_event
+                )
+                evt_listener.keyboard_event.connect(
+                    evt_listener.dispatch_direct,
+                    QtCore.Qt.DirectConnection
+                )
+                evt_listener.virtual_event.connect(
+                    evt_listener.dispatch_direct,
+                    QtCore.Qt.DirectConnection
+                )
+                evt_listener.deferred_event.connect(
+                    evt_listener.dispatch_direct,
+                    QtCore.Qt.DirectConnection
+                )
+            else:
+                evt_listener.keyboard_event.connect(
+                    self._process_event
+                )
+                evt_listener.joystick_event.connect(
+                    self._process_event
+                )
+                evt_listener.virtual_event.connect(
+                    self._process_event
+                )
+                evt_listener.deferred_event.connect(
+                    self._process_event
+                )
             evt_listener.keyboard_event.connect(kb.keyboard_event)
+            evt_listener.start_axis_coalescing()
             evt_listener.gremlin_active = True
 
             input_devices.periodic_registry.start()
@@ -266,6 +341,8 @@ class CodeRunner:
             self.event_handler.resume()
             self._running = True
 
+            sendinput.MouseController().update_rate = \
+                config.Configuration().mouse_update_rate
             sendinput.MouseController().start()
         except ImportError as e:
             util.display_error(
@@ -279,10 +356,20 @@ class CodeRunner:
         if self._running:
             evt_lst = event_handler.EventListener()
             kb = input_devices.Keyboard()
-            evt_lst.keyboard_event.disconnect(self.event_handler.process_event)
-            evt_lst.joystick_event.disconnect(self.event_handler.process_event)
-            evt_lst.virtual_event.disconnect(self.event_handler.process_event)
+            if self._direct_dispatch:
+                evt_lst.keyboard_event.disconnect(evt_lst.dispatch_direct)
+                evt_lst.virtual_event.disconnect(evt_lst.dispatch_direct)
+                evt_lst.deferred_event.disconnect(evt_lst.dispatch_direct)
+                evt_lst.stop_direct_dispatch()
+            else:
+                evt_lst.keyboard_event.disconnect(self._process_event)
+                evt_lst.joystick_event.disconnect(
+                    self._process_event
+                )
+                evt_lst.virtual_event.disconnect(self._process_event)
+                evt_lst.deferred_event.disconnect(self._process_event)
             evt_lst.keyboard_event.disconnect(kb.keyboard_event)
+            evt_lst.stop_axis_coalescing()
             evt_lst.gremlin_active = False
             self.event_handler.mode_changed.disconnect(
                 self._vjoy_curves.mode_changed
@@ -290,6 +377,7 @@ class CodeRunner:
         self._running = False
 
         # Empty callback registry
+        self.event_handler.stop_lanes()
         input_devices.callback_registry.clear()
         self.event_handler.clear()
 
@@ -300,6 +388,11 @@ class CodeRunner:
         macro.MacroManager().stop()
         sendinput.MouseController().stop()
 
+        # Stop tracing latencies
+        self.event_handler.tracer = None
+        vjoy_module.vjoy.output_hook = None
+        sendinput.output_hook = None
+
         # Remove all claims on VJoy devices
         joystick_handling.VJoyProxy.reset()
 
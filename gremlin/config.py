@@ -123,6 +123,44 @@ class Configuration:
 
         return self._data["calibration"][identifier][axis_name]
 
+    def set_axis_coalescing(self, dev_id, axis_id, window, threshold):
+        """Sets the event coalescing parameters of an axis.
+
+        These parameters are not exposed in the user interface and are
+        only changed by editing the "axis_coalescing" entry of the
+        configuration file.
+
+        :param dev_id the id of the device
+        :param axis_id the id of the axis
+        :param window duration in seconds within which only the most recent
+            axis event is processed, 0 disables this
+        :param threshold minimum change in vJoy units, i.e. out of 32768,
+            required for an axis event to be processed, 0 disables this
+        """
+        identifier = str(dev_id)
+        axis_name = "axis_{}".format(axis_id)
+        coalescing = self._data.setdefault("axis_coalescing", {})
+        if window <= 0 and threshold <= 0:
+            coalescing.get(identifier, {}).pop(axis_name, None)
+        else:
+            coalescing.setdefault(identifier, {})[axis_name] = [
+                float(window), int(threshold)
+            ]
+        self.save()
+
+    def get_axis_coalescing(self, dev_id, axis_id):
+        """Returns the event coalescing parameters of an axis.
+
+        :param dev_id the id of the device
+        :param axis_id the id of the axis
+        :return window duration in seconds and minimum change in vJoy units
+        """
+        identifier = str(dev_id)
+        axis_name = "axis_{}".format(axis_id)
+        return self._data.get("axis_coalescing", {}).get(
+            identifier, {}
+        ).get(axis_name, [0.0, 0])
+
     def get_executable_list(self):
         """Returns a list of all executables with associated profiles.
 
@@ -380,6 +418,114 @@ class Configuration:
         self._data["mode_change_message"] = bool(value)
         self.save()
 
+    @property
+    def direct_dispatch(self):
+        """Returns whether joystick events bypass the Qt event loop.
+
+        :return True if joystick events are processed by a dedicated
+            dispatch thread, False if they are processed by the GUI thread
+        """
+        return self._data.get("direct_dispatch", False)
+
+    @direct_dispatch.setter
+    def direct_dispatch(self, value):
+        """Sets whether joystick events bypass the Qt event loop.
+
+        :param value True to process joystick events in a dedicated thread,
+            False to process them in the GUI thread
+        """
+        self._data["direct_dispatch"] = bool(value)
+        self.save()
+
+    @property
+    def batch_vjoy_updates(self):
+        """Returns whether vJoy changes caused by an input are batched.
+
+        :return True if all vJoy changes caused by a single input are
+            submitted together, False if each change is submitted directly
+        """
+        return self._data.get("batch_vjoy_updates", False)
+
+    @batch_vjoy_updates.setter
+    def batch_vjoy_updates(self, value):
+        """Sets whether vJoy changes caused by an input are batched.
+
+        :param value True to submit all vJoy changes caused by a single input
+            together, False to submit each change directly
+        """
+        self._data["batch_vjoy_updates"] = bool(value)
+        self.save()
+
+    @property
+    def axis_lookup_resolution(self):
+        """Returns the resolution of vJoy axis response lookup tables.
+
+        :return number of intervals used by the lookup table approximating
+            deadzone and response curve, 0 if they are evaluated directly
+        """
+        return self._data.get("axis_lookup_resolution", 0)
+
+    @axis_lookup_resolution.setter
+    def axis_lookup_resolution(self, value):
+        """Sets the resolution of vJoy axis response lookup tables.
+
+        :param value number of intervals of the lookup table, 0 to evaluate
+            deadzone and response curve directly
+        """
+        self._data["axis_lookup_resolution"] = int(value)
+        self.save()
+
+    @property
+    def dispatch_lanes(self):
+        """Returns the number of threads running input callbacks.
+
+        :return number of threads running input callbacks
+        """
+        return self._data.get("dispatch_lanes", 1)
+
+    @dispatch_lanes.setter
+    def dispatch_lanes(self, value):
+        """Sets the number of threads running input callbacks.
+
+        :param value number of threads running input callbacks
+        """
+        self._data["dispatch_lanes"] = int(value)
+        self.save()
+
+    @property
+    def record_latencies(self):
+        """Returns whether the processing latencies of inputs are recorded.
+
+        :return True if latency histograms are recorded, False otherwise
+        """
+        return self._data.get("record_latencies", False)
+
+    @record_latencies.setter
+    def record_latencies(self, value):
+        """Sets whether the processing latencies of inputs are recorded.
+
+        :param value True to record latency histograms, False otherwise
+        """
+        self._data["record_latencies"] = bool(value)
+        self.save()
+
+    @property
+    def mouse_update_rate(self):
+        """Returns the number of mouse motion updates sent per second.
+
+        :return mouse motion update rate in Hz
+        """
+        return self._data.get("mouse_update_rate", 250)
+
+    @mouse_update_rate.setter
+    def mouse_update_rate(self, value):
+        """Sets the number of mouse motion updates sent per second.
+
+        :param value mouse motion update rate in Hz
+        """
+        self._data["mouse_update_rate"] = int(value)
+        self.save()
+
     @property
     def activate_on_launch(self):
         """Returns whether or not to activate the profile on launch.
@@ -474,6 +620,25 @@ class Configuration:
         self._data["macro_axis_minimum_change_rate"] = value
         self.save()
 
+    @property
+    def precise_macro_timing(self):
+        """Returns whether macro timing errors are compensated.
+
+        :return True if macro steps are scheduled against fixed deadlines,
+            False if each wait starts once the previous step finished
+        """
+        return self._data.get("precise_macro_timing", False)
+
+    @precise_macro_timing.setter
+    def precise_macro_timing(self, value):
+        """Sets whether macro timing errors are compensated.
+
+        :param value True to schedule macro steps against fixed deadlines,
+            False to start each wait once the previous step finished
+        """
+        self._data["precise_macro_timing"] = bool(value)
+        self.save()
+
     @property
     def macro_record_axis(self):
         return self._data.get("macro_record_axis", False)
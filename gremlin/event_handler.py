@@ -15,15 +15,18 @@
 # You should have received a copy of the GNU General Public License
 # along with this program.  If not, see <http://www.gnu.org/licenses/>.
 
+import collections
 import functools
 import inspect
 import logging
 import time
-from threading import Thread, Timer
+from threading import Condition, Event as ThreadingEvent, RLock, Thread, \
+    Timer, current_thread
 
 from PyQt5 import QtCore
 
 import dill
+from vjoy import vjoy
 from . import common, config, error, joystick_handling, windows_event_hook, \
     macro, util
 
@@ -45,8 +48,26 @@ class Event:
 
     The extended field is used for Keyboard events only to indicate
     whether or not the key's scan code is extended one.
+
+    The event type, identifier, and device GUID identify the input and are
+    used to compute the event's hash once upon creation, as such they must
+    not be modified afterwards.
+
+    The timestamp holds the time.perf_counter_ns value at which the event
+    was received from the device, or 0 for events of other origin.
     """
 
+    __slots__ = (
+        "event_type",
+        "identifier",
+        "device_guid",
+        "is_pressed",
+        "value",
+        "raw_value",
+        "timestamp",
+        "_key"
+    )
+
     def __init__(
             self,
             event_type,
@@ -54,7 +75,8 @@ class Event:
             device_guid,
             value=None,
             is_pressed=None,
-            raw_value=None
+            raw_value=None,
+            timestamp=0
     ):
         """Creates a new Event object.
 
@@ -66,6 +88,8 @@ class Event:
         :param is_pressed boolean flag indicating if a button or key
         :param raw_value the raw SDL value of the axis
             is pressed
+        :param timestamp time.perf_counter_ns value at which the event
+            was received
         """
         self.event_type = event_type
         self.identifier = identifier
@@ -73,51 +97,99 @@ class Event:
         self.is_pressed = is_pressed
         self.value = value
         self.raw_value = raw_value
+        self.timestamp = timestamp
+        self._key = Event.input_key(event_type, identifier, device_guid)
+
+    @staticmethod
+    def input_key(event_type, identifier, device_guid):
+        """Computes the integer key identifying a specific input.
+
+        The key is comprised of the events type, identifier of the
+        event source and the id of the event device. Events from the same
+        input, e.g. axis, button, hat, key, with different values / states
+        shall have the same key.
+
+        :param event_type the type of the input
+        :param identifier the identifier of the input
+        :param device_guid the GUID of the device the input belongs to
+        :return integer key identifying the input
+        """
+        if event_type == common.InputType.Keyboard:
+            return hash((
+                device_guid,
+                event_type.value,
+                identifier,
+                1 if identifier[1] else 0
+            ))
+        else:
+            return hash((
+                device_guid,
+                event_type.value,
+                identifier,
+                0
+            ))
+
+    @staticmethod
+    def from_template(
+            template,
+            value=None,
+            is_pressed=None,
+            raw_value=None,
+            timestamp=0
+    ):
+        """Creates a new event for the same input as the template event.
+
+        This reuses the template's key instead of computing it again, which
+        makes this the cheapest way to create events for a known input.
+
+        :param template event representing the input of the new event
+        :param value the value of a joystick axis or hat
+        :param is_pressed boolean flag indicating if a button or key
+            is pressed
+        :param raw_value the raw value of the axis
+        :param timestamp time.perf_counter_ns value at which the event
+            was received
+        :return new event with the provided state
+        """
+        event = Event.__new__(Event)
+        event.event_type = template.event_type
+        event.identifier = template.identifier
+        event.device_guid = template.device_guid
+        event.is_pressed = is_pressed
+        event.value = value
+        event.raw_value = raw_value
+        event.timestamp = timestamp
+        event._key = template._key
+        return event
 
     def clone(self):
         """Returns a clone of the event.
 
         :return cloned copy of this event
         """
-        return Event(
-            self.event_type,
-            self.identifier,
-            self.device_guid,
+        return Event.from_template(
+            self,
             self.value,
             self.is_pressed,
-            self.raw_value
+            self.raw_value,
+            self.timestamp
         )
 
     def __eq__(self, other):
-        return self.__hash__() == other.__hash__()
+        return self._key == hash(other)
 
     def __ne__(self, other):
         return not (self == other)
 
     def __hash__(self):
-        """Computes the hash value of this event.
+        """Returns the hash value of this event.
 
-        The hash is comprised of the events type, identifier of the
-        event source and the id of the event device. Events from the same
-        input, e.g. axis, button, hat, key, with different values / states
-        shall have the same hash.
+        Events from the same input, e.g. axis, button, hat, key, with
+        different values / states have the same hash.
 
         :return integer hash value of this event
         """
-        if self.event_type == common.InputType.Keyboard:
-            return hash((
-                self.device_guid,
-                self.event_type.value,
-                self.identifier,
-                1 if self.identifier[1] else 0
-            ))
-        else:
-            return hash((
-                self.device_guid,
-                self.event_type.value,
-                self.identifier,
-                0
-            ))
+        return self._key
 
     @staticmethod
     def from_key(key):
@@ -134,6 +206,525 @@ class Event:
         )
 
 
+class DeferredEvent(Event):
+
+    """Event running a single callback in place of those of its input.
+
+    A deferred event carries the key of the input it was created from. It
+    is therefore processed by the thread responsible for that input, in
+    order with the input's other events, and subject to the same locks,
+    batching, and mode and pause state, yet it only runs its own callback.
+    """
+
+    __slots__ = ("callback",)
+
+    @staticmethod
+    def from_event(event, callback):
+        """Creates a deferred event for the input of the given event.
+
+        :param event the event whose input and state to use
+        :param callback the function to run, called with the deferred event
+        :return new DeferredEvent instance
+        """
+        deferred = DeferredEvent.__new__(DeferredEvent)
+        deferred.event_type = event.event_type
+        deferred.identifier = event.identifier
+        deferred.device_guid = event.device_guid
+        deferred.is_pressed = event.is_pressed
+        deferred.value = event.value
+        deferred.raw_value = event.raw_value
+        deferred.timestamp = event.timestamp
+        deferred._key = event._key
+        deferred.callback = callback
+        return deferred
+
+
+# Callbacks of a single mode for the active and paused states, each a
+# dictionary mapping an input key to a tuple of callbacks, as well as the
+# set of input keys whose callbacks are all thread safe
+DispatchTable = collections.namedtuple(
+    "DispatchTable",
+    ["active", "paused", "thread_safe"]
+)
+
+
+class DirectDispatcher:
+
+    """Processes events in a dedicated thread instead of the Qt event loop.
+
+    Events are placed into a buffer by the producer, typically the DILL
+    callback, and consumed by a single worker thread which passes them on to
+    the provided callback. Appending to and popping from a deque are atomic
+    operations, thus neither side has to acquire a lock while the consumer
+    keeps up.
+
+    No button, hat, key, or other state transition is ever discarded. Should
+    the consumer fall behind by more than the buffer's capacity, axis events
+    are coalesced instead, i.e. only the most recent event of each axis is
+    kept in the place of the axis' first buffered event, which bounds the
+    latency of the remaining events.
+    """
+
+    def __init__(self, callback, capacity=1024):
+        """Creates a new instance.
+
+        :param callback the function to call with each event
+        :param capacity number of buffered events above which axis events
+            are coalesced
+        """
+        self._callback = callback
+        self._capacity = capacity
+        # Holds events as well as the keys of coalesced axes, whose most
+        # recent event is stored in _coalesced_axes
+        self._buffer = collections.deque()
+        self._coalesced_axes = {}
+        self._coalesce_lock = RLock()
+        self._has_events = ThreadingEvent()
+        self._running = False
+        self._thread = None
+        self.dropped_events = 0
+
+    def start(self):
+        """Starts the dispatch thread."""
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._running = True
+        self._thread = Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """Stops the dispatch thread, discarding any unprocessed events."""
+        self._running = False
+        self._has_events.set()
+        if self._thread is not None and self._thread.is_alive():
+            self._thread.join()
+        self._thread = None
+        with self._coalesce_lock:
+            self._buffer.clear()
+            self._coalesced_axes.clear()
+
+    def push(self, event):
+        """Adds an event to the buffer of events to process.
+
+        :param event the event to process
+        """
+        if event.event_type == common.InputType.JoystickAxis and \
+                not isinstance(event, DeferredEvent) and \
+                (len(self._buffer) >= self._capacity or
+                 len(self._coalesced_axes) > 0):
+            self._push_axis_event(event)
+        else:
+            self._buffer.append(event)
+        self._has_events.set()
+
+    def process(self, event):
+        """Processes an event on the dispatch thread.
+
+        Events produced while processing another event, such as those of
+        virtual buttons, are processed immediately, as they would be when
+        dispatched by Qt. Events from other threads are buffered.
+
+        :param event the event to process
+        """
+        if current_thread() is self._thread:
+            self._callback(event)
+        else:
+            self.push(event)
+
+    def _push_axis_event(self, event):
+        """Adds an axis event, coalescing it with buffered ones if needed.
+
+        Once an axis has a coalesced event all its later events replace
+        that one until it is processed, as the order of the axis' events
+        would not be preserved otherwise.
+
+        :param event the axis event to process
+        """
+        key = hash(event)
+        with self._coalesce_lock:
+            if key in self._coalesced_axes:
+                # The buffered event of the axis is superseded
+                self.dropped_events += 1
+                self._coalesced_axes[key] = event
+            elif len(self._buffer) >= self._capacity:
+                self._coalesced_axes[key] = event
+                self._buffer.append(key)
+            else:
+                self._buffer.append(event)
+
+    def _run(self):
+        """Processes buffered events until stopped."""
+        while self._running:
+            self._has_events.wait()
+            # Clear the flag before draining the buffer so that events
+            # pushed while draining trigger another iteration
+            self._has_events.clear()
+            while self._running:
+                try:
+                    event = self._buffer.popleft()
+                except IndexError:
+                    break
+
+                if not isinstance(event, Event):
+                    with self._coalesce_lock:
+                        event = self._coalesced_axes.pop(event)
+
+                try:
+                    self._callback(event)
+                except Exception as e:
+                    logging.getLogger("system").exception(
+                        "Error while processing event: {}".format(e)
+                    )
+
+
+class LaneDispatcher:
+
+    """Processes events on several threads while keeping the order of each
+    input.
+
+    Each lane is a DirectDispatcher with its own thread. Events are assigned
+    to lanes by a shard value, such that all events of an input are
+    processed by the same lane in the order they were received. Events whose
+    callbacks are not thread safe are all placed into the first lane.
+
+    As Python code only runs on one core at a time this mainly helps when
+    callbacks wait, for example on speech output, I/O, or driver calls,
+    preventing them from delaying the callbacks of other inputs.
+    """
+
+    def __init__(self, callback, lane_count, capacity=1024):
+        """Creates a new instance.
+
+        :param callback the function to call with each event
+        :param lane_count number of lanes processing events
+        :param capacity number of events buffered by each lane above which
+            its axis events are coalesced
+        """
+        self._lanes = tuple(
+            DirectDispatcher(callback, capacity) for _ in range(lane_count)
+        )
+
+    @property
+    def lane_count(self):
+        """Returns the number of lanes.
+
+        :return number of lanes processing events
+        """
+        return len(self._lanes)
+
+    @property
+    def dropped_events(self):
+        """Returns the number of superseded axis events discarded by all
+        lanes.
+
+        :return number of discarded axis events
+        """
+        return sum(lane.dropped_events for lane in self._lanes)
+
+    def start(self):
+        """Starts the threads of all lanes."""
+        for lane in self._lanes:
+            lane.start()
+
+    def stop(self):
+        """Stops the threads of all lanes, discarding unprocessed events."""
+        for lane in self._lanes:
+            lane.stop()
+
+    def push(self, event, shard):
+        """Adds an event to the lane corresponding to the shard value.
+
+        :param event the event to process
+        :param shard value selecting the lane, 0 selects the first lane
+        """
+        self._lanes[shard % len(self._lanes)].push(event)
+
+
+class AxisEventCoalescer:
+
+    """Reduces the number of axis events that need processing.
+
+    Each axis can be configured with a window and a threshold. Within a
+    window only the most recent event of an axis is passed on once the
+    window expires, while the first event after a quiet period is passed on
+    immediately. Events which change the axis value by less than the
+    threshold, given in vJoy units, compared to the last event passed on, or
+    the event waiting for its window to expire if there is one, are dropped,
+    unless they represent a fully deflected axis.
+    """
+
+    # Number of vJoy units corresponding to half the axis range
+    vjoy_half_range = 16384
+
+    def __init__(self, callback, settings):
+        """Creates a new instance.
+
+        :param callback the function receiving the events passed on
+        :param settings dictionary mapping the key of an axis event to the
+            (window, threshold) parameters to use for it
+        """
+        self._callback = callback
+        self._settings = settings
+        self._last_units = {}
+        self._last_time = {}
+        self._pending = {}
+        self._deadlines = {}
+        self._statistics = {}
+        self._condition = Condition()
+        self._running = True
+        self._thread = Thread(target=self._flush_loop, daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """Stops the thread passing on delayed events."""
+        with self._condition:
+            self._running = False
+            self._condition.notify()
+        self._thread.join()
+
+    def process(self, event):
+        """Passes the axis event on if required.
+
+        :param event the axis event to process
+        """
+        key = hash(event)
+        settings = self._settings.get(key)
+        if settings is None:
+            self._callback(event)
+            return
+
+        window, threshold = settings
+        units = self._to_units(event)
+        with self._condition:
+            stats = self._statistics.setdefault(key, [event, 0, 0])
+            last_units = self._last_units.get(key)
+            pending = self._pending.get(key)
+            if threshold > 0 and abs(event.value) < 1.0:
+                # A pending event will be passed on in place of the last
+                # one and is therefore the value to compare against
+                reference = last_units if pending is None \
+                    else self._to_units(pending)
+                if reference is not None and \
+                        abs(units - reference) < threshold:
+                    stats[2] += 1
+                    if pending is not None:
+                        if abs(units - last_units) < threshold:
+                            # Back to the value last passed on, nothing
+                            # remains to be sent
+                            del self._pending[key]
+                            del self._deadlines[key]
+                        else:
+                            self._pending[key] = event
+                    return
+
+            if window > 0:
+                now = time.perf_counter()
+                last_time = self._last_time.get(key)
+                if last_time is not None and now - last_time < window:
+                    if pending is not None:
+                        stats[2] += 1
+                    else:
+                        self._deadlines[key] = last_time + window
+                        self._condition.notify()
+                    self._pending[key] = event
+                    return
+                self._last_time[key] = now
+
+            if pending is not None:
+                # The window expired before the pending event was flushed,
+                # this event supersedes it
+                del self._pending[key]
+                del self._deadlines[key]
+                stats[2] += 1
+            self._last_units[key] = units
+            stats[1] += 1
+        self._callback(event)
+
+    def statistics(self):
+        """Returns the number of passed on and suppressed events per axis.
+
+        :return dictionary mapping (device_guid, axis_id) to a tuple of
+            the number of events passed on and suppressed
+        """
+        with self._condition:
+            return {
+                (entry[0].device_guid, entry[0].identifier):
+                    (entry[1], entry[2])
+                for entry in self._statistics.values()
+            }
+
+    def _flush_loop(self):
+        """Passes on delayed events once their window expires."""
+        while True:
+            due_events = []
+            with self._condition:
+                if not self._running:
+                    return
+
+                if len(self._deadlines) == 0:
+                    self._condition.wait()
+                else:
+                    now = time.perf_counter()
+                    timeout = min(self._deadlines.values()) - now
+                    if timeout > 0:
+                        self._condition.wait(timeout)
+                        continue
+
+                    for key, deadline in list(self._deadlines.items()):
+                        if deadline <= now:
+                            event = self._pending.pop(key)
+                            del self._deadlines[key]
+                            self._last_time[key] = now
+                            self._last_units[key] = self._to_units(event)
+                            self._statistics[key][1] += 1
+                            due_events.append(event)
+
+            for event in due_events:
+                self._callback(event)
+
+    @staticmethod
+    def _to_units(event):
+        """Returns the value of an axis event in vJoy units.
+
+        :param event the axis event whose value to convert
+        :return value of the event in vJoy units
+        """
+        return int(event.value * AxisEventCoalescer.vjoy_half_range)
+
+
+@common.SingletonDecorator
+class InputStateCache:
+
+    """Stores the most recent state of every joystick input.
+
+    The state is updated by the EventListener from the joystick event stream
+    which allows reading the state of any input without querying the
+    device. Inputs that have not produced an event yet are read from the
+    device once and then served from the cache.
+
+    Every update increments the version of the cache and the version at
+    which an input was last updated is stored alongside its state. This
+    allows consumers to detect whether or not state they hold is stale.
+    Updates are only performed by the thread receiving joystick events.
+    """
+
+    def __init__(self):
+        """Creates a new instance."""
+        self._state = {}
+        self._version = 0
+
+    @property
+    def version(self):
+        """Returns the version of the most recent update.
+
+        :return current version of the cache
+        """
+        return self._version
+
+    def update(self, device_guid, input_type, input_id, value):
+        """Stores the state of a single input.
+
+        :param device_guid GUID of the device the input belongs to
+        :param input_type the type of the input
+        :param input_id the index of the input
+        :param value the new state of the input
+        """
+        self._version += 1
+        self._state[(device_guid, input_type, input_id)] = \
+            (value, self._version)
+
+    def input_version(self, device_guid, input_type, input_id):
+        """Returns the version at which an input was last updated.
+
+        :param device_guid GUID of the device the input belongs to
+        :param input_type the type of the input
+        :param input_id the index of the input
+        :return version of the last update, 0 if the input's state was never
+            received via an event
+        """
+        entry = self._state.get((device_guid, input_type, input_id))
+        return 0 if entry is None else entry[1]
+
+    def axis(self, device_guid, input_id):
+        """Returns the value of an axis.
+
+        :param device_guid GUID of the device the axis belongs to
+        :param input_id the index of the axis
+        :return uncalibrated value of the axis in the range [-1, 1]
+        """
+        entry = self._state.get(
+            (device_guid, common.InputType.JoystickAxis, input_id)
+        )
+        if entry is not None:
+            return entry[0]
+        return self._fill(
+            device_guid,
+            common.InputType.JoystickAxis,
+            input_id,
+            dill.DILL.get_axis(device_guid, input_id) / float(32768)
+        )
+
+    def button(self, device_guid, input_id):
+        """Returns the state of a button.
+
+        :param device_guid GUID of the device the button belongs to
+        :param input_id the index of the button
+        :return True if the button is pressed, False otherwise
+        """
+        entry = self._state.get(
+            (device_guid, common.InputType.JoystickButton, input_id)
+        )
+        if entry is not None:
+            return entry[0]
+        return self._fill(
+            device_guid,
+            common.InputType.JoystickButton,
+            input_id,
+            bool(dill.DILL.get_button(device_guid, input_id))
+        )
+
+    def hat(self, device_guid, input_id):
+        """Returns the direction of a hat.
+
+        :param device_guid GUID of the device the hat belongs to
+        :param input_id the index of the hat
+        :return direction of the hat as a tuple
+        """
+        entry = self._state.get(
+            (device_guid, common.InputType.JoystickHat, input_id)
+        )
+        if entry is not None:
+            return entry[0]
+        return self._fill(
+            device_guid,
+            common.InputType.JoystickHat,
+            input_id,
+            util.dill_hat_lookup[dill.DILL.get_hat(device_guid, input_id)]
+        )
+
+    def clear(self):
+        """Removes all stored state."""
+        self._state = {}
+
+    def _fill(self, device_guid, input_type, input_id, value):
+        """Stores state read from the device without changing the version.
+
+        An event received in the meantime takes precedence over the value
+        read from the device.
+
+        :param device_guid GUID of the device the input belongs to
+        :param input_type the type of the input
+        :param input_id the index of the input
+        :param value the state read from the device
+        :return the state of the input
+        """
+        entry = self._state.setdefault(
+            (device_guid, input_type, input_id),
+            (value, 0)
+        )
+        return entry[0]
+
+
 @common.SingletonDecorator
 class EventListener(QtCore.QObject):
 
@@ -149,6 +740,8 @@ class EventListener(QtCore.QObject):
     mouse_event = QtCore.pyqtSignal(Event)
     # Signal emitted when virtual button events are received
     virtual_event = QtCore.pyqtSignal(Event)
+    # Signal emitted when deferred events are posted
+    deferred_event = QtCore.pyqtSignal(Event)
     # Signal emitted when a joystick is attached or removed
     device_change_event = QtCore.pyqtSignal()
 
@@ -163,9 +756,21 @@ class EventListener(QtCore.QObject):
         # Calibration function for each axis of all devices
         self._calibrations = {}
 
+        # Template events for every joystick input seen so far
+        self._input_templates = {}
+
         # Joystick device change update timeout timer
         self._device_update_timer = None
 
+        # Dispatcher processing joystick events outside of the Qt event loop
+        self._dispatcher = None
+
+        # Axis event coalescing stage, only present if configured
+        self._coalescer = None
+
+        # Most recent state of all joystick inputs
+        self._state_cache = InputStateCache()
+
         self._running = True
         self._keyboard_state = {}
         self.gremlin_active = False
@@ -179,6 +784,102 @@ class EventListener(QtCore.QObject):
         """Stops the loop from running."""
         self._running = False
         self.keyboard_hook.stop()
+        self.stop_direct_dispatch()
+        self.stop_axis_coalescing()
+
+    def start_direct_dispatch(self, callback):
+        """Processes joystick events in a dedicated thread.
+
+        Joystick events are passed to the provided callback from a worker
+        thread rather than via the joystick_event signal, bypassing the Qt
+        event loop. The joystick_event signal is still emitted so that UI
+        elements keep receiving updates. Keyboard, virtual, and deferred
+        events have to be passed to dispatch_direct, such that all
+        callbacks run on the same thread.
+
+        :param callback the function processing joystick events
+        """
+        self.stop_direct_dispatch()
+        self._dispatcher = DirectDispatcher(callback)
+        self._dispatcher.start()
+
+    def dispatch_direct(self, event):
+        """Processes an event on the direct dispatch thread.
+
+        This is safe to call from any thread and intended to be connected
+        to the keyboard_event, virtual_event, and deferred_event signals
+        with a direct connection. Events are ignored if direct dispatch is
+        not running.
+
+        :param event the event to process
+        """
+        dispatcher = self._dispatcher
+        if dispatcher is not None:
+            dispatcher.process(event)
+
+    def stop_direct_dispatch(self):
+        """Stops processing joystick events in a dedicated thread."""
+        if self._dispatcher is not None:
+            self._dispatcher.stop()
+            self._dispatcher = None
+
+    def start_axis_coalescing(self):
+        """Starts coalescing axis events based on the configuration.
+
+        Only axes with coalescing parameters configured are affected, if no
+        axis is configured events are published without any extra work.
+        """
+        self.stop_axis_coalescing()
+
+        cfg = config.Configuration()
+        settings = {}
+        for dev_info in joystick_handling.joystick_devices():
+            for entry in dev_info.axis_map:
+                window, threshold = cfg.get_axis_coalescing(
+                    dev_info.device_guid,
+                    entry.axis_index
+                )
+                if window > 0 or threshold > 0:
+                    key = Event.input_key(
+                        common.InputType.JoystickAxis,
+                        entry.axis_index,
+                        dev_info.device_guid
+                    )
+                    settings[key] = (window, threshold)
+
+        if len(settings) > 0:
+            self._coalescer = AxisEventCoalescer(
+                self.dispatch_joystick_event,
+                settings
+            )
+
+    def stop_axis_coalescing(self):
+        """Stops coalescing axis events."""
+        coalescer = self._coalescer
+        self._coalescer = None
+        if coalescer is not None:
+            coalescer.stop()
+
+    def axis_coalescing_statistics(self):
+        """Returns the number of passed on and suppressed axis events.
+
+        :return dictionary mapping (device_guid, axis_id) to a tuple of
+            the number of events passed on and suppressed
+        """
+        coalescer = self._coalescer
+        if coalescer is None:
+            return {}
+        return coalescer.statistics()
+
+    def dispatch_joystick_event(self, event):
+        """Publishes a joystick event.
+
+        :param event the joystick event to publish
+        """
+        dispatcher = self._dispatcher
+        if dispatcher is not None:
+            dispatcher.push(event)
+        self.joystick_event.emit(event)
 
     def reload_calibrations(self):
         """Reloads the calibration data from the configuration file."""
@@ -203,35 +904,94 @@ class EventListener(QtCore.QObject):
     def _joystick_event_handler(self, data):
         """Callback for joystick events.
 
-        The handler converts the event data into a signal which is then
-        emitted.
+        The handler converts the event data into an Event which is then
+        published.
 
         :param data the joystick event
         """
-        event = dill.InputEvent(data)
-        if event.input_type == dill.InputType.Axis:
-            self.joystick_event.emit(Event(
-                event_type=common.InputType.JoystickAxis,
-                device_guid=event.device_guid,
-                identifier=event.input_index,
-                value=self._apply_calibration(event),
-                raw_value=event.value
-            ))
-        elif event.input_type == dill.InputType.Button:
-            self.joystick_event.emit(Event(
-                event_type=common.InputType.JoystickButton,
-                device_guid=event.device_guid,
-                identifier=event.input_index,
-                is_pressed=event.value == 1
+        timestamp = time.perf_counter_ns()
+        template = self._input_templates.get(
+            (bytes(data.device_guid), data.input_type, data.input_index)
+        )
+        if template is None:
+            template = self._create_input_template(data)
+
+        self._state_cache.update(
+            template.device_guid,
+            template.event_type,
+            template.identifier,
+            self._cached_state(template.event_type, data.value)
+        )
+
+        if template.event_type == common.InputType.JoystickAxis:
+            event = Event.from_template(
+                template,
+                value=self._apply_calibration(
+                    template.device_guid,
+                    template.identifier,
+                    data.value
+                ),
+                raw_value=data.value,
+                timestamp=timestamp
+            )
+            coalescer = self._coalescer
+            if coalescer is not None:
+                coalescer.process(event)
+            else:
+                self.dispatch_joystick_event(event)
+        elif template.event_type == common.InputType.JoystickButton:
+            self.dispatch_joystick_event(Event.from_template(
+                template,
+                is_pressed=data.value == 1,
+                timestamp=timestamp
             ))
-        elif event.input_type == dill.InputType.Hat:
-            self.joystick_event.emit(Event(
-                event_type=common.InputType.JoystickHat,
-                device_guid=event.device_guid,
-                identifier=event.input_index,
-                value=util.dill_hat_lookup[event.value]
+        elif template.event_type == common.InputType.JoystickHat:
+            self.dispatch_joystick_event(Event.from_template(
+                template,
+                value=util.dill_hat_lookup[data.value],
+                timestamp=timestamp
             ))
 
+    def _cached_state(self, input_type, value):
+        """Returns the representation of a raw input value used by the cache.
+
+        :param input_type the type of the input
+        :param value the raw value reported by DILL
+        :return the value as stored in the InputStateCache
+        """
+        if input_type == common.InputType.JoystickAxis:
+            return value / float(32768)
+        elif input_type == common.InputType.JoystickButton:
+            return value == 1
+        else:
+            return util.dill_hat_lookup[value]
+
+    def _create_input_template(self, data):
+        """Creates and stores the template event for a joystick input.
+
+        Creating the GUID and hash of an event is comparatively costly and
+        only has to happen once per input with the template in place.
+
+        :param data the joystick event data of the input
+        :return template event for the input
+        """
+        event = dill.InputEvent(data)
+        input_type = {
+            dill.InputType.Axis: common.InputType.JoystickAxis,
+            dill.InputType.Button: common.InputType.JoystickButton,
+            dill.InputType.Hat: common.InputType.JoystickHat
+        }[event.input_type]
+
+        template = Event(
+            event_type=input_type,
+            device_guid=event.device_guid,
+            identifier=event.input_index
+        )
+        self._input_templates[
+            (bytes(data.device_guid), data.input_type, data.input_index)
+        ] = template
+        return template
+
     def _joystick_device_handler(self, data, action):
         """Callback for device change events.
 
@@ -251,6 +1011,7 @@ class EventListener(QtCore.QObject):
     def _run_device_list_update(self):
         """Performs the update of the devices connected."""
         joystick_handling.joystick_devices_initialization()
+        self._state_cache.clear()
         self._init_joysticks()
         self.device_change_event.emit()
 
@@ -302,12 +1063,19 @@ class EventListener(QtCore.QObject):
         # Allow the windows event to propagate further
         return True
 
-    def _apply_calibration(self, event):
-        key = (event.device_guid, event.input_index)
-        if key in self._calibrations:
-            return self._calibrations[key](event.value)
+    def _apply_calibration(self, device_guid, axis_index, value):
+        """Returns the calibrated value of an axis.
+
+        :param device_guid the GUID of the device the axis belongs to
+        :param axis_index the index of the axis
+        :param value the raw value of the axis
+        :return calibrated axis value
+        """
+        calibration = self._calibrations.get((device_guid, axis_index))
+        if calibration is not None:
+            return calibration(value)
         else:
-            return util.axis_calibration(event.value, -32768, 0, 32767)
+            return util.axis_calibration(value, -32768, 0, 32767)
 
     def _init_joysticks(self):
         """Initializes joystick devices."""
@@ -336,20 +1104,37 @@ class EventListener(QtCore.QObject):
 @common.SingletonDecorator
 class EventHandler(QtCore.QObject):
 
-    """Listens to the inputs from multiple different input devices."""
+    """Listens to the inputs from multiple different input devices.
+
+    Callbacks may run on the GUI thread or on dispatch threads. Changes to
+    the mode and pause state are serialized and can be made from any
+    thread, whereas anything bound to the GUI thread has to be run via
+    run_in_gui_thread.
+    """
 
     # Signal emitted when the mode is changed
     mode_changed = QtCore.pyqtSignal(str)
     # Signal emitted when the application is pause / resumed
     is_active = QtCore.pyqtSignal(bool)
+    # Signal used to run functions on the GUI thread
+    _gui_call = QtCore.pyqtSignal(object)
 
     def __init__(self):
         """Initializes the EventHandler instance."""
         QtCore.QObject.__init__(self)
+        self._state_lock = RLock()
+        # Held by lanes while running callbacks that are not thread safe
+        self._serial_lock = RLock()
+        self._gui_call.connect(self._run_gui_call, QtCore.Qt.QueuedConnection)
         self.process_callbacks = True
+        self.batch_vjoy_updates = False
+        self.tracer = None
         self.plugins = {}
         self.callbacks = {}
-        self._event_lookup = {}
+        self._dispatch_tables = {}
+        self._dispatch_table = DispatchTable({}, {}, frozenset())
+        self._callback_lookup = self._dispatch_table.active
+        self._lanes = None
         self._active_mode = None
         self._previous_mode = None
 
@@ -390,6 +1175,8 @@ class EventHandler(QtCore.QObject):
         :param permanent if True the callback is always active even
             if the system is paused
         """
+        # Determine thread safety before plugins wrap the callback
+        thread_safe = getattr(callback, "thread_safe", False)
         if device_guid not in self.callbacks:
             self.callbacks[device_guid] = {}
         if mode not in self.callbacks[device_guid]:
@@ -398,7 +1185,8 @@ class EventHandler(QtCore.QObject):
             self.callbacks[device_guid][mode][event] = []
         self.callbacks[device_guid][mode][event].append((
             self._install_plugins(callback),
-            permanent
+            permanent,
+            thread_safe
         ))
 
     def build_event_lookup(self, inheritance_tree):
@@ -406,6 +1194,15 @@ class EventHandler(QtCore.QObject):
 
         This takes mode inheritance into account.
 
+        :param inheritance_tree the tree of parent and children in the
+            inheritance structure
+        """
+        self._propagate_callbacks(inheritance_tree)
+        self._compile_dispatch_tables()
+
+    def _propagate_callbacks(self, inheritance_tree):
+        """Copies callbacks from parent modes into their children.
+
         :param inheritance_tree the tree of parent and children in the
             inheritance structure
         """
@@ -429,7 +1226,44 @@ class EventHandler(QtCore.QObject):
                                 device_cb[child][event] = callbacks
 
             # Recurse until we've dealt with all modes
-            self.build_event_lookup(children)
+            self._propagate_callbacks(children)
+
+    def _compile_dispatch_tables(self):
+        """Compiles the callbacks of each mode into dispatch tables.
+
+        Each mode's table maps the hash of an event, which identifies
+        device, input type, and input, to the tuple of callbacks to run.
+        Separate tuples are prepared for the active and paused states such
+        that no filtering has to happen while processing events.
+        """
+        tables = {}
+        thread_safe = {}
+        for modes in self.callbacks.values():
+            for mode, events in modes.items():
+                if mode not in tables:
+                    tables[mode] = DispatchTable({}, {}, frozenset())
+                    thread_safe[mode] = set()
+                table = tables[mode]
+                for event, callbacks in events.items():
+                    key = hash(event)
+                    table.active[key] = tuple(cb[0] for cb in callbacks)
+                    permanent = tuple(cb[0] for cb in callbacks if cb[1])
+                    if len(permanent) > 0:
+                        table.paused[key] = permanent
+                    if all(cb[2] for cb in callbacks):
+                        thread_safe[mode].add(key)
+        tables = {
+            mode: table._replace(thread_safe=frozenset(thread_safe[mode]))
+            for mode, table in tables.items()
+        }
+
+        with self._state_lock:
+            self._dispatch_tables = tables
+            self._dispatch_table = tables.get(
+                self._active_mode,
+                DispatchTable({}, {}, frozenset())
+            )
+            self._update_callback_lookup()
 
     def change_mode(self, new_mode):
         """Changes the currently active mode.
@@ -447,72 +1281,216 @@ class EventHandler(QtCore.QObject):
             )
 
         if mode_exists:
-            if self._active_mode != new_mode:
-                self._previous_mode = self._active_mode
+            with self._state_lock:
+                if self._active_mode != new_mode:
+                    self._previous_mode = self._active_mode
 
-            cfg = config.Configuration()
-            cfg.set_last_mode(cfg.last_profile, new_mode)
+                cfg = config.Configuration()
+                cfg.set_last_mode(cfg.last_profile, new_mode)
 
-            self._active_mode = new_mode
-            self.mode_changed.emit(self._active_mode)
+                self._active_mode = new_mode
+                self._dispatch_table = self._dispatch_tables.get(
+                    new_mode,
+                    DispatchTable({}, {}, frozenset())
+                )
+                self._update_callback_lookup()
+            self.mode_changed.emit(new_mode)
 
     def resume(self):
         """Resumes the processing of callbacks."""
-        self.process_callbacks = True
-        self.is_active.emit(self.process_callbacks)
+        self._set_active(True)
 
     def pause(self):
         """Stops the processing of callbacks."""
-        self.process_callbacks = False
-        self.is_active.emit(self.process_callbacks)
+        self._set_active(False)
 
     def toggle_active(self):
         """Toggles the processing of callbacks on or off."""
-        self.process_callbacks = not self.process_callbacks
-        self.is_active.emit(self.process_callbacks)
+        with self._state_lock:
+            is_active = not self.process_callbacks
+            self.process_callbacks = is_active
+            self._update_callback_lookup()
+        self.is_active.emit(is_active)
 
     def clear(self):
         """Removes all attached callbacks."""
-        self.callbacks = {}
+        with self._state_lock:
+            self.callbacks = {}
+            self._dispatch_tables = {}
+            self._dispatch_table = DispatchTable({}, {}, frozenset())
+            self._update_callback_lookup()
+
+    def run_in_gui_thread(self, fn):
+        """Runs a function on the GUI thread.
+
+        Callbacks interacting with widgets, media players, or other objects
+        bound to the GUI thread have to use this, as they may run on a
+        dispatch thread. The function is called immediately when invoked
+        from the GUI thread and queued otherwise.
+
+        :param fn the function to run, called without arguments
+        """
+        if QtCore.QThread.currentThread() == self.thread():
+            fn()
+        else:
+            self._gui_call.emit(fn)
+
+    def start_lanes(self, lane_count):
+        """Runs callbacks on the given number of threads.
+
+        Events of the same input are always processed by the same thread in
+        the order they arrive. Inputs with callbacks that are not thread
+        safe are all processed by the same thread. As a mode change can
+        alter the callbacks of an input after its event was assigned to a
+        lane, thread safety is checked again when the event is processed
+        and callbacks that are not thread safe never run concurrently.
+        With a single lane the callbacks run on the thread delivering the
+        events.
+
+        :param lane_count number of threads running callbacks
+        """
+        self.stop_lanes()
+        if lane_count > 1:
+            self._lanes = LaneDispatcher(self._run_lane_callbacks, lane_count)
+            self._lanes.start()
+
+    def stop_lanes(self):
+        """Runs callbacks on the thread delivering the events again."""
+        if self._lanes is not None:
+            self._lanes.stop()
+            self._lanes = None
+
+    def _set_active(self, is_active):
+        """Sets whether or not callbacks are processed.
+
+        :param is_active True to process callbacks, False to pause
+        """
+        with self._state_lock:
+            self.process_callbacks = is_active
+            self._update_callback_lookup()
+        self.is_active.emit(is_active)
+
+    def _run_gui_call(self, fn):
+        """Runs a function queued by run_in_gui_thread.
+
+        :param fn the function to run
+        """
+        try:
+            fn()
+        except Exception as e:
+            logging.getLogger("system").exception(
+                "Error while running function on the GUI thread: {}".format(e)
+            )
+
+    def _update_callback_lookup(self):
+        """Selects the lookup matching the current mode and pause state."""
+        if self.process_callbacks:
+            self._callback_lookup = self._dispatch_table.active
+        else:
+            self._callback_lookup = self._dispatch_table.paused
 
     @QtCore.pyqtSlot(Event)
     def process_event(self, event):
         """Processes a single event by passing it to all callbacks
         registered for this event.
 
+        If several lanes are in use the event is handed to the lane
+        responsible for its input instead of being processed immediately.
+
         :param event the event to process
         """
-        for cb in self._matching_callbacks(event):
-            try:
-                cb(event)
-            except error.VJoyError as e:
-                util.display_error(str(e))
-                logging.getLogger("system").exception(
-                    "VJoy related error: {}".format(e)
-                )
-                self.pause()
+        lanes = self._lanes
+        if lanes is not None:
+            key = hash(event)
+            if key in self._dispatch_table.thread_safe:
+                lanes.push(event, key)
+            else:
+                lanes.push(event, 0)
+        else:
+            self._run_callbacks(event)
 
-    def _matching_callbacks(self, event):
+    def _run_lane_callbacks(self, event):
+        """Runs the callbacks of an event processed by a lane.
+
+        :param event the event to process
+        """
+        # Thread safety and callbacks have to come from the same mode
+        with self._state_lock:
+            thread_safe = self._dispatch_table.thread_safe
+            lookup = self._callback_lookup
+        if hash(event) in thread_safe:
+            self._run_callbacks(event, lookup)
+        else:
+            with self._serial_lock:
+                self._run_callbacks(event, lookup)
+
+    def _run_callbacks(self, event, lookup=None):
+        """Runs all callbacks registered for the event.
+
+        If batching of vJoy updates is enabled all changes made to vJoy
+        devices by the callbacks are submitted together once all callbacks
+        have been run.
+
+        If a tracer is set it is informed about the start and end of the
+        event's processing, which attributes the outputs created by the
+        callbacks to the event.
+
+        :param event the event to process
+        :param lookup the callback lookup to use instead of the current one
+        """
+        tracer = self.tracer
+        if tracer is not None:
+            tracer.begin(event)
+        batch_updates = self.batch_vjoy_updates
+        if batch_updates:
+            vjoy.begin_batch()
+        try:
+            for cb in self._matching_callbacks(event, lookup):
+                try:
+                    cb(event)
+                except error.VJoyError as e:
+                    self._handle_vjoy_error(e)
+        finally:
+            if batch_updates:
+                try:
+                    vjoy.end_batch()
+                except error.VJoyError as e:
+                    self._handle_vjoy_error(e)
+            if tracer is not None:
+                tracer.end(event)
+
+    def _handle_vjoy_error(self, e):
+        """Reports a vJoy error and stops processing events.
+
+        The error dialog is shown by the GUI thread as this may be called
+        from a dispatch thread.
+
+        :param e the exception that occurred
+        """
+        logging.getLogger("system").exception(
+            "VJoy related error: {}".format(e)
+        )
+        self.pause()
+        self.run_in_gui_thread(functools.partial(util.display_error, str(e)))
+
+    def _matching_callbacks(self, event, lookup=None):
         """Returns the list of callbacks to execute in response to
         the provided event.
 
         :param event the event for which to search the matching
             callbacks
-        :return a list of all callbacks registered and valid for the
+        :param lookup the callback lookup to search instead of the current
+            one
+        :return a tuple of all callbacks registered and valid for the
             given event
         """
-        # Obtain callbacks matching the event
-        callback_list = []
-        if event.device_guid in self.callbacks:
-            callback_list = self.callbacks[event.device_guid].get(
-                self._active_mode, {}
-            ).get(event, [])
-
-        # Filter events when the system is paused
-        if not self.process_callbacks:
-            return [c[0] for c in callback_list if c[1]]
-        else:
-            return [c[0] for c in callback_list]
+        if lookup is None:
+            lookup = self._callback_lookup
+        callbacks = lookup.get(hash(event), ())
+        if isinstance(event, DeferredEvent):
+            # Deferred events only run while their input's callbacks do
+            return (event.callback,) if len(callbacks) > 0 else ()
+        return callbacks
 
     def _install_plugins(self, callback):
         """Installs the current plugins into the given callback.
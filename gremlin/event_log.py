@@ -0,0 +1,346 @@
+# -*- coding: utf-8; -*-
+
+# Copyright (C) 2015 - 2019 Lionel Ott
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+
+import struct
+import threading
+import time
+
+import dill
+
+from . import common, error, event_handler
+
+
+"""Binary event log format.
+
+A log starts with a header identifying the format followed by one fixed
+size record per event. All values are stored in little endian byte order.
+
+Record layout:
+    timestamp       double  seconds since the start of the recording
+    event_type      uint8   common.InputType value
+    device_guid     16 byte GUID as Data1 (uint32), Data2 (uint16),
+                            Data3 (uint16), Data4 (8 bytes)
+    identifier      uint32  input index or key scan code
+    is_extended     uint8   extended flag of keyboard scan codes
+    value           double  axis value
+    raw_value       int32   raw axis value
+    hat_x, hat_y    int8    hat direction
+    is_pressed      uint8   0 released, 1 pressed, 255 not set
+"""
+_log_header = b"JGEVTLOG\x01"
+_record = struct.Struct("<dB16sIBdibbB")
+_guid = struct.Struct("<IHH8s")
+_not_set = 255
+
+
+def _encode_guid(guid):
+    """Returns the binary representation of a device GUID.
+
+    :param guid the dill.GUID to encode
+    :return 16 byte representation of the GUID
+    """
+    data = guid.ctypes
+    return _guid.pack(data.Data1, data.Data2, data.Data3, bytes(data.Data4))
+
+
+def _decode_guid(raw):
+    """Returns the device GUID corresponding to the binary representation.
+
+    :param raw 16 byte representation of the GUID
+    :return dill.GUID instance
+    """
+    data1, data2, data3, data4 = _guid.unpack(raw)
+    data = dill._GUID()
+    data.Data1 = data1
+    data.Data2 = data2
+    data.Data3 = data3
+    for i, byte in enumerate(data4):
+        data.Data4[i] = byte
+    return dill.GUID(data)
+
+
+class EventLogWriter:
+
+    """Writes events to a binary event log."""
+
+    def __init__(self, fname):
+        """Creates a new instance.
+
+        :param fname path of the file to write the log to
+        """
+        self._file = open(fname, "wb")
+        self._file.write(_log_header)
+        self._guids = {}
+        self.event_count = 0
+
+    def write(self, timestamp, event):
+        """Appends an event to the log.
+
+        :param timestamp time of the event in seconds since the start of
+            the recording
+        :param event the event to write
+        """
+        guid = self._guids.get(event.device_guid)
+        if guid is None:
+            guid = _encode_guid(event.device_guid)
+            self._guids[event.device_guid] = guid
+
+        identifier = event.identifier
+        is_extended = 0
+        if event.event_type == common.InputType.Keyboard:
+            identifier, is_extended = identifier
+        hat_x, hat_y = 0, 0
+        value = 0.0
+        if event.event_type == common.InputType.JoystickHat:
+            hat_x, hat_y = event.value
+        elif event.event_type == common.InputType.JoystickAxis:
+            value = event.value
+        is_pressed = _not_set
+        if event.is_pressed is not None:
+            is_pressed = 1 if event.is_pressed else 0
+
+        self._file.write(_record.pack(
+            timestamp,
+            event.event_type.value,
+            guid,
+            identifier,
+            1 if is_extended else 0,
+            value,
+            event.raw_value if event.raw_value is not None else 0,
+            hat_x,
+            hat_y,
+            is_pressed
+        ))
+        self.event_count += 1
+
+    def close(self):
+        """Writes all pending data and closes the log."""
+        self._file.close()
+
+
+def read_event_log(fname):
+    """Returns the events stored in a binary event log.
+
+    :param fname path of the log file to read
+    :return generator yielding (timestamp, Event) tuples
+    """
+    guids = {}
+    templates = {}
+    with open(fname, "rb") as log:
+        if log.read(len(_log_header)) != _log_header:
+            raise error.GremlinError(
+                "{} is not a valid event log".format(fname)
+            )
+
+        while True:
+            data = log.read(_record.size)
+            if len(data) < _record.size:
+                break
+            timestamp, event_type, raw_guid, identifier, is_extended, \
+                value, raw_value, hat_x, hat_y, is_pressed = \
+                _record.unpack(data)
+
+            # Create a template per input to avoid decoding the GUID and
+            # computing the event's key for every single event
+            key = (event_type, raw_guid, identifier, is_extended)
+            template = templates.get(key)
+            if template is None:
+                guid = guids.get(raw_guid)
+                if guid is None:
+                    guid = _decode_guid(raw_guid)
+                    guids[raw_guid] = guid
+                input_type = common.InputType(event_type)
+                if input_type == common.InputType.Keyboard:
+                    identifier = (identifier, is_extended == 1)
+                template = event_handler.Event(
+                    event_type=input_type,
+                    identifier=identifier,
+                    device_guid=guid
+                )
+                templates[key] = template
+
+            event_value = None
+            if template.event_type == common.InputType.JoystickAxis:
+                event_value = value
+            else:
+                raw_value = None
+                if template.event_type == common.InputType.JoystickHat:
+                    event_value = (hat_x, hat_y)
+            yield timestamp, event_handler.Event.from_template(
+                template,
+                value=event_value,
+                is_pressed=None if is_pressed == _not_set else is_pressed == 1,
+                raw_value=raw_value
+            )
+
+
+def update_input_state(event):
+    """Updates the InputStateCache with the state carried by an event.
+
+    Mirrors the update performed by the EventListener for every joystick
+    event it receives, other events are ignored.
+
+    :param event the event whose state to store
+    """
+    if event.event_type == common.InputType.JoystickAxis:
+        value = event.raw_value / float(32768)
+    elif event.event_type == common.InputType.JoystickButton:
+        value = event.is_pressed
+    elif event.event_type == common.InputType.JoystickHat:
+        value = event.value
+    else:
+        return
+    event_handler.InputStateCache().update(
+        event.device_guid,
+        event.event_type,
+        event.identifier,
+        value
+    )
+
+
+class EventRecorder:
+
+    """Records the joystick and keyboard events published by the
+    EventListener to a binary event log."""
+
+    def __init__(self, fname):
+        """Creates a new instance.
+
+        :param fname path of the file to write the log to
+        """
+        self._fname = fname
+        self._writer = None
+        self._start_time = 0
+        self._lock = threading.Lock()
+
+    @property
+    def event_count(self):
+        """Returns the number of events recorded so far.
+
+        :return number of recorded events
+        """
+        return 0 if self._writer is None else self._writer.event_count
+
+    def start(self):
+        """Starts recording events."""
+        if self._writer is not None:
+            return
+        self._writer = EventLogWriter(self._fname)
+        self._start_time = time.perf_counter_ns()
+        el = event_handler.EventListener()
+        el.joystick_event.connect(self.record)
+        el.keyboard_event.connect(self.record)
+
+    def stop(self):
+        """Stops recording and closes the log."""
+        if self._writer is None:
+            return
+        el = event_handler.EventListener()
+        el.joystick_event.disconnect(self.record)
+        el.keyboard_event.disconnect(self.record)
+        with self._lock:
+            self._writer.close()
+            self._writer = None
+
+    def record(self, event):
+        """Writes a single event to the log.
+
+        Events are recorded at the time they were received from the device,
+        rather than the time they are delivered to the recorder, which may
+        lag behind. Events can be delivered by several threads, as such
+        writes are serialized.
+
+        :param event the event to record
+        """
+        timestamp = event.timestamp
+        if timestamp == 0:
+            # Only joystick events are timestamped on receipt
+            timestamp = time.perf_counter_ns()
+        timestamp = max(0, timestamp - self._start_time) / 1e9
+        with self._lock:
+            if self._writer is not None:
+                self._writer.write(timestamp, event)
+
+
+class EventReplayer:
+
+    """Feeds the events of a binary event log to a callback.
+
+    Events are replayed at their recorded timing, at a multiple of it, or
+    as fast as possible. The InputStateCache is updated with every replayed
+    joystick event in the same way as by the EventListener, which allows
+    conditions to be evaluated without accessing the devices.
+    """
+
+    def __init__(self, fname, callback, speed=1.0, update_state=True):
+        """Creates a new instance.
+
+        :param fname path of the log file to replay
+        :param callback function called with every event, typically
+            EventHandler.process_event
+        :param speed factor by which to accelerate the replay, None replays
+            the events as fast as possible
+        :param update_state whether or not to update the InputStateCache
+            with the replayed events
+        """
+        self._fname = fname
+        self._callback = callback
+        self._speed = speed
+        self._update_state = update_state
+        self._running = False
+
+    def stop(self):
+        """Stops a replay running in another thread."""
+        self._running = False
+
+    def run(self):
+        """Replays the log, returning once all events have been processed.
+
+        :return dictionary containing the number of replayed events, the
+            duration of the replay in seconds, and the number of events
+            processed per second
+        """
+        callback = self._callback
+        speed = self._speed
+        event_count = 0
+        self._running = True
+
+        start_time = time.perf_counter()
+        for timestamp, event in read_event_log(self._fname):
+            if not self._running:
+                break
+
+            if speed is not None:
+                delay = start_time + timestamp / speed - time.perf_counter()
+                if delay > 0:
+                    time.sleep(delay)
+
+            if self._update_state:
+                update_input_state(event)
+
+            callback(event)
+            event_count += 1
+
+        duration = time.perf_counter() - start_time
+        self._running = False
+        return {
+            "events": event_count,
+            "duration": duration,
+            "events_per_second":
+                event_count / duration if duration > 0 else 0.0
+        }
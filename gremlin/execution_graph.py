@@ -17,16 +17,26 @@
 
 from abc import abstractmethod, ABCMeta
 from collections import namedtuple
-import copy
+import functools
 import logging
-import time
 
-from gremlin import actions, base_classes, common, error
+from gremlin import actions, base_classes, common, error, event_handler, \
+    scheduler
 
 
 CallbackData = namedtuple("ContainerCallback", ["callback", "event"])
 
 
+# Single instruction of a compiled execution graph. The targets are the
+# indices of the steps to execute next on success and failure, or None if
+# execution ends. The AxisButton functor, if the step runs one, is checked
+# for forced activations.
+ProgramStep = namedtuple(
+    "ProgramStep",
+    ["process_event", "on_true", "on_false", "axis_button"]
+)
+
+
 class ContainerCallback:
 
     """Callback object that can perform the actions associated with an input.
@@ -43,6 +53,14 @@ class ContainerCallback:
         """
         self.execution_graph = ContainerExecutionGraph(container)
 
+    @property
+    def thread_safe(self):
+        """Returns whether or not the callback may run on any thread.
+
+        :return True if all functors of the graph are thread safe
+        """
+        return self.execution_graph.thread_safe
+
     def __call__(self, event):
         """Executes the callback based on the event's content.
 
@@ -63,17 +81,15 @@ class ContainerCallback:
         else:
             raise error.GremlinError("Invalid event type")
 
-        # Containers representing a virtual button get their individual
-        # value instance, all others share one to propagate changes across
-        shared_value = copy.deepcopy(value)
-
+        # The value was created for this event only and can therefore be
+        # shared by all actions of the container to propagate changes
         if event == common.InputType.VirtualButton:
             # TODO: remove this at a future stage
             logging.getLogger("system").error(
                 "Virtual button code path being used"
             )
         else:
-            self.execution_graph.process_event(event, shared_value)
+            self.execution_graph.process_event(event, value)
 
 
 class VirtualButtonCallback:
@@ -87,6 +103,14 @@ class VirtualButtonCallback:
         """
         self._execution_graph = ContainerExecutionGraph(container)
 
+    @property
+    def thread_safe(self):
+        """Returns whether or not the callback may run on any thread.
+
+        :return True if all functors of the graph are thread safe
+        """
+        return self._execution_graph.thread_safe
+
     def __call__(self, event):
         """Executes the container's content when called.
 
@@ -142,6 +166,10 @@ class AbstractExecutionGraph(metaclass=ABCMeta):
 
     When there is no link for a given node and outcome combination the
     graph terminates.
+
+    Once built the graph is compiled into an immutable program of steps
+    with precomputed transition targets. Executing the program only uses
+    local state, which allows running the same graph from several threads.
     """
 
     def __init__(self, instance):
@@ -151,9 +179,27 @@ class AbstractExecutionGraph(metaclass=ABCMeta):
         """
         self.functors = []
         self.transitions = {}
-        self.current_index = 0
+        # Number of events processed, allows a deferred second run to detect
+        # that newer events have been processed in the meantime
+        self._generation = 0
 
         self._build_graph(instance)
+        self._program = self._compile_program()
+
+    # Delay in seconds after which an event is processed again
+    reprocess_delay = 0.05
+
+    @property
+    def thread_safe(self):
+        """Returns whether or not the graph may run on any thread.
+
+        :return True if every functor of the graph is marked as thread safe,
+            False otherwise
+        """
+        return all(
+            getattr(functor, "thread_safe", False)
+            for functor in self.functors
+        )
 
     def process_event(self, event, value):
         """Executes the graph with the provided data.
@@ -163,27 +209,81 @@ class AbstractExecutionGraph(metaclass=ABCMeta):
         """
         # Processing an event twice is needed when a virtual axis button has
         # "jumped" over it's activation region without triggering it. Once
-        # this is detected the "press" event is sent and the second run ensures
-        # a "release" event is sent.
+        # this is detected the "press" event is sent and the second run,
+        # posted by the scheduler to the thread processing the input,
+        # ensures a "release" event is sent.
         process_again = False
+        self._generation += 1
 
-        while self.current_index is not None and len(self.functors) > 0:
-            functor = self.functors[self.current_index]
-            result = functor.process_event(event, value)
+        program = self._program
+        index = 0 if len(program) > 0 else None
+        while index is not None:
+            process, on_true, on_false, axis_button = program[index]
+            result = process(event, value)
 
-            if isinstance(functor, actions.AxisButton):
-                process_again = functor.forced_activation
+            if axis_button is not None:
+                process_again = axis_button.forced_activation
 
-            self.current_index = self.transitions.get(
-                (self.current_index, result),
-                None
-            )
-        self.current_index = 0
+            # A functor not reporting a result ends the execution
+            if result is None:
+                break
+            index = on_true if result else on_false
 
         if process_again:
-            time.sleep(0.05)
+            scheduler.Scheduler().schedule(
+                AbstractExecutionGraph.reprocess_delay,
+                self._post_reprocess,
+                event,
+                value,
+                self._generation
+            )
+
+    def _post_reprocess(self, event, value, generation):
+        """Posts the second run of an event as a deferred event.
+
+        The deferred event is processed like any other event of the input,
+        i.e. by the same thread, in order, and under the same locks.
+
+        :param event the event to process again
+        :param value the value the event was processed with
+        :param generation the generation of the first run
+        """
+        event_handler.EventListener().deferred_event.emit(
+            event_handler.DeferredEvent.from_event(
+                event,
+                functools.partial(self._reprocess, value, generation)
+            )
+        )
+
+    def _reprocess(self, value, generation, event):
+        """Processes an event a second time.
+
+        The second run is skipped if newer events have been processed since
+        the first one, as those already updated the state of the axis
+        button and replaying the stale event would undo this.
+
+        :param value the value the event was processed with
+        :param generation the generation of the first run
+        :param event the deferred event holding the event's state
+        """
+        if generation == self._generation:
             self.process_event(event, value)
 
+    def _compile_program(self):
+        """Returns the program corresponding to the graph's structure.
+
+        :return tuple of ProgramStep instances
+        """
+        return tuple(
+            ProgramStep(
+                functor.process_event,
+                self.transitions.get((i, True), None),
+                self.transitions.get((i, False), None),
+                functor if isinstance(functor, actions.AxisButton) else None
+            )
+            for i, functor in enumerate(self.functors)
+        )
+
     @abstractmethod
     def _build_graph(self, instance):
         """Builds the graph structure based on the given object's content.
@@ -16,10 +16,14 @@
 # along with this program.  If not, see <http://www.gnu.org/licenses/>.
 
 
+import concurrent.futures
+import enum
 import functools
 import heapq
 import inspect
+import itertools
 import logging
+import math
 import time
 import threading
 
@@ -28,7 +32,7 @@ from PyQt5 import QtCore
 from dill import DILL, GUID_Invalid
 
 from . import common, error, event_handler, joystick_handling, \
-    macro, profile, util
+    macro, profile
 
 
 class CallbackRegistry:
@@ -75,16 +79,124 @@ class CallbackRegistry:
         self._registry = {}
 
 
+class PeriodicMode(enum.Enum):
+
+    """Enumeration of the ways periodic callbacks are rescheduled."""
+
+    # The interval separates the end of an execution from the next start
+    FixedDelay = 1
+    # Executions start at multiples of the interval
+    FixedRate = 2
+
+
+class PeriodicStatistics:
+
+    """Execution statistics of a single periodic callback."""
+
+    def __init__(self):
+        """Creates a new instance."""
+        self.executions = 0
+        self.missed_deadlines = 0
+        self.total_runtime = 0.0
+        self.max_runtime = 0.0
+        self.max_lateness = 0.0
+        self._lateness_sum = 0.0
+        self._lateness_square_sum = 0.0
+
+    @property
+    def mean_runtime(self):
+        """Returns the average duration of a single execution.
+
+        :return average runtime in seconds
+        """
+        if self.executions == 0:
+            return 0.0
+        return self.total_runtime / self.executions
+
+    @property
+    def mean_lateness(self):
+        """Returns the average delay between deadline and execution start.
+
+        :return average lateness in seconds
+        """
+        if self.executions == 0:
+            return 0.0
+        return self._lateness_sum / self.executions
+
+    @property
+    def jitter(self):
+        """Returns the standard deviation of the execution start lateness.
+
+        :return jitter in seconds
+        """
+        if self.executions == 0:
+            return 0.0
+        mean = self.mean_lateness
+        return math.sqrt(max(
+            0.0,
+            self._lateness_square_sum / self.executions - mean * mean
+        ))
+
+    def record(self, lateness, runtime):
+        """Records the timing of a single execution.
+
+        :param lateness time in seconds between deadline and start
+        :param runtime time in seconds the execution took
+        """
+        self.executions += 1
+        self.total_runtime += runtime
+        self.max_runtime = max(self.max_runtime, runtime)
+        self.max_lateness = max(self.max_lateness, lateness)
+        self._lateness_sum += lateness
+        self._lateness_square_sum += lateness * lateness
+
+
+class PeriodicTask:
+
+    """Scheduling state of a single periodic callback."""
+
+    def __init__(self, callback, interval, mode, use_worker, statistics):
+        """Creates a new instance.
+
+        :param callback the function to execute
+        :param interval the time between executions
+        :param mode the PeriodicMode used to reschedule the callback
+        :param use_worker whether or not to run the callback on the worker
+            pool
+        :param statistics the PeriodicStatistics instance to update
+        """
+        self.callback = callback
+        self.interval = interval
+        self.mode = mode
+        self.use_worker = use_worker
+        self.statistics = statistics
+        self.deadline = 0.0
+
+
 class PeriodicRegistry:
 
-    """Registry for periodically executed functions."""
+    """Registry for periodically executed functions.
+
+    Callbacks are executed by a single thread which waits on a monotonic
+    clock until the next callback is due. Callbacks that take a long time
+    to execute can be run on a pool of worker threads instead, preventing
+    them from delaying the remaining callbacks. A callback is never
+    executed concurrently with itself.
+    """
+
+    # Number of threads executing callbacks placed on the worker pool
+    worker_count = 4
 
     def __init__(self):
         """Creates a new instance."""
         self._registry = {}
+        self._statistics = {}
         self._running = False
         self._thread = threading.Thread(target=self._thread_loop)
+        self._condition = threading.Condition()
         self._queue = []
+        self._counter = itertools.count()
+        self._pool = None
         self._plugins = []
 
     def start(self):
@@ -102,21 +214,45 @@ class PeriodicRegistry:
 
     def stop(self):
         """Stops the event loop."""
-        self._running = False
+        with self._condition:
+            self._running = False
+            self._condition.notify()
         if self._thread.is_alive():
             self._thread.join()
-
-    def add(self, callback, interval):
+        if self._pool is not None:
+            self._pool.shutdown(wait=True)
+            self._pool = None
+
+    def add(
+            self,
+            callback,
+            interval,
+            mode=PeriodicMode.FixedDelay,
+            use_worker=False
+    ):
         """Adds a function to execute periodically.
 
         :param callback the function to execute
         :param interval the time between executions
+        :param mode the PeriodicMode used to reschedule the callback
+        :param use_worker whether or not to run the callback on the worker
+            pool
         """
-        self._registry[callback] = (interval, callback)
+        self._registry[callback] = (interval, mode, use_worker)
+        self._statistics[callback] = PeriodicStatistics()
 
     def clear(self):
         """Clears the registry."""
         self._registry = {}
+        self._statistics = {}
+
+    def statistics(self):
+        """Returns the execution statistics of all periodic callbacks.
+
+        :return dictionary mapping registered callbacks to their
+            PeriodicStatistics instance
+        """
+        return dict(self._statistics)
 
     def _install_plugins(self, callback):
         """Installs the current plugins into the given callback.
@@ -134,6 +270,19 @@ class PeriodicRegistry:
                 callback = plugin.install(callback, partial_fn)
         return callback
 
+    def _schedule(self, task):
+        """Places a task in the queue according to its deadline.
+
+        This has to be called while holding the condition's lock.
+
+        :param task the PeriodicTask to schedule
+        """
+        heapq.heappush(
+            self._queue,
+            (task.deadline, next(self._counter), task)
+        )
+        self._condition.notify()
+
     def _thread_loop(self):
         """Main execution loop run in a separate thread."""
         # Setup plugins to use
@@ -142,33 +291,92 @@ class PeriodicRegistry:
             VJoyPlugin(),
             KeyboardPlugin()
         ]
-        callback_map = {}
 
         # Populate the queue
-        self._queue = []
-        for item in self._registry.values():
-            plugin_cb = self._install_plugins(item[1])
-            callback_map[plugin_cb] = item[0]
-            heapq.heappush(
-                self._queue,
-                (time.time() + callback_map[plugin_cb], plugin_cb)
-            )
+        start_time = time.perf_counter()
+        with self._condition:
+            self._queue = []
+            for callback, (interval, mode, use_worker) in \
+                    self._registry.items():
+                task = PeriodicTask(
+                    self._install_plugins(callback),
+                    interval,
+                    mode,
+                    use_worker,
+                    self._statistics[callback]
+                )
+                task.deadline = start_time + interval
+                self._schedule(task)
+                if use_worker and self._pool is None:
+                    self._pool = concurrent.futures.ThreadPoolExecutor(
+                        max_workers=self.worker_count
+                    )
 
         # Main thread loop
-        while self._running:
-            # Process all events that require running
-            while self._queue[0][0] < time.time():
-                item = heapq.heappop(self._queue)
-                item[1]()
-
-                heapq.heappush(
-                    self._queue,
-                    (time.time() + callback_map[item[1]], item[1])
-                )
+        while True:
+            with self._condition:
+                # Wait until either the next function needs to be run or
+                # the registry is stopped
+                while self._running:
+                    timeout = None
+                    if len(self._queue) > 0:
+                        timeout = self._queue[0][0] - time.perf_counter()
+                        if timeout <= 0:
+                            break
+                    self._condition.wait(timeout)
+                if not self._running:
+                    break
+                task = heapq.heappop(self._queue)[2]
+
+            if task.use_worker:
+                self._pool.submit(self._execute, task)
+            else:
+                self._execute(task)
+
+    def _execute(self, task):
+        """Executes a task and schedules its next execution.
+
+        :param task the PeriodicTask to execute
+        """
+        start = time.perf_counter()
+        try:
+            task.callback()
+        except Exception as e:
+            logging.getLogger("system").exception(
+                "Error in periodic callback: {}".format(e)
+            )
+        end = time.perf_counter()
+
+        with self._condition:
+            task.statistics.record(start - task.deadline, end - start)
+
+            # Determine the next deadline and detect overruns, i.e. a fixed
+            # rate callback missing deadlines or a fixed delay callback
+            # taking longer than its interval
+            missed = 0
+            if task.mode == PeriodicMode.FixedRate:
+                task.deadline += task.interval
+                if task.deadline <= end:
+                    missed = int((end - task.deadline) / task.interval) + 1
+                    task.deadline += missed * task.interval
+            else:
+                if end - start > task.interval:
+                    missed = 1
+                task.deadline = end + task.interval
+
+            if missed > 0:
+                if task.statistics.missed_deadlines == 0:
+                    logging.getLogger("system").warning(
+                        "Periodic callback {} overran its interval of "
+                        "{:.3f} s".format(
+                            getattr(task.callback, "__name__", task.callback),
+                            task.interval
+                        )
+                    )
+                task.statistics.missed_deadlines += missed
 
-            # Sleep until either the next function needs to be run or
-            # our timeout expires
-            time.sleep(min(self._queue[0][0] - time.time(), 1.0))
+            if self._running:
+                self._schedule(task)
 
 
 # Global registry of all registered callbacks
@@ -231,7 +439,10 @@ class JoystickWrapper:
 
         @property
         def value(self):
-            return DILL.get_axis(self._joystick_guid, self._index) / float(32768)
+            return event_handler.InputStateCache().axis(
+                self._joystick_guid,
+                self._index
+            )
 
     class Button(Input):
 
@@ -242,8 +453,10 @@ class JoystickWrapper:
 
         @property
         def is_pressed(self):
-            val = DILL.get_button(self._joystick_guid, self._index)
-            return val #DILL.get_button(self._joystick_guid, self._index)
+            return event_handler.InputStateCache().button(
+                self._joystick_guid,
+                self._index
+            )
 
     class Hat(Input):
 
@@ -254,9 +467,10 @@ class JoystickWrapper:
 
         @property
         def direction(self):
-            return util.dill_hat_lookup[
-                DILL.get_hat(self._joystick_guid, self._index)
-            ]
+            return event_handler.InputStateCache().hat(
+                self._joystick_guid,
+                self._index
+            )
 
     def __init__(self, device_guid):
         """Creates a new wrapper object for the given object id.
@@ -746,6 +960,21 @@ class JoystickInputSignificant:
         return event.value != (0, 0)
 
 
+def thread_safe(callback):
+    """Decorator marking a callback as safe to run on any thread.
+
+    Callbacks of different inputs marked as thread safe may run
+    concurrently when several dispatch threads are configured, while the
+    events of a single input are always processed in order. This decorator
+    has to be applied before the input decorator.
+
+    :param callback the callback function to mark
+    :return the callback function
+    """
+    callback.thread_safe = True
+    return callback
+
+
 def _button(button_id, device_guid, mode, always_execute=False):
     """Decorator for button callbacks.
 
@@ -854,10 +1083,14 @@ def keyboard(key_name, mode, always_execute=False):
     return wrap
 
 
-def periodic(interval):
+def periodic(interval, mode=PeriodicMode.FixedDelay, use_worker=False):
     """Decorator for periodic function callbacks.
 
     :param interval the duration between executions of the function
+    :param mode the PeriodicMode used to reschedule the function
+    :param use_worker whether or not to run the function on a worker
+        thread, which prevents long running functions from delaying other
+        periodic functions
     """
 
     def wrap(callback):
@@ -866,7 +1099,7 @@ def periodic(interval):
         def wrapper_fn(*args, **kwargs):
             callback(*args, **kwargs)
 
-        periodic_registry.add(wrapper_fn, interval)
+        periodic_registry.add(wrapper_fn, interval, mode, use_worker)
 
         return wrapper_fn
 
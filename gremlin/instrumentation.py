@@ -0,0 +1,653 @@
+# -*- coding: utf-8; -*-
+
+# Copyright (C) 2015 - 2019 Lionel Ott
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+
+from collections import namedtuple
+import json
+import threading
+import time
+
+from vjoy import vjoy
+from . import common, execution_graph
+
+
+# Identifies the code a histogram measures. Entries further down the
+# processing chain have more of the fields set, i.e. the event handler only
+# knows device and input while action functors have all fields set.
+HistogramKey = namedtuple(
+    "HistogramKey",
+    ["device", "input", "container", "action"]
+)
+
+# Identifies a traced latency of an input. The stage is one of "queue",
+# "execution", or "output", the latter naming the output it measures.
+TraceKey = namedtuple("TraceKey", ["device", "input", "stage", "output"])
+
+# Histograms recorded by the LatencyTracer for a single input
+_TracedInput = namedtuple(
+    "_TracedInput",
+    ["device", "input", "queue", "execution", "outputs"]
+)
+
+
+class LatencyHistogram:
+
+    """Records durations in logarithmically sized buckets.
+
+    Each power of two is split into the same number of linear sub-buckets
+    which bounds the relative error of every recorded value independent of
+    its magnitude, as done by HDR histograms. Recording a value only
+    requires a few integer operations and a list update.
+
+    No locking is performed, hence a histogram must only be written to by
+    a single thread. SharedLatencyHistogram accepts values from any thread.
+    """
+
+    # Number of bits used for the sub-buckets, i.e. 2**(bits-1) sub-buckets
+    # per power of two, resulting in a relative error below 6.25%. The
+    # value is inlined in record.
+    sub_bucket_bits = 5
+
+    # Largest value, in nanoseconds, that can be recorded exactly, larger
+    # values are counted in the last bucket
+    max_value = 60 * 10**9
+
+    def __init__(self):
+        """Creates a new empty histogram."""
+        self._counts = [0] * (LatencyHistogram._index(
+            LatencyHistogram.max_value
+        ) + 1)
+        self._last_index = len(self._counts) - 1
+        self.count = 0
+        self.total = 0
+        self.min = LatencyHistogram.max_value
+        self.max = 0
+
+    @staticmethod
+    def _index(value):
+        """Returns the index of the bucket holding the given value.
+
+        :param value the value in nanoseconds
+        :return index of the value's bucket
+        """
+        shift = value.bit_length() - LatencyHistogram.sub_bucket_bits
+        if shift <= 0:
+            return value
+        return (shift << (LatencyHistogram.sub_bucket_bits - 1)) + \
+            (value >> shift)
+
+    @staticmethod
+    def _bucket_range(index):
+        """Returns the range of values stored in a bucket.
+
+        :param index the index of the bucket
+        :return smallest and largest value of the bucket
+        """
+        half = 1 << (LatencyHistogram.sub_bucket_bits - 1)
+        if index < 2 * half:
+            return index, index
+        shift = (index >> (LatencyHistogram.sub_bucket_bits - 1)) - 1
+        lower = (index - (shift << (LatencyHistogram.sub_bucket_bits - 1))) \
+            << shift
+        return lower, lower + (1 << shift) - 1
+
+    def record(self, value):
+        """Records a single duration.
+
+        :param value the duration in nanoseconds
+        """
+        # Inlined version of _index as this runs for every timed call
+        shift = value.bit_length() - 5
+        index = value if shift <= 0 else (shift << 4) + (value >> shift)
+        if index > self._last_index:
+            index = self._last_index
+        self._counts[index] += 1
+        self.count += 1
+        self.total += value
+        if value > self.max:
+            self.max = value
+        if value < self.min:
+            self.min = value
+
+    def percentile(self, fraction):
+        """Returns the value below which the given fraction of values lie.
+
+        :param fraction the fraction in the range [0, 1]
+        :return value in nanoseconds at the requested percentile, the
+            midpoint of the corresponding bucket
+        """
+        if self.count == 0:
+            return 0
+        threshold = max(1, fraction * self.count)
+        cumulative = 0
+        for index, count in enumerate(self._counts):
+            cumulative += count
+            if cumulative >= threshold:
+                lower, upper = LatencyHistogram._bucket_range(index)
+                return min(self.max, (lower + upper) // 2)
+        return self.max
+
+    @property
+    def mean(self):
+        """Returns the mean of all recorded values.
+
+        :return mean duration in nanoseconds
+        """
+        return self.total / self.count if self.count > 0 else 0.0
+
+    def merge(self, other):
+        """Adds the values recorded by another histogram to this one.
+
+        :param other the histogram whose values to add
+        """
+        for index, count in enumerate(other._counts):
+            self._counts[index] += count
+        self.count += other.count
+        self.total += other.total
+        self.max = max(self.max, other.max)
+        self.min = min(self.min, other.min)
+
+    def clear(self):
+        """Removes all recorded values."""
+        self._counts = [0] * len(self._counts)
+        self.count = 0
+        self.total = 0
+        self.min = LatencyHistogram.max_value
+        self.max = 0
+
+    def to_dict(self):
+        """Returns a JSON serializable representation of the histogram.
+
+        :return dictionary with summary statistics in microseconds and the
+            non-empty buckets as [lower ns, upper ns, count] entries
+        """
+        return {
+            "count": self.count,
+            "min_us": (self.min if self.count > 0 else 0) / 1000.0,
+            "mean_us": self.mean / 1000.0,
+            "p50_us": self.percentile(0.5) / 1000.0,
+            "p90_us": self.percentile(0.9) / 1000.0,
+            "p99_us": self.percentile(0.99) / 1000.0,
+            "p999_us": self.percentile(0.999) / 1000.0,
+            "max_us": self.max / 1000.0,
+            "buckets": [
+                list(LatencyHistogram._bucket_range(index)) + [count]
+                for index, count in enumerate(self._counts) if count > 0
+            ]
+        }
+
+
+class SharedLatencyHistogram:
+
+    """Records durations reported by several threads.
+
+    Every thread records into its own LatencyHistogram, which avoids both
+    lost updates and locking on every recorded value. The histograms of all
+    threads are merged when the values are read.
+    """
+
+    def __init__(self):
+        """Creates a new empty histogram."""
+        self._local = threading.local()
+        self._histograms = []
+        self._lock = threading.Lock()
+
+    def record(self, value):
+        """Records a single duration on behalf of the calling thread.
+
+        :param value the duration in nanoseconds
+        """
+        try:
+            histogram = self._local.histogram
+        except AttributeError:
+            histogram = LatencyHistogram()
+            self._local.histogram = histogram
+            with self._lock:
+                self._histograms.append(histogram)
+        histogram.record(value)
+
+    @property
+    def count(self):
+        """Returns the number of recorded values.
+
+        :return number of values recorded by all threads
+        """
+        with self._lock:
+            return sum(histogram.count for histogram in self._histograms)
+
+    def merged(self):
+        """Returns a histogram containing the values of all threads.
+
+        :return LatencyHistogram holding all recorded values
+        """
+        result = LatencyHistogram()
+        with self._lock:
+            histograms = list(self._histograms)
+        for histogram in histograms:
+            result.merge(histogram)
+        return result
+
+    def clear(self):
+        """Removes all recorded values."""
+        with self._lock:
+            for histogram in self._histograms:
+                histogram.clear()
+
+    def to_dict(self):
+        """Returns a JSON serializable representation of the histogram.
+
+        :return dictionary in the format of LatencyHistogram.to_dict
+        """
+        return self.merged().to_dict()
+
+
+@common.SingletonDecorator
+class Instrumentation:
+
+    """Registry of the latency histograms recorded while a profile runs.
+
+    Instrumentation is enabled by replacing callables with timed versions
+    when a profile is started, leaving the callables untouched otherwise.
+    """
+
+    def __init__(self):
+        """Creates a new instance."""
+        self._histograms = {}
+        self._lock = threading.Lock()
+
+    def histogram(self, device, input, container=None, action=None):
+        """Returns the histogram for the given key, creating it if needed.
+
+        :param device name of the device
+        :param input name of the input
+        :param container name of the container, if any
+        :param action name of the action, if any
+        :return SharedLatencyHistogram instance for the key
+        """
+        key = HistogramKey(device, input, container, action)
+        with self._lock:
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                histogram = SharedLatencyHistogram()
+                self._histograms[key] = histogram
+            return histogram
+
+    def histograms(self):
+        """Returns all histograms.
+
+        :return dictionary mapping HistogramKey to SharedLatencyHistogram
+        """
+        with self._lock:
+            return dict(self._histograms)
+
+    def reset(self):
+        """Clears the values of all histograms."""
+        for histogram in self.histograms().values():
+            histogram.clear()
+
+    def clear(self):
+        """Removes all histograms."""
+        with self._lock:
+            self._histograms = {}
+
+    def to_dict(self):
+        """Returns a JSON serializable representation of all histograms.
+
+        :return dictionary containing a list of histogram entries
+        """
+        entries = []
+        for key, histogram in sorted(
+                self.histograms().items(),
+                key=lambda x: tuple(v or "" for v in x[0])
+        ):
+            entry = key._asdict()
+            entry.update(histogram.to_dict())
+            entries.append(entry)
+        return {"histograms": entries}
+
+
+@common.SingletonDecorator
+class LatencyTracer:
+
+    """Measures the time from receiving an event to the outputs it causes.
+
+    While an event is processed it is tracked per thread and every vJoy
+    write or SendInput call made in the meantime is attributed to it.
+    Outputs created outside of event processing, such as by macros or
+    scheduled actions, are not traced. Three latencies are recorded per
+    input:
+    - queue: from receiving the event until its processing starts, i.e.
+      time spent in the Qt event queue, axis coalescing, or a lane
+    - execution: time spent running the callbacks of the event
+    - output: from receiving the event until an output caused by it is
+      issued, recorded separately for every output
+    """
+
+    def __init__(self):
+        """Creates a new instance."""
+        self._current = threading.local()
+        self._device_names = {}
+        self._inputs = {}
+        self._lock = threading.Lock()
+
+    def start(self, device_names):
+        """Removes all recorded data in preparation of a new run.
+
+        :param device_names dictionary mapping device GUIDs to names
+        """
+        with self._lock:
+            self._device_names = dict(device_names)
+            self._inputs = {}
+
+    def begin(self, event):
+        """Marks the start of an event's processing by the calling thread.
+
+        :param event the event being processed
+        """
+        now = time.perf_counter_ns()
+        stack = getattr(self._current, "stack", None)
+        if stack is None:
+            stack = []
+            self._current.stack = stack
+        stack.append(now)
+        stack.append(event)
+        if event.timestamp > 0:
+            self._traced_input(event).queue.record(now - event.timestamp)
+
+    def end(self, event):
+        """Marks the end of an event's processing by the calling thread.
+
+        :param event the event whose processing finished
+        """
+        now = time.perf_counter_ns()
+        stack = self._current.stack
+        stack.pop()
+        start = stack.pop()
+        self._traced_input(event).execution.record(now - start)
+
+    def record_output(self, output_type, device_id, input_id):
+        """Records the latency of an output created by the calling thread.
+
+        Events created while processing another event, such as those of
+        virtual buttons, carry no timestamp. Their outputs are attributed
+        to the enclosing event received from a device.
+
+        :param output_type the type of the output, i.e. Axis, Button, Hat,
+            or SendInput
+        :param device_id id of the vJoy device written to, if any
+        :param input_id id of the vJoy input or number of inputs sent
+        """
+        stack = getattr(self._current, "stack", None)
+        if not stack:
+            return
+        now = time.perf_counter_ns()
+        for event in stack[-1::-2]:
+            if event.timestamp > 0:
+                break
+        else:
+            return
+
+        traced = self._traced_input(event)
+        key = (output_type, device_id, input_id)
+        histogram = traced.outputs.get(key)
+        if histogram is None:
+            with self._lock:
+                histogram = traced.outputs.setdefault(
+                    key,
+                    SharedLatencyHistogram()
+                )
+        histogram.record(now - event.timestamp)
+
+    def reset(self):
+        """Clears the values of all histograms."""
+        with self._lock:
+            for traced in self._inputs.values():
+                traced.queue.clear()
+                traced.execution.clear()
+                for histogram in traced.outputs.values():
+                    histogram.clear()
+
+    def to_dict(self):
+        """Returns a JSON serializable representation of all histograms.
+
+        :return dictionary containing a list of trace entries
+        """
+        with self._lock:
+            inputs = list(self._inputs.values())
+        entries = []
+        for traced in inputs:
+            device, input = traced.device, traced.input
+            histograms = [
+                (TraceKey(device, input, "queue", None), traced.queue),
+                (TraceKey(device, input, "execution", None), traced.execution)
+            ]
+            for key, histogram in list(traced.outputs.items()):
+                histograms.append((
+                    TraceKey(device, input, "output", _output_name(*key)),
+                    histogram
+                ))
+            for key, histogram in histograms:
+                # Events created while processing others have no queue wait
+                if histogram.count == 0:
+                    continue
+                entry = key._asdict()
+                entry.update(histogram.to_dict())
+                entries.append(entry)
+        entries.sort(key=lambda x: (
+            x["device"], x["input"], x["stage"], x["output"] or ""
+        ))
+        return {"traces": entries}
+
+    def _traced_input(self, event):
+        """Returns the histograms of the event's input.
+
+        :param event the event whose input to return the histograms for
+        :return _TracedInput instance of the input
+        """
+        traced = self._inputs.get(event)
+        if traced is None:
+            device = self._device_names.get(
+                event.device_guid,
+                str(event.device_guid)
+            )
+            with self._lock:
+                traced = self._inputs.setdefault(event, _TracedInput(
+                    device,
+                    input_name(event.event_type, event.identifier),
+                    SharedLatencyHistogram(),
+                    SharedLatencyHistogram(),
+                    {}
+                ))
+        return traced
+
+
+def export(fname):
+    """Writes all recorded histograms and traces to a JSON file.
+
+    :param fname path of the file to write
+    """
+    data = Instrumentation().to_dict()
+    data.update(LatencyTracer().to_dict())
+    with open(fname, "w") as out:
+        json.dump(data, out, indent=2)
+
+
+def timed(callback, histogram):
+    """Returns a callable recording the duration of each call.
+
+    :param callback the callable to time
+    :param histogram the SharedLatencyHistogram to record durations in
+    :return callable with the same behaviour as the provided one
+    """
+    timer = time.perf_counter_ns
+    record = histogram.record
+
+    def wrapper(*args):
+        start = timer()
+        try:
+            return callback(*args)
+        finally:
+            record(timer() - start)
+
+    wrapper.thread_safe = getattr(callback, "thread_safe", False)
+    return wrapper
+
+
+def timed_event_handler(process_event, device_names):
+    """Returns a timed event processing function.
+
+    Durations are recorded per input. When dispatch lanes are active the
+    recorded duration only covers handing the event to its lane. Recording
+    takes no lock shared between threads, thus instrumented callbacks keep
+    running in parallel on their lanes.
+
+    :param process_event the function processing events
+    :param device_names dictionary mapping device GUIDs to names
+    :return function with the same behaviour as the provided one
+    """
+    timer = time.perf_counter_ns
+    histograms = {}
+
+    def wrapper(event):
+        start = timer()
+        try:
+            process_event(event)
+        finally:
+            duration = timer() - start
+            histogram = histograms.get(event)
+            if histogram is None:
+                histogram = Instrumentation().histogram(
+                    device_names.get(
+                        event.device_guid,
+                        str(event.device_guid)
+                    ),
+                    input_name(event.event_type, event.identifier)
+                )
+                histograms[event] = histogram
+            histogram.record(duration)
+
+    return wrapper
+
+
+def instrument_callback(callback, device, input, container):
+    """Returns a timed version of a container callback.
+
+    Execution graphs reachable from the callback and the functors they run
+    are instrumented as well, which allows attributing time to individual
+    actions.
+
+    :param callback the callback generated by a container
+    :param device name of the device the callback belongs to
+    :param input name of the input the callback belongs to
+    :param container name of the container that created the callback
+    :return timed callable to register in place of the callback
+    """
+    for graph in _find_execution_graphs(callback):
+        _instrument_graph(graph, device, input, container)
+    return timed(
+        callback,
+        Instrumentation().histogram(device, input, container)
+    )
+
+
+def input_name(input_type, input_id):
+    """Returns the name of an input used in histogram keys.
+
+    :param input_type the type of the input
+    :param input_id the identifier of the input
+    :return name of the input
+    """
+    try:
+        return common.input_to_ui_string(input_type, input_id)
+    except Exception:
+        return "{} {}".format(input_type.name, input_id)
+
+
+def _output_name(output_type, device_id, input_id):
+    """Returns the name of an output used in trace keys.
+
+    :param output_type the type of the output
+    :param device_id id of the vJoy device, if any
+    :param input_id id of the vJoy input or number of inputs sent
+    :return name of the output
+    """
+    if output_type == "SendInput":
+        return "SendInput"
+    if output_type == "Axis":
+        try:
+            input_id = vjoy.AxisName(input_id).name
+        except ValueError:
+            pass
+    return "vJoy {} {} {}".format(device_id, output_type, input_id)
+
+
+def _functor_name(functor):
+    """Returns the name identifying a functor.
+
+    :param functor the functor to name
+    :return name of the functor
+    """
+    name = type(functor).__name__
+    if name.endswith("Functor"):
+        name = name[:-len("Functor")]
+    return name
+
+
+def _find_execution_graphs(instance):
+    """Returns the execution graphs directly held by an object.
+
+    :param instance the object to inspect
+    :return list of execution graphs
+    """
+    graphs = []
+    for value in getattr(instance, "__dict__", {}).values():
+        if isinstance(value, (list, tuple)):
+            graphs.extend(
+                v for v in value
+                if isinstance(v, execution_graph.AbstractExecutionGraph)
+            )
+        elif isinstance(value, execution_graph.AbstractExecutionGraph):
+            graphs.append(value)
+    return graphs
+
+
+def _instrument_graph(graph, device, input, container):
+    """Replaces the functors run by a graph with timed versions.
+
+    Nested graphs, such as the action sets of a container, are instrumented
+    recursively. The graph's program is recompiled afterwards.
+
+    :param graph the execution graph to instrument
+    :param device name of the device the graph belongs to
+    :param input name of the input the graph belongs to
+    :param container name of the container the graph belongs to
+    """
+    for functor in graph.functors:
+        for nested in _find_execution_graphs(functor):
+            _instrument_graph(nested, device, input, container)
+        # The instance attribute shadows the method and is picked up when
+        # the program is compiled
+        functor.process_event = timed(
+            functor.process_event,
+            Instrumentation().histogram(
+                device,
+                input,
+                container,
+                _functor_name(functor)
+            )
+        )
+    graph._program = graph._compile_program()
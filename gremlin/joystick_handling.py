@@ -38,6 +38,9 @@ class VJoyProxy:
 
     vjoy_devices = {}
 
+    # Prevents callbacks on different threads from acquiring a device twice
+    _lock = threading.Lock()
+
     def __getitem__(self, key):
         """Returns the requested vJoy instance.
 
@@ -52,18 +55,21 @@ class VJoyProxy:
                     "Integer ID for vjoy device ID expected"
                 )
 
-            try:
-                device = vjoy.VJoy(key)
-                VJoyProxy.vjoy_devices[key] = device
-                return device
-            except error.VJoyError as e:
-                logging.getLogger("system").error(
-                    "Failed accessing vJoy id={}, error is: {}".format(
-                        key,
-                        e
+            with VJoyProxy._lock:
+                if key in VJoyProxy.vjoy_devices:
+                    return VJoyProxy.vjoy_devices[key]
+                try:
+                    device = vjoy.VJoy(key)
+                    VJoyProxy.vjoy_devices[key] = device
+                    return device
+                except error.VJoyError as e:
+                    logging.getLogger("system").error(
+                        "Failed accessing vJoy id={}, error is: {}".format(
+                            key,
+                            e
+                        )
                     )
-                )
-                raise e
+                    raise e
 
     @classmethod
     def reset(cls):
@@ -72,6 +78,18 @@ class VJoyProxy:
             device.invalidate()
         VJoyProxy.vjoy_devices = {}
 
+    @classmethod
+    def output_statistics(cls):
+        """Returns the write statistics of all held vJoy devices.
+
+        :return dictionary mapping vJoy ids to the statistics reported by
+            the corresponding device
+        """
+        return {
+            vid: device.output_statistics()
+            for vid, device in VJoyProxy.vjoy_devices.items()
+        }
+
 
 def joystick_devices():
     """Returns the list of joystick like devices.
@@ -18,10 +18,12 @@
 import collections
 import ctypes
 from ctypes import wintypes
-import functools
+import heapq
+import itertools
 import logging
+import math
 import time
-from threading import Event, Lock, Thread
+from threading import Condition, Event, Lock, Thread
 from xml.etree import ElementTree
 
 import win32con
@@ -30,12 +32,22 @@ import win32api
 import gremlin
 
 
-MacroEntry = collections.namedtuple(
-    "MacroEntry",
-    ["macro", "state"]
+# Compiled representation of a macro, the key identifies the macro state and
+# settings the steps were compiled from
+CompiledMacro = collections.namedtuple(
+    "CompiledMacro",
+    ["key", "steps"]
 )
 
 
+class StepOperation:
+
+    """Operations performed by the steps of a compiled macro."""
+
+    Action = 0
+    Pause = 1
+
+
 def _create_function(lib_name, fn_name, param_types, return_type):
     """Creates a handle to a windows dll library function.
 
@@ -207,6 +219,201 @@ def _send_key_up(key):
     win32api.keybd_event(key.virtual_code, key.scan_code, flags, 0)
 
 
+class MacroExecutor:
+
+    """Runs macros as resumable step sequences on a fixed pool of workers.
+
+    The steps of a macro are provided by a generator which executes actions
+    until it has to wait, at which point it yields the duration of the wait.
+    Instead of blocking a thread the generator is handed to a single timing
+    thread which returns it to the workers once the wait is over.
+
+    With precise timing enabled, deadlines are computed from the previous
+    step's deadline rather than the time the step finished. Delays in
+    executing a step are thereby compensated by the following waits instead
+    of accumulating over the course of a macro. A deadline never lies in
+    the past though, a macro that fell behind by more than a wait continues
+    from the current time rather than running the missed steps in a burst.
+    The timing thread in addition wakes up slightly early and spins until the
+    exact deadline to avoid oversleeping.
+    """
+
+    # Time in seconds before a deadline at which to stop sleeping and spin
+    spin_margin = 0.002
+
+    def __init__(self, worker_count=4, clock=time.perf_counter):
+        """Creates a new instance.
+
+        :param worker_count number of threads executing macro steps
+        :param clock function returning the current time in seconds
+        """
+        self.worker_count = worker_count
+        self.precise_timing = False
+        self._clock = clock
+        self._ready = collections.deque()
+        self._ready_condition = Condition()
+        self._waiting = []
+        self._waiting_condition = Condition()
+        self._counter = itertools.count()
+        self._threads = []
+
+        # Execution statistics
+        self._stats_lock = Lock()
+        self._step_count = 0
+        self._total_lateness = 0.0
+        self._total_squared_lateness = 0.0
+        self._max_lateness = 0.0
+        self._max_queue_depth = 0
+
+    @property
+    def queue_depth(self):
+        """Returns the number of step sequences waiting to be resumed.
+
+        :return number of sequences that are either ready to run or waiting
+            for their deadline
+        """
+        return len(self._ready) + len(self._waiting)
+
+    def submit(self, steps):
+        """Schedules a step sequence for immediate execution.
+
+        :param steps generator executing the steps of a macro
+        """
+        if len(self._threads) == 0:
+            self._start_threads()
+        self._make_ready(steps, self._clock())
+
+    def statistics(self):
+        """Returns statistics about the execution of macro steps.
+
+        Lateness is the time between a step's deadline and the moment a
+        worker started executing it, jitter is the standard deviation of
+        the lateness.
+
+        :return dictionary containing the current and maximum queue depth,
+            the number of executed steps, as well as the mean, maximum, and
+            jitter of the lateness in seconds
+        """
+        with self._stats_lock:
+            mean = 0.0
+            jitter = 0.0
+            if self._step_count > 0:
+                mean = self._total_lateness / self._step_count
+                jitter = math.sqrt(max(
+                    0.0,
+                    self._total_squared_lateness / self._step_count - mean**2
+                ))
+            return {
+                "queue_depth": self.queue_depth,
+                "max_queue_depth": self._max_queue_depth,
+                "steps": self._step_count,
+                "mean_lateness": mean,
+                "max_lateness": self._max_lateness,
+                "jitter": jitter
+            }
+
+    def _start_threads(self):
+        """Starts the worker and timing threads."""
+        self._threads = [
+            Thread(target=self._work, daemon=True)
+            for _ in range(self.worker_count)
+        ]
+        self._threads.append(Thread(target=self._wait, daemon=True))
+        for thread in self._threads:
+            thread.start()
+
+    def _make_ready(self, steps, deadline):
+        """Hands a step sequence to the workers.
+
+        :param steps generator executing the steps of a macro
+        :param deadline time at which the next step was meant to run
+        """
+        with self._ready_condition:
+            self._ready.append((deadline, steps))
+            self._ready_condition.notify()
+        with self._stats_lock:
+            self._max_queue_depth = max(
+                self._max_queue_depth,
+                self.queue_depth
+            )
+
+    def _work(self):
+        """Resumes step sequences that are ready to run."""
+        while True:
+            with self._ready_condition:
+                while len(self._ready) == 0:
+                    self._ready_condition.wait()
+                deadline, steps = self._ready.popleft()
+
+            lateness = self._clock() - deadline
+            with self._stats_lock:
+                self._step_count += 1
+                self._total_lateness += lateness
+                self._total_squared_lateness += lateness**2
+                self._max_lateness = max(self._max_lateness, lateness)
+
+            try:
+                delay = next(steps)
+            except StopIteration:
+                continue
+            except Exception as e:
+                logging.getLogger("system").exception(
+                    "Error while executing macro: {}".format(e)
+                )
+                continue
+
+            deadline = self._next_deadline(deadline, delay)
+            if deadline <= self._clock():
+                self._make_ready(steps, deadline)
+            else:
+                with self._waiting_condition:
+                    heapq.heappush(
+                        self._waiting,
+                        (deadline, next(self._counter), steps)
+                    )
+                    self._waiting_condition.notify()
+
+    def _next_deadline(self, deadline, delay):
+        """Returns the deadline of the step following a wait.
+
+        :param deadline the deadline of the step that requested the wait
+        :param delay duration of the wait in seconds
+        :return deadline of the next step
+        """
+        if self.precise_timing:
+            return max(deadline + delay, self._clock())
+        else:
+            return self._clock() + delay
+
+    def _wait(self):
+        """Returns waiting step sequences to the workers once due."""
+        while True:
+            with self._waiting_condition:
+                while True:
+                    if len(self._waiting) == 0:
+                        self._waiting_condition.wait()
+                        continue
+                    timeout = self._waiting[0][0] - self._clock()
+                    if self.precise_timing:
+                        timeout -= MacroExecutor.spin_margin
+                    if timeout <= 0:
+                        break
+                    self._waiting_condition.wait(timeout)
+                deadline, _, steps = heapq.heappop(self._waiting)
+
+            if self.precise_timing:
+                self._spin_until(deadline)
+            self._make_ready(steps, deadline)
+
+    def _spin_until(self, deadline):
+        """Busy waits until the given deadline has passed.
+
+        :param deadline the time until which to wait
+        """
+        while self._clock() < deadline:
+            time.sleep(0)
+
+
 @gremlin.common.SingletonDecorator
 class MacroManager:
 
@@ -215,11 +422,18 @@ class MacroManager:
     def __init__(self):
         """Initializes the instance."""
         self._active = {}
-        self._queue = []
         self._flags = {}
         self._flags_lock = Lock()
         self._queue_lock = Lock()
 
+        # Queued macros, mapping macro ids in order of their first request
+        # to the compiled steps of each requested execution
+        self._queue = collections.OrderedDict()
+        # Ids of macros with a pending termination request
+        self._terminations = set()
+        # Compiled macros indexed by macro id
+        self._compiled = {}
+
         # Default delay between subsequent message dispatch. This is to get
         # around some games not picking up messages if they are sent in too
         # quick a succession.
@@ -230,6 +444,7 @@ class MacroManager:
         self._schedule_event = Event()
 
         self._run_scheduler_thread = None
+        self._executor = MacroExecutor()
 
     def start(self):
         """Starts the scheduler."""
@@ -257,6 +472,12 @@ class MacroManager:
                 for key, value in self._flags.items():
                     self._flags[key] = False
 
+        # Macros are compiled anew for the next profile, termination requests
+        # only apply to the macros of the one being stopped
+        with self._queue_lock:
+            self._terminations.clear()
+            self._compiled.clear()
+
     def queue_macro(self, macro):
         """Queues a macro in the schedule taking the repeat type into account.
 
@@ -265,18 +486,43 @@ class MacroManager:
         if isinstance(macro.repeat, ToggleRepeat) and macro.id in self._active:
             self.terminate_macro(macro)
         else:
-            # Preprocess macro to contain pauses as necessary
-            self._preprocess_macro(macro)
+            steps = self._compile_macro(macro)
             with self._queue_lock:
-                self._queue.append(MacroEntry(macro, True))
+                if macro.id not in self._queue:
+                    self._queue[macro.id] = collections.deque()
+                self._queue[macro.id].append((macro, steps))
             self._schedule_event.set()
 
+    @property
+    def precise_timing(self):
+        """Returns whether macro steps are scheduled against fixed deadlines.
+
+        :return True if timing errors are compensated, False otherwise
+        """
+        return self._executor.precise_timing
+
+    @precise_timing.setter
+    def precise_timing(self, value):
+        """Sets whether macro steps are scheduled against fixed deadlines.
+
+        :param value True to compensate timing errors, False otherwise
+        """
+        self._executor.precise_timing = bool(value)
+
+    def execution_statistics(self):
+        """Returns statistics about the execution of macros.
+
+        :return dictionary of statistics as provided by the executor
+        """
+        return self._executor.statistics()
+
     def terminate_macro(self, macro):
         """Adds a termination request for a macro to the execution queue.
 
         :param macro the macro to terminate
         """
-        self._queue.append(MacroEntry(macro, False))
+        with self._queue_lock:
+            self._terminations.add(macro.id)
         self._schedule_event.set()
 
     def _run_scheduler(self):
@@ -286,121 +532,182 @@ class MacroManager:
             self._schedule_event.wait()
             self._schedule_event.clear()
 
-            # Run scheduled macros and ensure exclusive ones run separately
-            # from all other macros
             with self._queue_lock:
-                entries_to_remove = []
+                # Terminate running macros, a request for a macro that is not
+                # running yet remains pending until it is
+                for macro_id in list(self._terminations):
+                    if self._flags.get(macro_id, False):
+                        with self._flags_lock:
+                            self._flags[macro_id] = False
+                        self._terminations.discard(macro_id)
+
+                        # Remove all queued up executions of the macro as
+                        # they should have been impossible to queue up in
+                        # the first place
+                        self._queue.pop(macro_id, None)
+
+                # Run scheduled macros and ensure exclusive ones run
+                # separately from all other macros
                 has_exclusive = False
-                for i, entry in enumerate(self._queue):
-                    # Terminate macro if needed
-                    if entry.state is False:
-                        if entry.macro.id in self._flags \
-                                and self._flags[entry.macro.id]:
-                            # Terminate currently running macro
-                            with self._flags_lock:
-                                self._flags[entry.macro.id] = False
-                            # del self._queue[i]
-
-                            # Remove all queued up macros with the same id as
-                            # they should have been impossible to queue up
-                            # in the first place
-                            removal_list = []
-                            for queue_entry in self._queue:
-                                if queue_entry.macro.id == entry.macro.id:
-                                    removal_list.append(queue_entry)
-                            for queue_entry in removal_list:
-                                self._queue.remove(queue_entry)
-                    # Don't run a queued macro if the same instance is already
-                    # running
-                    elif entry.macro.id in self._active:
+                for macro_id, executions in list(self._queue.items()):
+                    macro, steps = executions[0]
+                    # Don't run a queued macro if the same instance is
+                    # already running
+                    if macro_id in self._active:
                         continue
                     # Handle exclusive macros
-                    elif entry.macro.exclusive:
+                    elif macro.exclusive:
                         has_exclusive = True
                         if len(self._active) == 0:
-                            self._dispatch_macro(entry.macro)
+                            self._dispatch_macro(macro, steps)
                             self._is_executing_exclusive = True
-                            entries_to_remove.append(entry)
+                            self._pop_execution(macro_id)
                     # Start a queued up macro
                     elif not has_exclusive and not self._is_executing_exclusive:
-                        self._dispatch_macro(entry.macro)
-                        entries_to_remove.append(entry)
+                        self._dispatch_macro(macro, steps)
+                        self._pop_execution(macro_id)
 
-                # Remove all entries we've processed
-                for entry in entries_to_remove:
-                    if entry in self._queue:
-                        self._queue.remove(entry)
+    def _pop_execution(self, macro_id):
+        """Removes the oldest queued execution of a macro.
 
-    def _dispatch_macro(self, macro):
+        :param macro_id id of the macro whose execution to remove
+        """
+        executions = self._queue[macro_id]
+        executions.popleft()
+        if len(executions) == 0:
+            del self._queue[macro_id]
+
+    def _dispatch_macro(self, macro, steps):
         """Dispatches a single macro to be run.
 
         :param macro the macro to dispatch
+        :param steps the compiled steps of the macro
         """
         if macro.id not in self._active:
             self._active[macro.id] = macro
-            Thread(target=functools.partial(self._execute_macro, macro)).start()
+            self._executor.submit(self._execute_macro(macro, steps))
         else:
             logging.getLogger("system").warning(
                 "Attempting to dispatch an already running macro"
             )
 
-    def _execute_macro(self, macro):
-        """Executes a given macro in a separate thread.
+    def _execute_macro(self, macro, steps):
+        """Executes a given macro step by step.
 
-        This method will run all provided actions and once they all have been
-        executed will remove the macro from the set of active macros and
-        inform the scheduler of the completion.
+        This generator runs the macro's actions, yielding the duration of
+        every pause rather than waiting itself. Once all actions have been
+        executed it removes the macro from the set of active macros and
+        informs the scheduler of the completion.
 
         :param macro the macro object to be executed
+        :param steps the compiled steps of the macro
+        :return generator yielding the duration of each pause in seconds
         """
-        # Handle macros with a repeat mode
-        if macro.repeat is not None:
-            delay = macro.repeat.delay
-
+        try:
+            # Handle macros with a repeat mode
+            if macro.repeat is not None:
+                delay = macro.repeat.delay
+
+                with self._flags_lock:
+                    self._flags[macro.id] = True
+
+                # Handle count repeat mode
+                if isinstance(macro.repeat, CountRepeat):
+                    count = 0
+                    while count < macro.repeat.count and self._flags[macro.id]:
+                        yield from self._execute_steps(steps)
+                        count += 1
+                        yield delay
+
+                # Handle continuous repeat modes
+                elif type(macro.repeat) in [HoldRepeat, ToggleRepeat]:
+                    while self._flags[macro.id]:
+                        yield from self._execute_steps(steps)
+                        yield delay
+
+            # Handle simple one shot macros
+            else:
+                yield from self._execute_steps(steps)
+
+        finally:
+            # Remove macro from active set, notify manager, and remove any
+            # potential callbacks
+            del self._active[macro.id]
+            if macro.exclusive:
+                self._is_executing_exclusive = False
             with self._flags_lock:
-                self._flags[macro.id] = True
-
-            # Handle count repeat mode
-            if isinstance(macro.repeat, CountRepeat):
-                count = 0
-                while count < macro.repeat.count and self._flags[macro.id]:
-                    for action in macro.sequence:
-                        action()
-                    count += 1
-                    time.sleep(delay)
-
-            # Handle continuous repeat modes
-            elif type(macro.repeat) in [HoldRepeat, ToggleRepeat]:
-                while self._flags[macro.id]:
-                    for action in macro.sequence:
-                        action()
-                    time.sleep(delay)
-
-        # Handle simple one shot macros
-        else:
-            for action in macro.sequence:
-                action()
-
-        # Remove macro from active set, notify manager, and remove any
-        # potential callbacks
-        del self._active[macro.id]
-        if macro.exclusive:
-            self._is_executing_exclusive = False
-        with self._flags_lock:
-            if macro.id in self._flags:
-                self._flags[macro.id] = False
-        self._schedule_event.set()
+                if macro.id in self._flags:
+                    self._flags[macro.id] = False
+            self._schedule_event.set()
+
+    def _execute_steps(self, steps):
+        """Executes compiled steps, yielding instead of pausing.
+
+        :param steps the compiled steps to execute
+        :return generator yielding the duration of each pause in seconds
+        """
+        for operation, argument in steps:
+            if operation == StepOperation.Pause:
+                yield argument
+            else:
+                argument()
+
+    def _compile_macro(self, macro):
+        """Returns the compiled steps of a macro.
+
+        Compilation inserts the default delay between actions and, if the
+        macro batches its inputs, merges consecutive actions that can be
+        sent together, removing the default delay between them. The result
+        is cached until the macro or the relevant settings change.
 
-    def _preprocess_macro(self, macro):
-        """Inserts pauses as necessary into the macro."""
-        new_sequence = [macro.sequence[0]]
-        for a1, a2 in zip(macro.sequence[:-1], macro.sequence[1:]):
-            if isinstance(a1, PauseAction) or isinstance(a2, PauseAction):
-                new_sequence.append(a2)
+        :param macro the macro to compile
+        :return tuple of (operation, argument) steps
+        """
+        key = (macro.version, macro.batch_inputs, self.default_delay)
+        compiled = self._compiled.get(macro.id)
+        if compiled is not None and compiled.key == key:
+            return compiled.steps
+
+        sequence = macro.sequence
+        if macro.batch_inputs:
+            sequence = self._merge_inputs(sequence)
+
+        steps = []
+        previous = None
+        for action in sequence:
+            if isinstance(action, PauseAction):
+                steps.append((StepOperation.Pause, action.duration))
             else:
-                new_sequence.append(PauseAction(self.default_delay))
-                new_sequence.append(a2)
-        macro._sequence = new_sequence
+                if previous is not None and \
+                        not isinstance(previous, PauseAction):
+                    steps.append((StepOperation.Pause, self.default_delay))
+                steps.append((StepOperation.Action, action))
+            previous = action
+
+        self._compiled[macro.id] = CompiledMacro(key, tuple(steps))
+        return self._compiled[macro.id].steps
+
+    def _merge_inputs(self, sequence):
+        """Merges consecutive actions that can be sent together.
+
+        :param sequence the actions to process
+        :return new sequence with consecutive batchable actions merged
+        """
+        new_sequence = []
+        batch = []
+        for action in sequence + [None]:
+            if action is not None and action.can_batch:
+                batch.append(action)
+                continue
+
+            if len(batch) == 1:
+                new_sequence.append(batch[0])
+            elif len(batch) > 1:
+                new_sequence.append(InputBatchAction(batch))
+            batch = []
+            if action is not None:
+                new_sequence.append(action)
+        return new_sequence
 
 
 class Macro:
@@ -417,6 +724,8 @@ class Macro:
         Macro._next_macro_id += 1
         self.repeat = None
         self.exclusive = False
+        self.batch_inputs = False
+        self._version = 0
 
     @property
     def id(self):
@@ -426,6 +735,16 @@ class Macro:
         """
         return self._id
 
+    @property
+    def version(self):
+        """Returns the version of the action sequence.
+
+        The version changes whenever the action sequence is modified.
+
+        :return version of the action sequence
+        """
+        return self._version
+
     @property
     def sequence(self):
         """Returns the action sequence of this macro.
@@ -440,6 +759,7 @@ class Macro:
         :param action the action to add
         """
         self._sequence.append(action)
+        self._version += 1
 
     def pause(self, duration):
         """Adds a pause of the given duration to the macro.
@@ -447,6 +767,7 @@ class Macro:
         :param duration the duration of the pause in seconds
         """
         self._sequence.append(PauseAction(duration))
+        self._version += 1
 
     def press(self, key):
         """Presses the specified key down.
@@ -485,17 +806,48 @@ class Macro:
             raise gremlin.error.KeyboardError("Invalid key specified")
 
         self._sequence.append(KeyAction(key, is_pressed))
+        self._version += 1
 
 
 class AbstractAction:
 
     """Base class for all macro action."""
 
+    # Whether or not the action can be sent together with other inputs
+    can_batch = False
+
     def __call__(self):
         raise gremlin.error.MissingImplementationError(
             "AbstractAction.__call__ not implemented in derived class."
         )
 
+    def append_to(self, buffer):
+        """Adds the inputs generated by this action to an input buffer.
+
+        :param buffer the sendinput.InputBuffer to add the inputs to
+        """
+        raise gremlin.error.MissingImplementationError(
+            "AbstractAction.append_to not implemented in derived class."
+        )
+
+
+class InputBatchAction(AbstractAction):
+
+    """Sends the inputs of several actions with a single call."""
+
+    def __init__(self, actions):
+        """Creates a new InputBatchAction object for use in a macro.
+
+        :param actions the actions whose inputs to send together
+        """
+        self.actions = actions
+
+    def __call__(self):
+        buffer = gremlin.sendinput.input_buffer()
+        for action in self.actions:
+            action.append_to(buffer)
+        buffer.flush()
+
 
 class JoystickAction(AbstractAction):
 
@@ -541,13 +893,15 @@ class JoystickAction(AbstractAction):
                 value=self.value
             )
 
-        el.joystick_event.emit(event)
+        el.dispatch_joystick_event(event)
 
 
 class KeyAction(AbstractAction):
 
     """Key to press or release by a macro."""
 
+    can_batch = True
+
     def __init__(self, key, is_pressed):
         """Creates a new KeyAction object for use in a macro.
 
@@ -565,11 +919,21 @@ class KeyAction(AbstractAction):
         else:
             _send_key_up(self.key)
 
+    def append_to(self, buffer):
+        buffer.add_key(
+            self.key.virtual_code,
+            self.key.scan_code,
+            self.key.is_extended,
+            self.is_pressed
+        )
+
 
 class MouseButtonAction(AbstractAction):
 
     """Mouse button action."""
 
+    can_batch = True
+
     def __init__(self, button, is_pressed):
         """Creates a new MouseButtonAction object for use in a macro.
 
@@ -593,11 +957,27 @@ class MouseButtonAction(AbstractAction):
             else:
                 gremlin.sendinput.mouse_release(self.button)
 
+    def append_to(self, buffer):
+        if self.button == gremlin.common.MouseButton.WheelDown:
+            buffer.add_mouse(
+                gremlin.sendinput.MOUSEEVENTF_WHEEL,
+                data=-gremlin.sendinput.WHEEL_DELTA
+            )
+        elif self.button == gremlin.common.MouseButton.WheelUp:
+            buffer.add_mouse(
+                gremlin.sendinput.MOUSEEVENTF_WHEEL,
+                data=gremlin.sendinput.WHEEL_DELTA
+            )
+        else:
+            buffer.add_mouse_button(self.button, self.is_pressed)
+
 
 class MouseMotionAction(AbstractAction):
 
     """Mouse motion action."""
 
+    can_batch = True
+
     def __init__(self, dx, dy):
         """Creates a new MouseMotionAction object for use in a macro.
 
@@ -610,6 +990,9 @@ class MouseMotionAction(AbstractAction):
     def __call__(self):
         gremlin.sendinput.mouse_relative_motion(self.dx, self.dy)
 
+    def append_to(self, buffer):
+        buffer.add_mouse(gremlin.sendinput.MOUSEEVENTF_MOVE, self.dx, self.dy)
+
 
 class PauseAction(AbstractAction):
 
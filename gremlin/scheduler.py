@@ -0,0 +1,311 @@
+# -*- coding: utf-8; -*-
+
+# Copyright (C) 2015 - 2019 Lionel Ott
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+
+import collections
+import logging
+import math
+import threading
+import time
+
+from . import common
+
+
+class TimerHandle:
+
+    """Handle of a callback scheduled for delayed execution.
+
+    A handle can be cancelled and rescheduled any number of times, including
+    after its callback has run, which allows reusing a single handle for
+    recurring or restartable timers.
+    """
+
+    def __init__(self, scheduler, callback, args):
+        """Creates a new instance.
+
+        :param scheduler the scheduler managing this handle
+        :param callback the function to run
+        :param args positional arguments passed to the callback
+        """
+        self.callback = callback
+        self.args = args
+        self.expiry = None
+        self._scheduler = scheduler
+        self._slot = None
+        # Incremented whenever the handle is cancelled or rescheduled, which
+        # invalidates an expiry that has not been run yet
+        self._generation = 0
+
+    @property
+    def is_pending(self):
+        """Returns whether or not the callback is waiting to be run.
+
+        :return True if the callback is scheduled, False otherwise
+        """
+        return self._slot is not None
+
+    def cancel(self):
+        """Prevents the callback from running if it has not run yet."""
+        self._scheduler.cancel(self)
+
+    def reschedule(self, delay):
+        """Runs the callback after the given delay instead of the old one.
+
+        :param delay time in seconds after which to run the callback
+        """
+        self._scheduler.reschedule(self, delay)
+
+
+@common.SingletonDecorator
+class Scheduler:
+
+    """Runs callbacks after a delay using a single shared thread.
+
+    Pending callbacks are stored in a hierarchical timer wheel. Each level
+    consists of a fixed number of slots, with every slot of a level spanning
+    the entire range of the level below it. Scheduling and cancelling are
+    constant time operations, and callbacks in higher levels are moved down
+    as their expiry time approaches.
+
+    Expired callbacks are handed from the thread keeping time to a worker
+    thread, such that callbacks never delay the expiry of other callbacks.
+    The worker runs callbacks sequentially, a callback that blocks delays
+    the callbacks expiring after it, long running work therefore has to be
+    moved to a thread of its own.
+    """
+
+    # Duration of a single tick of the wheel in seconds
+    tick_duration = 0.005
+
+    # Number of bits used to index the slots of a single level
+    slot_bits = 6
+
+    # Number of levels, the last one covering several days
+    level_count = 4
+
+    def __init__(self):
+        """Creates a new instance."""
+        self._slot_count = 1 << self.slot_bits
+        self._slot_mask = self._slot_count - 1
+        self._wheels = [
+            [set() for _ in range(self._slot_count)]
+            for _ in range(self.level_count)
+        ]
+        self._pending_count = 0
+        self._start_time = time.monotonic()
+        self._current_tick = 0
+        self._condition = threading.Condition()
+        self._thread = None
+        self._ready = collections.deque()
+        self._ready_condition = threading.Condition()
+        self._worker = None
+
+    def schedule(self, delay, callback, *args):
+        """Runs the callback after the given delay.
+
+        :param delay time in seconds after which to run the callback
+        :param callback the function to run
+        :param args positional arguments passed to the callback
+        :return TimerHandle which allows cancelling and rescheduling the call
+        """
+        handle = TimerHandle(self, callback, args)
+        self.reschedule(handle, delay)
+        return handle
+
+    def cancel(self, handle):
+        """Removes the handle's callback from the set of pending callbacks.
+
+        :param handle the handle of the callback to cancel
+        """
+        with self._condition:
+            self._remove(handle)
+            handle._generation += 1
+
+    def reschedule(self, handle, delay):
+        """Runs the handle's callback after the given delay.
+
+        Any previously scheduled execution of the callback is discarded.
+
+        :param handle the handle of the callback to reschedule
+        :param delay time in seconds after which to run the callback
+        """
+        with self._condition:
+            self._remove(handle)
+            handle._generation += 1
+            if self._pending_count == 0:
+                # Nothing needs to be expired, skip the wheel ahead
+                self._current_tick = self._tick_at(time.monotonic())
+            handle.expiry = max(
+                self._current_tick + 1,
+                math.ceil(
+                    (time.monotonic() + delay - self._start_time)
+                    / self.tick_duration
+                )
+            )
+            self._insert(handle)
+            self._pending_count += 1
+
+            if self._thread is None:
+                self._worker = threading.Thread(
+                    target=self._run_callbacks,
+                    daemon=True
+                )
+                self._worker.start()
+                self._thread = threading.Thread(target=self._run, daemon=True)
+                self._thread.start()
+            self._condition.notify()
+
+    def _tick_at(self, timestamp):
+        """Returns the tick corresponding to the given time.
+
+        :param timestamp monotonic time for which to compute the tick
+        :return tick corresponding to the provided time
+        """
+        return int((timestamp - self._start_time) / self.tick_duration)
+
+    def _insert(self, handle):
+        """Places the handle in the slot matching its expiry tick.
+
+        :param handle the handle to place in the wheel
+        """
+        delta = handle.expiry - self._current_tick
+        level = 0
+        while level < self.level_count - 1 and \
+                delta >= 1 << (self.slot_bits * (level + 1)):
+            level += 1
+        index = (handle.expiry >> (self.slot_bits * level)) & \
+            self._slot_mask
+        if level == self.level_count - 1 and \
+                delta >= 1 << (self.slot_bits * self.level_count):
+            # Beyond the range of the wheel, park the handle in the slot
+            # visited last, it will be placed again once that slot cascades
+            index = ((self._current_tick >> (self.slot_bits * level))
+                     - 1) & self._slot_mask
+        handle._slot = self._wheels[level][index]
+        handle._slot.add(handle)
+
+    def _remove(self, handle):
+        """Removes the handle from the wheel if it is pending.
+
+        :param handle the handle to remove
+        """
+        if handle._slot is not None:
+            handle._slot.discard(handle)
+            handle._slot = None
+            self._pending_count -= 1
+
+    def _cascade(self, level):
+        """Moves the handles of the current slot of a level to lower levels.
+
+        :param level the level whose current slot to redistribute
+        :return index of the slot that was redistributed
+        """
+        index = (self._current_tick >> (self.slot_bits * level)) & \
+            self._slot_mask
+        slot = self._wheels[level][index]
+        self._wheels[level][index] = set()
+        for handle in slot:
+            self._insert(handle)
+        return index
+
+    def _advance(self):
+        """Advances the wheel by a single tick.
+
+        :return list of handles that expired during this tick
+        """
+        self._current_tick += 1
+        index = self._current_tick & self._slot_mask
+        level = 1
+        while index == 0 and level < self.level_count:
+            index = self._cascade(level)
+            level += 1
+
+        index = self._current_tick & self._slot_mask
+        expired = list(self._wheels[0][index])
+        self._wheels[0][index] = set()
+        for handle in expired:
+            handle._slot = None
+        self._pending_count -= len(expired)
+        return expired
+
+    def _ticks_until_event(self):
+        """Returns the number of ticks until the wheel needs to advance.
+
+        This is either the next occupied slot of the lowest level or the
+        next cascade of the higher levels, whichever comes first.
+
+        :return number of ticks until the next relevant tick
+        """
+        for offset in range(1, self._slot_count + 1):
+            tick = self._current_tick + offset
+            if len(self._wheels[0][tick & self._slot_mask]) > 0 or \
+                    tick & self._slot_mask == 0:
+                return offset
+        return self._slot_count
+
+    def _run(self):
+        """Hands scheduled callbacks to the worker once their expiry tick is
+        reached."""
+        while True:
+            expired = []
+            with self._condition:
+                while len(expired) == 0:
+                    if self._pending_count == 0:
+                        self._condition.wait()
+                        continue
+
+                    now_tick = self._tick_at(time.monotonic())
+                    while self._current_tick < now_tick and \
+                            self._pending_count > 0:
+                        expired.extend(
+                            (handle, handle._generation)
+                            for handle in self._advance()
+                        )
+                    if len(expired) > 0 or self._pending_count == 0:
+                        continue
+
+                    self._condition.wait(
+                        (self._current_tick + self._ticks_until_event())
+                        * self.tick_duration
+                        + self._start_time
+                        - time.monotonic()
+                    )
+
+            with self._ready_condition:
+                self._ready.extend(expired)
+                self._ready_condition.notify()
+
+    def _run_callbacks(self):
+        """Runs the callbacks handed over by the timing thread.
+
+        Callbacks whose handle was cancelled or rescheduled after expiring
+        are skipped.
+        """
+        while True:
+            with self._ready_condition:
+                while len(self._ready) == 0:
+                    self._ready_condition.wait()
+                handle, generation = self._ready.popleft()
+
+            if handle._generation != generation:
+                continue
+            try:
+                handle.callback(*handle.args)
+            except Exception as e:
+                logging.getLogger("system").exception(
+                    "Error in scheduled callback: {}".format(e)
+                )
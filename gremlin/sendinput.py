@@ -50,6 +50,14 @@ MOUSEEVENTF_XDOWN = 0x0080
 MOUSEEVENTF_XUP = 0x0100
 
 
+"""Defines flags used when specifying KEYBDINPUT structures.
+
+https://msdn.microsoft.com/en-us/library/ms646271(v=vs.85).aspx
+"""
+KEYEVENTF_EXTENDEDKEY = 0x0001
+KEYEVENTF_KEYUP = 0x0002
+
+
 """Defines data structure type for INPUT structures.
 
 https://msdn.microsoft.com/en-us/library/ms646270(v=vs.85).aspx
@@ -68,10 +76,11 @@ class MotionType(enum.Enum):
 
 class MouseMotion:
 
-    """Base class of all mouse motion behaviours."""
+    """Base class of all mouse motion behaviours.
 
-    # Time step between calls
-    delta_t = 0.01
+    A motion provides the velocity of the cursor, the distance to move for
+    a given time step is computed from it by the motion controller.
+    """
 
     def __init__(self, dx=0, dy=0):
         """Creates a new instance.
@@ -82,47 +91,21 @@ class MouseMotion:
         self.dx = dx
         self.dy = dy
 
-        self._tick_dx_value, self._tick_dx_time = self._compute_values(self.dx)
-        self._tick_dy_value, self._tick_dy_time = self._compute_values(self.dy)
+    @property
+    def is_moving(self):
+        """Returns whether or not this motion moves the cursor.
 
-        self._dx_timestamp = 0
-        self._dy_timestamp = 0
-
-    def __call__(self):
-        """Returns the change in x and y for this point in time.
-
-        :return dx, dy for this time point
+        :return True if the cursor is moved, False otherwise
         """
-        if self._tick_dx_value == 0 and self._tick_dy_value == 0:
-            return 0, 0
-
-        delta_x = 0
-        delta_y = 0
-
-        cur_time = time.time()
-        if self._dx_timestamp < cur_time:
-            delta_x = self._tick_dx_value
-            self._dx_timestamp = cur_time + self._tick_dx_time
-        if self._dy_timestamp < cur_time:
-            delta_y = self._tick_dy_value
-            self._dy_timestamp = cur_time + self._tick_dy_time
+        return abs(self.dx) > 1e-6 or abs(self.dy) > 1e-6
 
-        return delta_x, delta_y
+    def __call__(self, delta_t):
+        """Returns the change in x and y over the given time step.
 
-    def _compute_values(self, delta):
-        """Computes discretization values to send integer motions.
-
-        :param delta the amount of change in pixels per second to discretize for
+        :param delta_t duration of the time step in seconds
+        :return dx, dy in pixels for this time step
         """
-        delta = 0.0 if abs(delta) < 1e-6 else delta
-        tick_value = math.ceil(abs(delta) / 100.0)
-        if tick_value == 0:
-            tick_time = MouseMotion.delta_t
-        else:
-            tick_time = 1.0 / (abs(delta) / tick_value)
-            tick_value = int(math.copysign(tick_value, delta))
-
-        return tick_value, tick_time
+        return self.dx * delta_t, self.dy * delta_t
 
 
 class FixedMouseMotion(MouseMotion):
@@ -143,7 +126,6 @@ class FixedMouseMotion(MouseMotion):
         :param value speed in pixels per second along the x axis
         """
         self.dx = value
-        self._tick_dx_value, self._tick_dx_time = self._compute_values(self.dx)
 
     def set_dy(self, value):
         """Updates the y velocity.
@@ -151,7 +133,6 @@ class FixedMouseMotion(MouseMotion):
         :param value speed in pixels per second along the y axis
         """
         self.dy = value
-        self._tick_dy_value, self._tick_dy_time = self._compute_values(self.dy)
 
 
 class AcceleratedMouseMotion(MouseMotion):
@@ -180,8 +161,14 @@ class AcceleratedMouseMotion(MouseMotion):
         self.current_velocity = self.min_velocity
         self.dx, self.dy = \
             self._decompose_xy(self.direction, self.current_velocity)
-        self._tick_dx_value, self._tick_dx_time = self._compute_values(self.dx)
-        self._tick_dy_value, self._tick_dy_time = self._compute_values(self.dy)
+
+    @property
+    def is_moving(self):
+        """Returns whether or not this motion moves the cursor.
+
+        :return True if the cursor is moved, False otherwise
+        """
+        return self.max_velocity > 1e-6
 
     def set_direction(self, direction):
         """Sets the direction for which to emit position changes.
@@ -191,8 +178,6 @@ class AcceleratedMouseMotion(MouseMotion):
         self.direction = direction - 90.0
         self.dx, self.dy = \
             self._decompose_xy(self.direction, self.current_velocity)
-        self._tick_dx_value, self._tick_dx_time = self._compute_values(self.dx)
-        self._tick_dy_value, self._tick_dy_time = self._compute_values(self.dy)
 
     def _decompose_xy(self, direction, value):
         """Returns x and y values corresponding to a direction and value.
@@ -204,32 +189,41 @@ class AcceleratedMouseMotion(MouseMotion):
         return value * math.cos(deg2rad(direction)),\
             value * math.sin(deg2rad(direction))
 
-    def __call__(self):
-        """Returns the change in x and y for this point in time.
+    def __call__(self, delta_t):
+        """Returns the change in x and y over the given time step.
 
-        :return dx, dy for this time point
+        :param delta_t duration of the time step in seconds
+        :return dx, dy in pixels for this time step
         """
-        # Get values to return using current integration step values
-        dx, dy = super().__call__()
-
-        # Apply acceleration to obtain next integration step values
-        self.current_velocity = min(
+        # Integrate using the mean velocity over the time step
+        velocity = min(
             self.max_velocity,
-            self.current_velocity + self.acceleration * MouseMotion.delta_t
+            self.current_velocity + self.acceleration * delta_t
         )
+        distance = 0.5 * (self.current_velocity + velocity) * delta_t
+
+        self.current_velocity = velocity
         self.dx, self.dy = \
             self._decompose_xy(self.direction, self.current_velocity)
-        self._tick_dx_value, self._tick_dx_time = self._compute_values(self.dx)
-        self._tick_dy_value, self._tick_dy_time = self._compute_values(self.dy)
 
-        # Return cached values
-        return dx, dy
+        return self._decompose_xy(self.direction, distance)
 
 
 @SingletonDecorator
 class MouseController:
 
-    """Centralizes sending mouse events in a organized manner."""
+    """Centralizes sending mouse events in a organized manner.
+
+    Motion is sent at a fixed rate with every update scheduled relative to
+    the previous deadline, so that the rate does not drift with the
+    accuracy of the operating system's timers. The distance moved is based
+    on the time actually elapsed and the fractional part of the motion is
+    carried over to the next update rather than discarded. When there is no
+    motion the control thread waits until a new motion is set.
+    """
+
+    # Number of motion updates sent per second
+    update_rate = 250
 
     def __init__(self):
         """Creates a new instance."""
@@ -237,7 +231,8 @@ class MouseController:
         self._delta_generator = FixedMouseMotion(0, 0)
 
         self._is_running = False
-        self._thread = threading.Thread(target=self._control_loop)
+        self._condition = threading.Condition()
+        self._thread = None
 
     def set_absolute_motion(self, dx=None, dy=None):
         """Configures a motion using absolute velocities.
@@ -247,17 +242,19 @@ class MouseController:
         :param dx velocity along the x axis in pixels per second
         :param dy velocity along the y axis in pixels per second
         """
-        if self._motion_type == MotionType.Fixed:
-            if dx is not None:
-                self._delta_generator.set_dx(dx)
-            if dy is not None:
-                self._delta_generator.set_dy(dy)
-        else:
-            self._motion_type = MotionType.Fixed
-            self._delta_generator = FixedMouseMotion(
-                dx if dx is not None else 0,
-                dy if dy is not None else 0
-            )
+        with self._condition:
+            if self._motion_type == MotionType.Fixed:
+                if dx is not None:
+                    self._delta_generator.set_dx(dx)
+                if dy is not None:
+                    self._delta_generator.set_dy(dy)
+            else:
+                self._motion_type = MotionType.Fixed
+                self._delta_generator = FixedMouseMotion(
+                    dx if dx is not None else 0,
+                    dy if dy is not None else 0
+                )
+            self._condition.notify()
 
     def set_accelerated_motion(
             self,
@@ -273,38 +270,90 @@ class MouseController:
         :param max_speed maximum speed in pixels per second
         :param time_to_max_speed time to reach max_speed
         """
-        if self._motion_type == MotionType.Accelerated:
-            self._delta_generator.set_direction(direction)
-        else:
-            self._delta_generator = AcceleratedMouseMotion(
-                direction,
-                min_speed,
-                max_speed,
-                time_to_max_speed
-            )
-            self._motion_type = MotionType.Accelerated
+        with self._condition:
+            if self._motion_type == MotionType.Accelerated:
+                self._delta_generator.set_direction(direction)
+            else:
+                self._delta_generator = AcceleratedMouseMotion(
+                    direction,
+                    min_speed,
+                    max_speed,
+                    time_to_max_speed
+                )
+                self._motion_type = MotionType.Accelerated
+            self._condition.notify()
 
     def start(self):
         """Starts the thread that will send motions when required."""
-        if not self._is_running:
+        with self._condition:
+            if self._is_running:
+                return
+            self._is_running = True
             self._thread = threading.Thread(target=self._control_loop)
             self._thread.start()
 
     def stop(self):
-        """Stops the thread that sends motion events."""
-        if self._thread.is_alive():
+        """Stops the thread that sends motion events.
+
+        The thread is woken up regardless of whether it is waiting for motion
+        or for its next update and has terminated once this returns.
+        """
+        with self._condition:
             self._is_running = False
-            self._thread.join()
+            self._condition.notify()
+            thread = self._thread
+        if thread is not None:
+            thread.join()
+        with self._condition:
+            if self._thread is thread:
+                self._thread = None
 
     def _control_loop(self):
         """Loop responsible for creating and sending mouse motion events."""
-        self._is_running = True
-
-        while self._is_running:
-            dx, dy = self._delta_generator()
-            if dx != 0 or dy != 0:
-                mouse_relative_motion(int(dx), int(dy))
-            time.sleep(0.01)
+        remainder_x = 0.0
+        remainder_y = 0.0
+        last_update = None
+        deadline = None
+
+        while True:
+            with self._condition:
+                # Wait without polling until there is motion to send
+                while self._is_running and \
+                        not self._delta_generator.is_moving:
+                    remainder_x = 0.0
+                    remainder_y = 0.0
+                    last_update = None
+                    self._condition.wait()
+                if not self._is_running:
+                    break
+
+                period = 1.0 / max(1, self.update_rate)
+                now = time.perf_counter()
+                if last_update is None:
+                    last_update = now - period
+                    deadline = now
+                dx, dy = self._delta_generator(now - last_update)
+                last_update = now
+
+            # Send the whole pixels and keep the fraction for later updates
+            remainder_x += dx
+            remainder_y += dy
+            pixels_x = int(remainder_x)
+            pixels_y = int(remainder_y)
+            remainder_x -= pixels_x
+            remainder_y -= pixels_y
+            if pixels_x != 0 or pixels_y != 0:
+                mouse_relative_motion(pixels_x, pixels_y)
+
+            # Schedule the next update relative to the previous deadline and
+            # skip updates that were missed entirely
+            deadline += period
+            now = time.perf_counter()
+            if deadline <= now:
+                deadline = now + period
+            with self._condition:
+                if self._is_running:
+                    self._condition.wait(deadline - now)
 
 
 class _MOUSEINPUT(ctypes.Structure):
@@ -366,53 +415,163 @@ class _INPUT(ctypes.Structure):
     )
 
 
-def mouse_relative_motion(dx, dy):
-    _send_input(
-        _mouse_input(MOUSEEVENTF_MOVE, dx, dy)
-    )
+# Function called with the output type, None, and the number of inputs
+# every time inputs are sent, used to trace input to output latencies
+output_hook = None
 
 
-def mouse_press(button):
-    if button == MouseButton.Left:
-        _send_input(_mouse_input(MOUSEEVENTF_LEFTDOWN))
-    elif button == MouseButton.Right:
-        _send_input(_mouse_input(MOUSEEVENTF_RIGHTDOWN))
-    elif button == MouseButton.Middle:
-        _send_input(_mouse_input(MOUSEEVENTF_MIDDLEDOWN))
-    elif button == MouseButton.Back:
-        _send_input(_mouse_input(MOUSEEVENTF_XDOWN, data=XBUTTON1))
-    elif button == MouseButton.Forward:
-        _send_input(_mouse_input(MOUSEEVENTF_XDOWN, data=XBUTTON2))
+class InputBuffer:
 
+    """Collects inputs in a preallocated array to send them in one call.
 
-def mouse_release(button):
-    if button == MouseButton.Left:
-        _send_input(_mouse_input(MOUSEEVENTF_LEFTUP))
-    elif button == MouseButton.Right:
-        _send_input(_mouse_input(MOUSEEVENTF_RIGHTUP))
-    elif button == MouseButton.Middle:
-        _send_input(_mouse_input(MOUSEEVENTF_MIDDLEUP))
-    elif button == MouseButton.Back:
-        _send_input(_mouse_input(MOUSEEVENTF_XUP, data=XBUTTON1))
-    elif button == MouseButton.Forward:
-        _send_input(_mouse_input(MOUSEEVENTF_XUP, data=XBUTTON2))
+    The entries of the array are filled in place, avoiding the creation of
+    new ctypes objects for every input. All inputs sent in a single call
+    are inserted into the input stream without other inputs interleaving.
+    """
 
+    def __init__(self, capacity=32):
+        """Creates a new instance.
 
-def mouse_wheel(motion):
-    _send_input(_mouse_input(MOUSEEVENTF_WHEEL, data=-motion*WHEEL_DELTA))
+        :param capacity maximum number of inputs sent with a single call
+        """
+        self._capacity = capacity
+        self._inputs = (_INPUT * capacity)()
+        self._count = 0
 
+    def __len__(self):
+        """Returns the number of inputs waiting to be sent.
+
+        :return number of buffered inputs
+        """
+        return self._count
+
+    def add_key(self, virtual_code, scan_code, is_extended, is_pressed):
+        """Adds a key press or release to the buffer.
+
+        :param virtual_code virtual key code of the key
+        :param scan_code scan code of the key
+        :param is_extended whether or not the scan code is extended
+        :param is_pressed True for a key press, False for a release
+        """
+        flags = KEYEVENTF_EXTENDEDKEY if is_extended else 0
+        if not is_pressed:
+            flags |= KEYEVENTF_KEYUP
+
+        entry = self._next_entry()
+        entry.type = INPUT_KEYBOARD
+        entry.union.ki.wVk = virtual_code
+        entry.union.ki.wScan = scan_code
+        entry.union.ki.dwFlags = flags
+        entry.union.ki.time = 0
+        entry.union.ki.wExtraInfo = None
+
+    def add_mouse(self, flags, dx=0, dy=0, data=0):
+        """Adds a mouse input to the buffer.
+
+        :param flags MOUSEEVENTF flags describing the input
+        :param dx motion along the x axis
+        :param dy motion along the y axis
+        :param data additional data such as wheel motion or extra button
+        """
+        entry = self._next_entry()
+        entry.type = INPUT_MOUSE
+        entry.union.mi.dx = dx
+        entry.union.mi.dy = dy
+        entry.union.mi.mouseData = data
+        entry.union.mi.dwFlags = flags
+        entry.union.mi.time = 0
+        entry.union.mi.dwExtraInfo = None
+
+    def add_mouse_button(self, button, is_pressed):
+        """Adds a mouse button press or release to the buffer.
+
+        :param button the MouseButton to press or release
+        :param is_pressed True for a button press, False for a release
+        :return True if an input was added, False if the button is invalid
+        """
+        if button not in _mouse_button_input:
+            return False
+        press_flags, release_flags, data = _mouse_button_input[button]
+        self.add_mouse(
+            press_flags if is_pressed else release_flags,
+            data=data
+        )
+        return True
+
+    def flush(self):
+        """Sends all buffered inputs with a single SendInput call.
+
+        :return number of inputs that were inserted into the input stream
+        """
+        if self._count == 0:
+            return 0
+        count = self._count
+        self._count = 0
+        if output_hook is not None:
+            output_hook("SendInput", None, count)
+        return ctypes.windll.user32.SendInput(
+            count,
+            self._inputs,
+            ctypes.sizeof(_INPUT)
+        )
+
+    def _next_entry(self):
+        """Returns the next free entry, sending buffered inputs if needed.
+
+        :return free _INPUT structure
+        """
+        if self._count == self._capacity:
+            self.flush()
+        entry = self._inputs[self._count]
+        self._count += 1
+        return entry
 
-def _mouse_input(flags, dx=0, dy=0, data=0):
-    return _INPUT(
-        INPUT_MOUSE,
-        _INPUTunion(mi=_MOUSEINPUT(dx, dy, data, flags, 0, None))
-    )
 
+# Per thread input buffers
+_input_buffers = threading.local()
 
-def _send_input(*inputs):
-    nInputs = len(inputs)
-    LPINPUT = _INPUT * nInputs
-    pInputs = LPINPUT(*inputs)
-    cbSize = ctypes.c_int(ctypes.sizeof(_INPUT))
 
-    return ctypes.windll.user32.SendInput(nInputs, pInputs, cbSize)
+def input_buffer():
+    """Returns the input buffer belonging to the calling thread.
+
+    :return InputBuffer instance of the calling thread
+    """
+    buffer = getattr(_input_buffers, "buffer", None)
+    if buffer is None:
+        buffer = InputBuffer()
+        _input_buffers.buffer = buffer
+    return buffer
+
+
+# Mouse button to (press flags, release flags, data) mapping
+_mouse_button_input = {
+    MouseButton.Left: (MOUSEEVENTF_LEFTDOWN, MOUSEEVENTF_LEFTUP, 0),
+    MouseButton.Right: (MOUSEEVENTF_RIGHTDOWN, MOUSEEVENTF_RIGHTUP, 0),
+    MouseButton.Middle: (MOUSEEVENTF_MIDDLEDOWN, MOUSEEVENTF_MIDDLEUP, 0),
+    MouseButton.Back: (MOUSEEVENTF_XDOWN, MOUSEEVENTF_XUP, XBUTTON1),
+    MouseButton.Forward: (MOUSEEVENTF_XDOWN, MOUSEEVENTF_XUP, XBUTTON2)
+}
+
+
+def mouse_relative_motion(dx, dy):
+    buffer = input_buffer()
+    buffer.add_mouse(MOUSEEVENTF_MOVE, dx, dy)
+    buffer.flush()
+
+
+def mouse_press(button):
+    buffer = input_buffer()
+    if buffer.add_mouse_button(button, True):
+        buffer.flush()
+
+
+def mouse_release(button):
+    buffer = input_buffer()
+    if buffer.add_mouse_button(button, False):
+        buffer.flush()
+
+
+def mouse_wheel(motion):
+    buffer = input_buffer()
+    buffer.add_mouse(MOUSEEVENTF_WHEEL, data=-motion*WHEEL_DELTA)
+    buffer.flush()
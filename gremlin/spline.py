@@ -16,9 +16,15 @@
 # along with this program.  If not, see <http://www.gnu.org/licenses/>.
 
 
+import bisect
 import collections
 import gremlin.util
 
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
 
 # Named tuple to facilitate working with 2D coordinates
 Point2D = collections.namedtuple("Point2D", ["x", "y"])
@@ -80,12 +86,7 @@ class CubicSpline:
         :param x the location at which to evaluate the function
         :return function value at the provided position
         """
-        n = len(self.x)
-
-        i = 0
-        for i in range(n-1):
-            if self.x[i] <= x <= self.x[i+1]:
-                break
+        i = bisect.bisect_left(self.x, x, 1, len(self.x) - 1) - 1
 
         h = self.x[i+1] - self.x[i]
         tmp = (self.z[i] / 2.0) + (x - self.x[i]) * \
@@ -95,6 +96,29 @@ class CubicSpline:
 
         return self.y[i] + (x - self.x[i]) * tmp
 
+    def evaluate(self, xs):
+        """Returns the function values at all of the desired positions.
+
+        :param xs the locations at which to evaluate the function
+        :return list of function values at the provided positions
+        """
+        if numpy is None:
+            return [self(x) for x in xs]
+
+        x = numpy.asarray(xs, dtype=float)
+        cx = numpy.asarray(self.x, dtype=float)
+        cy = numpy.asarray(self.y, dtype=float)
+        cz = numpy.asarray(self.z, dtype=float)
+
+        i = numpy.clip(numpy.searchsorted(cx, x) - 1, 0, len(cx) - 2)
+        dx = x - cx[i]
+        h = cx[i+1] - cx[i]
+        tmp = (cz[i] / 2.0) + dx * (cz[i+1] - cz[i]) / (6 * h)
+        tmp = -(h/6.0) * (cz[i+1] + 2 * cz[i]) + \
+            (cy[i+1] - cy[i]) / h + dx * tmp
+
+        return (cy[i] + dx * tmp).tolist()
+
 
 class CubicBezierSpline:
 
@@ -109,8 +133,10 @@ class CubicBezierSpline:
         self.y = [v[1] for v in points]
 
         self.knots = [pt for pt in points[::3]]
+        self._knot_x = [pt[0] for pt in self.knots]
 
         self._lookup = []
+        self._lookup_x = []
         self._generate_lookup()
 
     def _generate_lookup(self):
@@ -134,6 +160,7 @@ class CubicBezierSpline:
             for j in range(0, 101):
                 t = j * step_size
                 self._lookup[-1].append((t, self._value_at_t(points, t)))
+            self._lookup_x.append([v[1].x for v in self._lookup[-1]])
 
     def _value_at_t(self, points, t):
         """Returns the x and y coordinate for the spline at time t.
@@ -169,35 +196,77 @@ class CubicBezierSpline:
         x = gremlin.util.clamp(x, -1.0, 1.0)
 
         # Determine spline group to use
-        index = 0
-        if self.knots[0][0] > x:
-            index = 0
-        elif self.knots[-1][0] <= x:
-            index = len(self._lookup)-1
-        else:
-            segment_count = int((len(self.x) - 4) / 3) + 1
-            for i in range(segment_count):
-                offset = i * 3
-                if self.x[offset] <= x <= self.x[offset+3]:
-                    index = i
-                    break
+        index = bisect.bisect_left(self._knot_x, x, 1, len(self._lookup)) - 1
 
         # Linearly interpolate the lookup table data
-        interval = [0, len(self._lookup[index])]
-        searching = True
-        while searching:
-            distance = interval[1] - interval[0]
-            if distance == 1:
-                searching = False
-                break
-
-            center_index = interval[0] + int(distance / 2.0)
-            if self._lookup[index][center_index][1][0] < x:
-                interval[0] = center_index
-            else:
-                interval[1] = center_index
-
-        low = self._lookup[index][interval[0]][1]
-        high = self._lookup[index][interval[1]][1]
+        lookup_x = self._lookup_x[index]
+        high_index = bisect.bisect_left(lookup_x, x, 1, len(lookup_x) - 1)
+        low = self._lookup[index][high_index - 1][1]
+        high = self._lookup[index][high_index][1]
 
         return low.y + (x - low.x) * ((high.y - low.y) / (high.x - low.x))
+
+    def evaluate(self, xs):
+        """Returns the function values at all of the desired positions.
+
+        :param xs the locations at which to evaluate the function
+        :return list of function values at the provided positions
+        """
+        if numpy is None:
+            return [self(x) for x in xs]
+
+        x = numpy.clip(numpy.asarray(xs, dtype=float), -1.0, 1.0)
+        index = numpy.clip(
+            numpy.searchsorted(self._knot_x, x) - 1,
+            0,
+            len(self._lookup) - 1
+        )
+
+        values = numpy.empty_like(x)
+        for i, lookup in enumerate(self._lookup):
+            mask = index == i
+            if numpy.any(mask):
+                values[mask] = numpy.interp(
+                    x[mask],
+                    self._lookup_x[i],
+                    [v[1].y for v in lookup]
+                )
+        return values.tolist()
+
+
+class LookupTable:
+
+    """Precomputed approximation of a function over the [-1, 1] domain.
+
+    The function is sampled at evenly spaced positions once, evaluating the
+    table afterwards only requires linear interpolation between the two
+    neighbouring samples, independent of how costly the original function is.
+    """
+
+    def __init__(self, function, resolution):
+        """Creates a new LookupTable object.
+
+        :param function the function to sample, mapping [-1, 1] to [-1, 1]
+        :param resolution number of intervals the domain is split into
+        """
+        assert resolution > 0
+
+        self.resolution = resolution
+        self._scale = resolution / 2.0
+        self._values = [
+            function(-1.0 + i / self._scale) for i in range(resolution + 1)
+        ]
+        # Duplicate the last entry so that interpolating at x = 1.0 does
+        # not require a special case
+        self._values.append(self._values[-1])
+
+    def __call__(self, x):
+        """Returns the interpolated function value at the desired position.
+
+        :param x the location at which to evaluate the function
+        :return function value at the provided position
+        """
+        position = (min(1.0, max(-1.0, x)) + 1.0) * self._scale
+        index = int(position)
+        low = self._values[index]
+        return low + (position - index) * (self._values[index + 1] - low)
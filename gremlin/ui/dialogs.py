@@ -111,6 +111,40 @@ class OptionsUi(common.BaseDialogUi):
             self.config.mode_change_message
         )
 
+        # Process joystick events outside of the GUI thread
+        self.direct_dispatch = QtWidgets.QCheckBox(
+            "Process joystick inputs in a dedicated thread"
+        )
+        self.direct_dispatch.clicked.connect(self._direct_dispatch)
+        self.direct_dispatch.setChecked(self.config.direct_dispatch)
+
+        # Submit all vJoy changes caused by an input at once
+        self.batch_vjoy_updates = QtWidgets.QCheckBox(
+            "Update vJoy devices once per input"
+        )
+        self.batch_vjoy_updates.clicked.connect(self._batch_vjoy_updates)
+        self.batch_vjoy_updates.setChecked(self.config.batch_vjoy_updates)
+
+        # Number of threads running callbacks
+        self.dispatch_lanes_layout = QtWidgets.QHBoxLayout()
+        self.dispatch_lanes_label = QtWidgets.QLabel(
+            "Threads processing inputs"
+        )
+        self.dispatch_lanes_value = QtWidgets.QSpinBox()
+        self.dispatch_lanes_value.setRange(1, 16)
+        self.dispatch_lanes_value.setValue(self.config.dispatch_lanes)
+        self.dispatch_lanes_value.valueChanged.connect(self._dispatch_lanes)
+        self.dispatch_lanes_layout.addWidget(self.dispatch_lanes_label)
+        self.dispatch_lanes_layout.addWidget(self.dispatch_lanes_value)
+        self.dispatch_lanes_layout.addStretch()
+
+        # Latency recording
+        self.record_latencies = QtWidgets.QCheckBox(
+            "Record input processing latencies"
+        )
+        self.record_latencies.clicked.connect(self._record_latencies)
+        self.record_latencies.setChecked(self.config.record_latencies)
+
         # Default action selection
         self.default_action_layout = QtWidgets.QHBoxLayout()
         self.default_action_label = QtWidgets.QLabel("Default action")
@@ -120,6 +154,51 @@ class OptionsUi(common.BaseDialogUi):
         self._init_action_dropdown()
         self.default_action_layout.addStretch()
 
+        # Resolution of the vJoy axis response lookup tables
+        self.axis_lookup_resolution_layout = QtWidgets.QHBoxLayout()
+        self.axis_lookup_resolution_label = QtWidgets.QLabel(
+            "Response curve lookup table size (0 to disable)"
+        )
+        self.axis_lookup_resolution_value = QtWidgets.QSpinBox()
+        self.axis_lookup_resolution_value.setRange(0, 65535)
+        self.axis_lookup_resolution_value.setSingleStep(256)
+        self.axis_lookup_resolution_value.setValue(
+            self.config.axis_lookup_resolution
+        )
+        self.axis_lookup_resolution_value.valueChanged.connect(
+            self._axis_lookup_resolution
+        )
+        self.axis_lookup_resolution_layout.addWidget(
+            self.axis_lookup_resolution_label
+        )
+        self.axis_lookup_resolution_layout.addWidget(
+            self.axis_lookup_resolution_value
+        )
+        self.axis_lookup_resolution_layout.addStretch()
+
+        # Rate at which mouse motion is sent
+        self.mouse_update_rate_layout = QtWidgets.QHBoxLayout()
+        self.mouse_update_rate_label = QtWidgets.QLabel(
+            "Mouse motion update rate (Hz)"
+        )
+        self.mouse_update_rate_value = QtWidgets.QSpinBox()
+        self.mouse_update_rate_value.setRange(50, 1000)
+        self.mouse_update_rate_value.setSingleStep(50)
+        self.mouse_update_rate_value.setValue(self.config.mouse_update_rate)
+        self.mouse_update_rate_value.valueChanged.connect(
+            self._mouse_update_rate
+        )
+        self.mouse_update_rate_layout.addWidget(self.mouse_update_rate_label)
+        self.mouse_update_rate_layout.addWidget(self.mouse_update_rate_value)
+        self.mouse_update_rate_layout.addStretch()
+
+        # Compensate timing errors when executing macros
+        self.precise_macro_timing = QtWidgets.QCheckBox(
+            "Precise macro timing (increases CPU usage)"
+        )
+        self.precise_macro_timing.clicked.connect(self._precise_macro_timing)
+        self.precise_macro_timing.setChecked(self.config.precise_macro_timing)
+
         # Macro axis polling rate
         self.macro_axis_polling_layout = QtWidgets.QHBoxLayout()
         self.macro_axis_polling_label = \
@@ -167,7 +246,14 @@ class OptionsUi(common.BaseDialogUi):
         self.general_layout.addWidget(self.start_minimized)
         self.general_layout.addWidget(self.start_with_windows)
         self.general_layout.addWidget(self.show_mode_change_message)
+        self.general_layout.addWidget(self.direct_dispatch)
+        self.general_layout.addWidget(self.batch_vjoy_updates)
+        self.general_layout.addLayout(self.dispatch_lanes_layout)
+        self.general_layout.addWidget(self.record_latencies)
         self.general_layout.addLayout(self.default_action_layout)
+        self.general_layout.addLayout(self.axis_lookup_resolution_layout)
+        self.general_layout.addLayout(self.mouse_update_rate_layout)
+        self.general_layout.addWidget(self.precise_macro_timing)
         self.general_layout.addLayout(self.macro_axis_polling_layout)
         self.general_layout.addLayout(self.macro_axis_minimum_change_layout)
         self.general_layout.addStretch()
@@ -527,6 +613,20 @@ If this option is on, the last active profile will remain active until a differe
         self.config.mode_change_message = clicked
         self.config.save()
 
+    def _direct_dispatch(self, clicked):
+        """Stores the user's preference for joystick event processing.
+
+        :param clicked whether or not the checkbox is ticked"""
+        self.config.direct_dispatch = clicked
+        self.config.save()
+
+    def _batch_vjoy_updates(self, clicked):
+        """Stores the user's preference for vJoy update batching.
+
+        :param clicked whether or not the checkbox is ticked"""
+        self.config.batch_vjoy_updates = clicked
+        self.config.save()
+
     def _update_profile(self):
         """Updates the profile associated with the current executable."""
         self.config.set_profile(
@@ -553,6 +653,45 @@ If this option is on, the last active profile will remain active until a differe
         self.config.default_action = value
         self.config.save()
 
+    def _dispatch_lanes(self, value):
+        """Updates the config with the newly set number of input threads.
+
+        :param value the new number of threads processing inputs
+        """
+        self.config.dispatch_lanes = value
+        self.config.save()
+
+    def _record_latencies(self, clicked):
+        """Stores the user's preference for recording latencies.
+
+        :param clicked whether or not the checkbox is ticked
+        """
+        self.config.record_latencies = clicked
+        self.config.save()
+
+    def _axis_lookup_resolution(self, value):
+        """Updates the config with the newly set lookup table resolution.
+
+        :param value the new lookup table resolution
+        """
+        self.config.axis_lookup_resolution = value
+        self.config.save()
+
+    def _mouse_update_rate(self, value):
+        """Updates the config with the newly set mouse motion update rate.
+
+        :param value the new mouse motion update rate in Hz
+        """
+        self.config.mouse_update_rate = value
+        self.config.save()
+
+    def _precise_macro_timing(self, clicked):
+        """Stores the user's preference for macro timing.
+
+        :param clicked whether or not the checkbox is ticked"""
+        self.config.precise_macro_timing = clicked
+        self.config.save()
+
     def _macro_axis_polling_rate(self, value):
         """Updates the config with the newly set polling rate.
 
@@ -706,6 +845,141 @@ class LogWindowUi(common.BaseDialogUi):
         )
 
 
+class LatencyDiagnosticsUi(common.BaseDialogUi):
+
+    """Window displaying the latency histograms recorded for each input."""
+
+    # Columns of the tables, the first four hold the histogram key
+    callback_columns = ["Device", "Input", "Container", "Action"]
+    trace_columns = ["Device", "Input", "Stage", "Output"]
+    value_columns = [
+        "Count", "Mean (us)", "p50 (us)", "p99 (us)", "p99.9 (us)", "Max (us)"
+    ]
+
+    def __init__(self, parent=None):
+        """Creates a new instance.
+
+        :param parent the parent of this widget
+        """
+        super().__init__(parent)
+
+        self.setWindowTitle("Latency Diagnostics")
+        self.setMinimumWidth(900)
+        self.setMinimumHeight(400)
+
+        self.main_layout = QtWidgets.QVBoxLayout(self)
+        if not gremlin.config.Configuration().record_latencies:
+            self.main_layout.addWidget(QtWidgets.QLabel(
+                "Latencies are only recorded when the corresponding option "
+                "is enabled before the profile is activated."
+            ))
+
+        self.tabs = QtWidgets.QTabWidget()
+        self.callback_table = self._create_table(
+            LatencyDiagnosticsUi.callback_columns
+        )
+        self.trace_table = self._create_table(
+            LatencyDiagnosticsUi.trace_columns
+        )
+        self.tabs.addTab(self.callback_table, "Callbacks")
+        self.tabs.addTab(self.trace_table, "End-to-end")
+        self.main_layout.addWidget(self.tabs)
+
+        self.button_layout = QtWidgets.QHBoxLayout()
+        self.reset_button = QtWidgets.QPushButton("Reset")
+        self.reset_button.clicked.connect(self._reset)
+        self.export_button = QtWidgets.QPushButton("Export JSON")
+        self.export_button.clicked.connect(self._export)
+        self.button_layout.addStretch()
+        self.button_layout.addWidget(self.reset_button)
+        self.button_layout.addWidget(self.export_button)
+        self.main_layout.addLayout(self.button_layout)
+
+        self._update_timer = QtCore.QTimer(self)
+        self._update_timer.timeout.connect(self._update)
+        self._update_timer.start(1000)
+        self._update()
+
+    def closeEvent(self, event):
+        """Handles closing of the window.
+
+        :param event the closing event
+        """
+        self._update_timer.stop()
+        super().closeEvent(event)
+
+    def _create_table(self, key_columns):
+        """Returns a table displaying histograms.
+
+        :param key_columns names of the columns holding the histogram key
+        :return table widget
+        """
+        columns = key_columns + LatencyDiagnosticsUi.value_columns
+        table = QtWidgets.QTableWidget()
+        table.setColumnCount(len(columns))
+        table.setHorizontalHeaderLabels(columns)
+        table.setEditTriggers(QtWidgets.QAbstractItemView.NoEditTriggers)
+        table.verticalHeader().setVisible(False)
+        return table
+
+    def _update(self):
+        """Displays the current content of all histograms."""
+        self._fill_table(
+            self.callback_table,
+            gremlin.instrumentation.Instrumentation().to_dict()["histograms"],
+            ["device", "input", "container", "action"]
+        )
+        self._fill_table(
+            self.trace_table,
+            gremlin.instrumentation.LatencyTracer().to_dict()["traces"],
+            ["device", "input", "stage", "output"]
+        )
+
+    def _fill_table(self, table, entries, key_fields):
+        """Shows histogram entries in a table.
+
+        :param table the table widget to fill
+        :param entries list of histogram entries
+        :param key_fields names of the entry fields holding the key
+        """
+        table.setSortingEnabled(False)
+        table.setRowCount(len(entries))
+        for row, entry in enumerate(entries):
+            values = [entry[field] or "" for field in key_fields] + [
+                entry["count"],
+                entry["mean_us"],
+                entry["p50_us"],
+                entry["p99_us"],
+                entry["p999_us"],
+                entry["max_us"]
+            ]
+            for column, value in enumerate(values):
+                item = QtWidgets.QTableWidgetItem()
+                if isinstance(value, float):
+                    item.setData(QtCore.Qt.DisplayRole, round(value, 1))
+                else:
+                    item.setData(QtCore.Qt.DisplayRole, value)
+                table.setItem(row, column, item)
+        table.setSortingEnabled(True)
+
+    def _reset(self):
+        """Clears the values recorded so far."""
+        gremlin.instrumentation.Instrumentation().reset()
+        gremlin.instrumentation.LatencyTracer().reset()
+        self._update()
+
+    def _export(self):
+        """Writes all histograms to a JSON file selected by the user."""
+        fname, _ = QtWidgets.QFileDialog.getSaveFileName(
+            None,
+            "Export latencies",
+            gremlin.util.userprofile_path(),
+            "JSON files (*.json)"
+        )
+        if len(fname) > 0:
+            gremlin.instrumentation.export(fname)
+
+
 class AboutUi(common.BaseDialogUi):
 
     """Widget which displays information about the application."""
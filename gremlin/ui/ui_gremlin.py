@@ -100,6 +100,8 @@ class Ui_Gremlin(object):
         self.actionSwapDevices.setObjectName("actionSwapDevices")
         self.actionInputViewer = QtWidgets.QAction(Gremlin)
         self.actionInputViewer.setObjectName("actionInputViewer")
+        self.actionLatencyDiagnostics = QtWidgets.QAction(Gremlin)
+        self.actionLatencyDiagnostics.setObjectName("actionLatencyDiagnostics")
         self.menuRecent.addAction(self.actionEmpty)
         self.menuFile.addAction(self.actionNewProfile)
         self.menuFile.addAction(self.actionLoadProfile)
@@ -115,6 +117,7 @@ class Ui_Gremlin(object):
         self.menuTools.addAction(self.actionDeviceInformation)
         self.menuTools.addAction(self.actionCalibration)
         self.menuTools.addAction(self.actionInputViewer)
+        self.menuTools.addAction(self.actionLatencyDiagnostics)
         self.menuTools.addSeparator()
         self.menuTools.addAction(self.actionPDFCheatsheet)
         self.menuTools.addSeparator()
@@ -171,4 +174,5 @@ class Ui_Gremlin(object):
         self.actionEmpty.setText(_translate("Gremlin", "Empty"))
         self.actionSwapDevices.setText(_translate("Gremlin", "Swap Devices"))
         self.actionInputViewer.setText(_translate("Gremlin", "Input Viewer"))
+        self.actionLatencyDiagnostics.setText(_translate("Gremlin", "Latency Diagnostics"))
 
@@ -39,6 +39,7 @@ import dill
 install_path = os.path.normcase(os.path.dirname(os.path.abspath(sys.argv[0])))
 os.chdir(install_path)
 
+import gremlin.event_log
 import gremlin.ui.axis_calibration
 import gremlin.ui.common
 import gremlin.ui.device_tab
@@ -210,6 +211,15 @@ class GremlinUi(QtWidgets.QMainWindow):
             lambda: self._remove_modal_window("device_information")
         )
 
+    def latency_diagnostics(self):
+        """Opens the latency diagnostics window."""
+        self.modal_windows["latency_diagnostics"] = \
+            gremlin.ui.dialogs.LatencyDiagnosticsUi()
+        self.modal_windows["latency_diagnostics"].show()
+        self.modal_windows["latency_diagnostics"].closed.connect(
+            lambda: self._remove_modal_window("latency_diagnostics")
+        )
+
     def log_window(self):
         """Opens the log display window."""
         self.modal_windows["log"] = gremlin.ui.dialogs.LogWindowUi()
@@ -519,6 +529,9 @@ class GremlinUi(QtWidgets.QMainWindow):
         self.ui.actionInputRepeater.triggered.connect(self.input_repeater)
         self.ui.actionCalibration.triggered.connect(self.calibration)
         self.ui.actionInputViewer.triggered.connect(self.input_viewer)
+        self.ui.actionLatencyDiagnostics.triggered.connect(
+            self.latency_diagnostics
+        )
         self.ui.actionPDFCheatsheet.triggered.connect(
             lambda: self._create_cheatsheet()
         )
@@ -1220,6 +1233,10 @@ if __name__ == "__main__":
         help="Start Joystick Gremlin minimized",
         action="store_true"
     )
+    parser.add_argument(
+        "--record",
+        help="Path of an event log to record all input events to",
+    )
     args = parser.parse_args()
 
     # Path manging to ensure Gremlin starts independent of the CWD
@@ -1319,12 +1336,23 @@ if __name__ == "__main__":
         ui.activate(True)
     if args.start_minimized:
         ui.setHidden(True)
+    event_recorder = None
+    if args.record is not None:
+        syslog.info("Recording input events to {}".format(args.record))
+        event_recorder = gremlin.event_log.EventRecorder(args.record)
+        event_recorder.start()
 
     # Run UI
     syslog.info("Gremlin UI launching")
     app.exec_()
     syslog.info("Gremlin UI terminated")
 
+    if event_recorder is not None:
+        event_recorder.stop()
+        syslog.info("Recorded {:d} input events".format(
+            event_recorder.event_count
+        ))
+
     # Terminate potentially running EventListener loop
     event_listener = gremlin.event_handler.EventListener()
     event_listener.terminate()
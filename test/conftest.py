@@ -0,0 +1,41 @@
+# -*- coding: utf-8; -*-
+
+# Copyright (C) 2015 - 2019 Lionel Ott
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+
+"""Prepares the environment such that Gremlin can be imported by the tests.
+
+Device access is replaced by the in-memory versions used by the benchmarks,
+which allows the tests to run on systems without DILL, vJoy, or the Windows
+API.
+"""
+
+import os
+import sys
+
+_repository_path = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if _repository_path not in sys.path:
+    sys.path.insert(0, _repository_path)
+
+from benchmarks import backends
+
+
+backends.install_headless(prefix="gremlin_test_")
+
+
+def pytest_unconfigure(config):
+    """Stops the event listener thread started when Gremlin is imported."""
+    backends.shutdown()
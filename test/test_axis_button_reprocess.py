@@ -0,0 +1,130 @@
+# -*- coding: utf-8; -*-
+
+# Copyright (C) 2015 - 2019 Lionel Ott
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+
+import threading
+
+from PyQt5 import QtCore
+import pytest
+
+import dill
+from gremlin import actions, common, event_handler, execution_graph
+
+
+class AxisButton(actions.AxisButton):
+
+    def __init__(self):
+        super().__init__(-0.2, 0.2, common.AxisButtonDirection.Anywhere)
+        self.transitions = []
+
+    def process_event(self, event, value):
+        return super().process_event(event)
+
+    def _press(self):
+        self._is_pressed = True
+        self.transitions.append(("press", threading.current_thread()))
+        return True
+
+    def _release(self):
+        self._is_pressed = False
+        self.transitions.append(("release", threading.current_thread()))
+        return True
+
+
+class Graph(execution_graph.AbstractExecutionGraph):
+
+    def _build_graph(self, functors):
+        self.functors = list(functors)
+
+
+def axis_event(value):
+    return event_handler.Event(
+        common.InputType.JoystickAxis,
+        1,
+        dill.GUID_Virtual,
+        value=value
+    )
+
+
+@pytest.fixture
+def setup(monkeypatch):
+    monkeypatch.setattr(
+        execution_graph.AbstractExecutionGraph,
+        "reprocess_delay",
+        0.1
+    )
+    button = AxisButton()
+    graph = Graph([button])
+
+    def callback(event):
+        graph.process_event(event, actions.Value(event.value))
+
+    handler = event_handler.EventHandler()
+    handler.add_callback(
+        dill.GUID_Virtual,
+        "Default",
+        axis_event(0.0),
+        callback
+    )
+    handler.build_event_lookup({})
+    handler.change_mode("Default")
+
+    deferred_done = threading.Event()
+
+    def process(event):
+        handler.process_event(event)
+        if isinstance(event, event_handler.DeferredEvent):
+            deferred_done.set()
+
+    dispatcher = event_handler.DirectDispatcher(process)
+    dispatcher.start()
+    listener = event_handler.EventListener()
+    listener.deferred_event.connect(
+        dispatcher.process,
+        QtCore.Qt.DirectConnection
+    )
+    yield button, dispatcher, deferred_done
+    listener.deferred_event.disconnect(dispatcher.process)
+    dispatcher.stop()
+    handler.clear()
+
+
+def test_second_run_is_processed_by_the_dispatch_thread(setup):
+    button, dispatcher, deferred_done = setup
+
+    dispatcher.push(axis_event(-1.0))
+    dispatcher.push(axis_event(1.0))
+    assert deferred_done.wait(5.0)
+
+    assert [name for name, _ in button.transitions] == ["press", "release"]
+    assert all(
+        thread is dispatcher._thread for _, thread in button.transitions
+    )
+
+
+def test_second_run_is_skipped_after_newer_events(setup):
+    button, dispatcher, deferred_done = setup
+
+    # The axis jumps across the button and then moves into it before the
+    # second run of the jump is processed
+    dispatcher.push(axis_event(-1.0))
+    dispatcher.push(axis_event(1.0))
+    dispatcher.push(axis_event(0.0))
+    assert deferred_done.wait(5.0)
+
+    assert [name for name, _ in button.transitions] == ["press"]
+    assert button.is_pressed
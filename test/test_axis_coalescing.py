@@ -0,0 +1,129 @@
+# -*- coding: utf-8; -*-
+
+# Copyright (C) 2015 - 2019 Lionel Ott
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+
+import threading
+
+import pytest
+
+import dill
+from gremlin import common, event_handler
+
+
+class FakeClock:
+
+    """Replaces time.perf_counter with a manually advanced clock."""
+
+    def __init__(self):
+        self.now = 100.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(event_handler.time, "perf_counter", clock)
+    return clock
+
+
+def axis_event(value):
+    return event_handler.Event(
+        common.InputType.JoystickAxis,
+        1,
+        dill.GUID_Virtual,
+        value=value
+    )
+
+
+@pytest.fixture
+def coalescer():
+    received = []
+    flushed = threading.Event()
+
+    def callback(event):
+        received.append(event.value)
+        flushed.set()
+
+    settings = {hash(axis_event(0.0)): (0.1, 500)}
+    coalescer = event_handler.AxisEventCoalescer(callback, settings)
+    coalescer.received = received
+    coalescer.flushed = flushed
+    yield coalescer
+    coalescer.stop()
+
+
+def flush(coalescer, clock):
+    """Expires all windows and waits for the pending events to be sent."""
+    coalescer.flushed.clear()
+    clock.now += 1.0
+    with coalescer._condition:
+        coalescer._condition.notify()
+    assert coalescer.flushed.wait(5.0)
+
+
+def test_flush_sends_latest_value_after_threshold_drop(coalescer, clock):
+    coalescer.process(axis_event(0.0))
+    clock.now += 0.01
+    coalescer.process(axis_event(0.5))
+    clock.now += 0.01
+    # Within the threshold of the value passed on but not of the pending one
+    coalescer.process(axis_event(0.01))
+    flush(coalescer, clock)
+
+    assert coalescer.received == [0.0, 0.01]
+
+
+def test_return_to_last_value_clears_pending_event(coalescer, clock):
+    coalescer.process(axis_event(0.0))
+    clock.now += 0.01
+    coalescer.process(axis_event(0.04))
+    clock.now += 0.01
+    # Within the threshold of both the pending and the passed on value
+    coalescer.process(axis_event(0.02))
+    assert len(coalescer._pending) == 0
+    assert len(coalescer._deadlines) == 0
+
+    clock.now += 1.0
+    coalescer.process(axis_event(0.5))
+    assert coalescer.received == [0.0, 0.5]
+
+
+def test_small_change_replaces_pending_event(coalescer, clock):
+    coalescer.process(axis_event(0.0))
+    clock.now += 0.01
+    coalescer.process(axis_event(0.5))
+    clock.now += 0.01
+    # Within the threshold of the pending value only
+    coalescer.process(axis_event(0.51))
+    flush(coalescer, clock)
+
+    assert coalescer.received == [0.0, 0.51]
+
+
+def test_overdue_pending_event_is_superseded(coalescer, clock):
+    coalescer.process(axis_event(0.0))
+    clock.now += 0.01
+    coalescer.process(axis_event(0.5))
+    # Window expires without the pending event having been flushed yet
+    with coalescer._condition:
+        clock.now += 0.2
+        coalescer.process(axis_event(-0.5))
+        assert len(coalescer._pending) == 0
+
+    assert coalescer.received == [0.0, -0.5]
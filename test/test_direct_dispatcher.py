@@ -0,0 +1,83 @@
+# -*- coding: utf-8; -*-
+
+# Copyright (C) 2015 - 2019 Lionel Ott
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+
+import threading
+
+import dill
+from gremlin import common, event_handler
+
+
+def button_event(button_id, is_pressed):
+    return event_handler.Event(
+        common.InputType.JoystickButton,
+        button_id,
+        dill.GUID_Virtual,
+        is_pressed=is_pressed
+    )
+
+
+def axis_event(axis_id, value):
+    return event_handler.Event(
+        common.InputType.JoystickAxis,
+        axis_id,
+        dill.GUID_Virtual,
+        value=value
+    )
+
+
+def test_overflow_only_coalesces_axis_events():
+    processed = []
+    done = threading.Event()
+    last_event = button_event(2, True)
+
+    def callback(event):
+        processed.append(event)
+        if event is last_event:
+            done.set()
+
+    # The consumer is only started once the buffer is well past capacity
+    dispatcher = event_handler.DirectDispatcher(callback, capacity=4)
+    buttons = []
+    axes = {1: [], 2: []}
+    for i in range(100):
+        buttons.append(button_event(1, i % 2 == 0))
+        dispatcher.push(buttons[-1])
+        for axis_id, values in axes.items():
+            values.append(axis_event(axis_id, i / 100.0))
+            dispatcher.push(values[-1])
+    dispatcher.push(last_event)
+
+    dispatcher.start()
+    try:
+        assert done.wait(5.0)
+    finally:
+        dispatcher.stop()
+
+    # Every button transition is processed in order
+    processed_buttons = [e for e in processed if e == buttons[0]]
+    assert len(processed_buttons) == len(buttons)
+    assert all(a is b for a, b in zip(processed_buttons, buttons))
+    assert dispatcher.dropped_events > 0
+
+    # Axis events are thinned out, yet stay in order and end on the most
+    # recent value
+    for axis_id, values in axes.items():
+        seen = [e.value for e in processed if e == values[0]]
+        assert len(seen) < len(values)
+        assert seen == sorted(seen)
+        assert seen[-1] == values[-1].value
@@ -0,0 +1,52 @@
+# -*- coding: utf-8; -*-
+
+# Copyright (C) 2015 - 2019 Lionel Ott
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+
+import os
+
+import dill
+from gremlin import common, event_handler, event_log
+
+
+def test_recorder_uses_time_of_receipt(tmp_path):
+    fname = os.path.join(str(tmp_path), "events.bin")
+    recorder = event_log.EventRecorder(fname)
+    recorder.start()
+    received = recorder._start_time + 250000000
+    recorder.record(event_handler.Event(
+        common.InputType.JoystickAxis,
+        1,
+        dill.GUID_Virtual,
+        value=0.5,
+        raw_value=16384,
+        timestamp=received
+    ))
+    recorder.record(event_handler.Event(
+        common.InputType.JoystickButton,
+        2,
+        dill.GUID_Virtual,
+        is_pressed=True
+    ))
+    recorder.stop()
+
+    events = list(event_log.read_event_log(fname))
+    assert len(events) == 2
+    assert events[0][0] == 0.25
+    assert events[0][1].value == 0.5
+    # Events without a timestamp are recorded at the time of delivery
+    assert events[1][0] > 0.0
+    assert events[1][1].is_pressed is True
@@ -0,0 +1,59 @@
+# -*- coding: utf-8; -*-
+
+# Copyright (C) 2015 - 2019 Lionel Ott
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+
+import sys
+import threading
+
+from gremlin import instrumentation
+
+
+def test_shared_histogram_keeps_values_of_all_threads():
+    histogram = instrumentation.SharedLatencyHistogram()
+    start = threading.Barrier(4)
+
+    def record(offset):
+        start.wait()
+        for value in range(1, 20001):
+            histogram.record(value + offset)
+
+    interval = sys.getswitchinterval()
+    sys.setswitchinterval(1e-6)
+    try:
+        threads = [
+            threading.Thread(target=record, args=(i * 100000,))
+            for i in range(4)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+    finally:
+        sys.setswitchinterval(interval)
+
+    merged = histogram.merged()
+    assert histogram.count == 80000
+    assert merged.count == 80000
+    assert merged.total == sum(
+        value + i * 100000 for i in range(4) for value in range(1, 20001)
+    )
+    assert merged.min == 1
+    assert merged.max == 320000
+    assert histogram.to_dict()["count"] == 80000
+
+    histogram.clear()
+    assert histogram.count == 0
@@ -0,0 +1,31 @@
+# -*- coding: utf-8; -*-
+
+# Copyright (C) 2015 - 2019 Lionel Ott
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+
+from gremlin import macro
+
+
+def test_stop_discards_compiled_macros_and_terminations():
+    manager = macro.MacroManager()
+    pending = macro.Macro()
+    pending.pause(0.01)
+    manager._compile_macro(pending)
+    manager.terminate_macro(pending)
+
+    manager.stop()
+    assert len(manager._compiled) == 0
+    assert len(manager._terminations) == 0
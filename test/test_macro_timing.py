@@ -0,0 +1,112 @@
+# -*- coding: utf-8; -*-
+
+# Copyright (C) 2015 - 2019 Lionel Ott
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+
+import threading
+
+import pytest
+
+from gremlin import macro
+
+
+class FakeClock:
+
+    """Clock which only advances when told to."""
+
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_deadline_compensates_small_delays():
+    clock = FakeClock()
+    executor = macro.MacroExecutor(clock=clock)
+    executor.precise_timing = True
+
+    clock.now = 1.05
+    assert executor._next_deadline(1.0, 0.1) == 1.1
+
+
+def test_deadline_never_lies_in_the_past():
+    clock = FakeClock()
+    executor = macro.MacroExecutor(clock=clock)
+    executor.precise_timing = True
+
+    clock.now = 1.3
+    assert executor._next_deadline(1.0, 0.1) == 1.3
+
+
+def test_slow_steps_do_not_accumulate_lateness():
+    clock = FakeClock()
+    executor = macro.MacroExecutor(worker_count=1, clock=clock)
+    executor.precise_timing = True
+    done = threading.Event()
+
+    def steps():
+        # Every step takes longer than the wait following it
+        for _ in range(5):
+            clock.now += 0.5
+            yield 0.1
+        done.set()
+
+    executor.submit(steps())
+    assert done.wait(5.0)
+
+    statistics = executor.statistics()
+    assert statistics["steps"] == 6
+    assert statistics["max_lateness"] == 0.0
+
+
+def run_pause_sequence(executor, clock, wake_up_delays, pause):
+    """Returns the deadlines of a macro pausing repeatedly.
+
+    Each step wakes up late by the corresponding delay and finishes right
+    away, after which the worker computes the next step's deadline.
+    """
+    deadlines = [0.0]
+    for delay in wake_up_delays:
+        clock.now = deadlines[-1] + delay
+        deadlines.append(executor._next_deadline(deadlines[-1], pause))
+    return deadlines
+
+
+def test_drift_stays_bounded_over_many_steps():
+    clock = FakeClock()
+    executor = macro.MacroExecutor(clock=clock)
+    executor.precise_timing = True
+
+    # Every wake-up is slightly late and one misses the following deadline
+    wake_up_delays = [0.001] * 50
+    wake_up_delays[20] = 0.025
+    deadlines = run_pause_sequence(executor, clock, wake_up_delays, 0.01)
+
+    # Small delays are fully compensated, the missed deadline shifts the
+    # remaining steps once by the time it was missed by
+    drift = [d - i * 0.01 for i, d in enumerate(deadlines)]
+    assert max(abs(d) for d in drift[:21]) < 1e-9
+    assert all(d == pytest.approx(0.015) for d in drift[21:])
+
+
+def test_drift_accumulates_without_precise_timing():
+    clock = FakeClock()
+    executor = macro.MacroExecutor(clock=clock)
+
+    deadlines = run_pause_sequence(executor, clock, [0.001] * 50, 0.01)
+
+    assert deadlines[-1] - 50 * 0.01 == pytest.approx(0.05)
@@ -0,0 +1,36 @@
+# -*- coding: utf-8; -*-
+
+# Copyright (C) 2015 - 2019 Lionel Ott
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+
+from gremlin import sendinput
+
+
+def test_stop_wakes_and_joins_control_thread():
+    controller = sendinput.MouseController()
+    controller.start()
+    thread = controller._thread
+
+    # The thread is waiting for motion, stopping has to wake it up
+    controller.stop()
+    assert not thread.is_alive()
+    assert controller._thread is None
+
+    # Stopping again and restarting afterwards have to work as well
+    controller.stop()
+    controller.start()
+    assert controller._thread.is_alive()
+    controller.stop()
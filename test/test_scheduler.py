@@ -0,0 +1,54 @@
+# -*- coding: utf-8; -*-
+
+# Copyright (C) 2015 - 2019 Lionel Ott
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+
+import threading
+import time
+
+from gremlin import scheduler
+
+
+def wait_until_expired(handle, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while handle.is_pending and time.monotonic() < deadline:
+        time.sleep(0.001)
+    return not handle.is_pending
+
+
+def test_blocking_callback_does_not_delay_expiry():
+    sched = scheduler.Scheduler()
+    started = threading.Event()
+    release = threading.Event()
+    ran = []
+
+    def block():
+        started.set()
+        release.wait(5.0)
+
+    sched.schedule(0.0, block)
+    assert started.wait(5.0)
+
+    # Expires while the worker is blocked and is cancelled before it runs
+    handle = sched.schedule(0.0, ran.append, "cancelled")
+    assert wait_until_expired(handle)
+    handle.cancel()
+
+    done = threading.Event()
+    sched.schedule(0.0, done.set)
+    release.set()
+    assert done.wait(5.0)
+    assert ran == []
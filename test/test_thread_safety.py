@@ -0,0 +1,97 @@
+# -*- coding: utf-8; -*-
+
+# Copyright (C) 2015 - 2019 Lionel Ott
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+
+import threading
+
+import pytest
+
+import dill
+from gremlin import base_classes, common, event_handler, execution_graph
+
+
+class Functor(base_classes.AbstractFunctor):
+
+    def process_event(self, event, value):
+        return True
+
+
+class SafeFunctor(Functor):
+
+    thread_safe = True
+
+
+class Graph(execution_graph.AbstractExecutionGraph):
+
+    def _build_graph(self, functors):
+        self.functors = list(functors)
+
+
+def test_graph_is_thread_safe_only_if_all_functors_are():
+    assert Graph([]).thread_safe
+    assert Graph([SafeFunctor(None), SafeFunctor(None)]).thread_safe
+    assert not Graph([SafeFunctor(None), Functor(None)]).thread_safe
+
+
+@pytest.fixture
+def handler():
+    handler = event_handler.EventHandler()
+    yield handler
+    handler.clear()
+
+
+def button_event():
+    return event_handler.Event(
+        common.InputType.JoystickButton,
+        1,
+        dill.GUID_Virtual,
+        is_pressed=True
+    )
+
+
+def test_lanes_check_thread_safety_of_current_mode(handler):
+    ran = []
+
+    def safe_callback(event):
+        ran.append("safe")
+    safe_callback.thread_safe = True
+
+    def unsafe_callback(event):
+        ran.append("unsafe")
+
+    event = button_event()
+    handler.add_callback(dill.GUID_Virtual, "Safe", event, safe_callback)
+    handler.add_callback(dill.GUID_Virtual, "Unsafe", event, unsafe_callback)
+    handler.build_event_lookup({})
+
+    # The event was assigned to a lane while the safe mode was active
+    handler.change_mode("Safe")
+    assert hash(event) in handler._dispatch_table.thread_safe
+    handler.change_mode("Unsafe")
+
+    # Callbacks that are not thread safe wait for the serial lock
+    with handler._serial_lock:
+        thread = threading.Thread(
+            target=handler._run_lane_callbacks,
+            args=(event,)
+        )
+        thread.start()
+        thread.join(0.1)
+        assert thread.is_alive()
+        assert ran == []
+    thread.join(5.0)
+    assert ran == ["unsafe"]
@@ -0,0 +1,56 @@
+# -*- coding: utf-8; -*-
+
+# Copyright (C) 2015 - 2019 Lionel Ott
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+
+import pytest
+
+from gremlin.error import VJoyError
+from vjoy import memory_interface, vjoy
+
+
+@pytest.fixture
+def device():
+    device = vjoy.VJoy(1)
+    yield device
+    device.invalidate()
+
+
+def fail_update(vjoy_id, data):
+    return False
+
+
+def test_failed_batch_is_resubmitted(device, monkeypatch):
+    interface = memory_interface.MemoryVJoyInterface
+    axis_id = device.axis(linear_index=1).axis_id
+    initial_value = interface.axis_value(1, axis_id)
+    vjoy.begin_batch()
+    device.button(1).is_pressed = True
+    device.axis(linear_index=1).value = 0.5
+    monkeypatch.setattr(interface, "UpdateVJD", fail_update)
+    with pytest.raises(VJoyError):
+        vjoy.end_batch()
+    monkeypatch.undo()
+    assert interface.button_state(1, 1) is False
+    assert interface.axis_value(1, axis_id) == initial_value
+
+    # Setting identical values has to submit them again
+    vjoy.begin_batch()
+    device.button(1).is_pressed = True
+    device.axis(linear_index=1).value = 0.5
+    vjoy.end_batch()
+    assert interface.button_state(1, 1) is True
+    assert interface.axis_value(1, axis_id) != initial_value
@@ -0,0 +1,317 @@
+# -*- coding: utf-8; -*-
+
+# Copyright (C) 2015 - 2019 Lionel Ott
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+
+import collections
+import enum
+import os
+import sys
+
+from vjoy.vjoy_report import JoystickPositionV2, ReportBuffer
+
+
+class VJoyState(enum.Enum):
+
+    """Enumeration of the possible VJoy device states.
+
+    Mirrors vjoy_interface.VJoyState as that module cannot be imported
+    without the vJoy dll being present.
+    """
+
+    Owned = 0       # The device is owned by the current application
+    Free = 1        # The device is not owned by any application
+    Bust = 2        # The device is owned by another application
+    Missing = 3     # The device is not present
+    Unknown = 4     # Unknown type of error
+
+
+class MemoryDevice:
+
+    """State of a single simulated vJoy device."""
+
+    def __init__(self, vjoy_id, axis_count, button_count, hat_count):
+        """Creates a new instance.
+
+        :param vjoy_id id of the simulated device
+        :param axis_count number of axes of the device
+        :param button_count number of buttons of the device
+        :param hat_count number of continuous hats of the device
+        """
+        self.vjoy_id = vjoy_id
+        self.axis_ids = set(range(0x30, 0x30 + axis_count))
+        self.button_count = button_count
+        self.hat_count = hat_count
+        self.owner_pid = 0
+        self.reset()
+
+    def reset(self):
+        """Resets all inputs of the device to their neutral state."""
+        self.axes = {axis_id: 0 for axis_id in self.axis_ids}
+        self.buttons = {i: False for i in range(1, self.button_count + 1)}
+        self.hats = {i: -1 for i in range(1, self.hat_count + 1)}
+
+
+class MemoryVJoyInterface:
+
+    """Drop-in replacement for VJoyInterface keeping device state in memory.
+
+    Provides the same functions as the ctypes based interface, which allows
+    running profiles and benchmarks without the vJoy driver being installed.
+    Every call is counted and the resulting device state can be inspected.
+    """
+
+    axis_max = 32767
+    devices = {}
+    call_counts = collections.Counter()
+    reports = []
+    record_reports = False
+
+    @classmethod
+    def configure(cls, vjoy_id, axis_count=8, button_count=128, hat_count=4):
+        """Creates a simulated device.
+
+        :param vjoy_id id of the device to create
+        :param axis_count number of axes of the device
+        :param button_count number of buttons of the device
+        :param hat_count number of continuous hats of the device
+        """
+        cls.devices[vjoy_id] = MemoryDevice(
+            vjoy_id,
+            axis_count,
+            button_count,
+            hat_count
+        )
+
+    @classmethod
+    def reset_state(cls):
+        """Removes all simulated devices and recorded statistics."""
+        cls.devices.clear()
+        cls.call_counts.clear()
+        cls.reports.clear()
+
+    @classmethod
+    def axis_value(cls, vjoy_id, axis_id):
+        """Returns the raw value of an axis.
+
+        :param vjoy_id id of the device
+        :param axis_id usage id of the axis
+        :return raw value of the axis
+        """
+        return cls.devices[vjoy_id].axes[axis_id]
+
+    @classmethod
+    def button_state(cls, vjoy_id, button_id):
+        """Returns the state of a button.
+
+        :param vjoy_id id of the device
+        :param button_id index of the button
+        :return True if the button is pressed, False otherwise
+        """
+        return cls.devices[vjoy_id].buttons[button_id]
+
+    @classmethod
+    def hat_value(cls, vjoy_id, hat_id):
+        """Returns the raw value of a continuous hat.
+
+        :param vjoy_id id of the device
+        :param hat_id index of the hat
+        :return angle in hundredths of a degree, -1 if centered
+        """
+        return cls.devices[vjoy_id].hats[hat_id]
+
+    # General vJoy information
+    @classmethod
+    def vJoyEnabled(cls):
+        cls.call_counts["vJoyEnabled"] += 1
+        return True
+
+    @classmethod
+    def GetvJoyVersion(cls):
+        cls.call_counts["GetvJoyVersion"] += 1
+        return 0x218
+
+    @classmethod
+    def GetvJoyProductString(cls):
+        return "vJoy - Virtual Joystick"
+
+    @classmethod
+    def GetvJoyManufacturerString(cls):
+        return "Shaul Eizikovich"
+
+    @classmethod
+    def GetvJoySerialNumberString(cls):
+        return "2.1.8"
+
+    # Device properties
+    @classmethod
+    def GetVJDButtonNumber(cls, vjoy_id):
+        device = cls.devices.get(vjoy_id)
+        return 0 if device is None else device.button_count
+
+    @classmethod
+    def GetVJDDiscPovNumber(cls, vjoy_id):
+        return 0
+
+    @classmethod
+    def GetVJDContPovNumber(cls, vjoy_id):
+        device = cls.devices.get(vjoy_id)
+        return 0 if device is None else device.hat_count
+
+    @classmethod
+    def GetVJDAxisExist(cls, vjoy_id, axis_id):
+        device = cls.devices.get(vjoy_id)
+        return 1 if device is not None and axis_id in device.axis_ids else 0
+
+    @classmethod
+    def GetVJDAxisMax(cls, vjoy_id, axis_id, value):
+        value._obj.value = cls.axis_max
+        return True
+
+    @classmethod
+    def GetVJDAxisMin(cls, vjoy_id, axis_id, value):
+        value._obj.value = 0
+        return True
+
+    # Device management
+    @classmethod
+    def GetOwnerPid(cls, vjoy_id):
+        device = cls.devices.get(vjoy_id)
+        return 0 if device is None else device.owner_pid
+
+    @classmethod
+    def AcquireVJD(cls, vjoy_id):
+        device = cls.devices.get(vjoy_id)
+        if device is None:
+            return False
+        device.owner_pid = os.getpid()
+        return True
+
+    @classmethod
+    def RelinquishVJD(cls, vjoy_id):
+        device = cls.devices.get(vjoy_id)
+        if device is not None:
+            device.owner_pid = 0
+
+    @classmethod
+    def UpdateVJD(cls, vjoy_id, data):
+        cls.call_counts["UpdateVJD"] += 1
+        device = cls.devices.get(vjoy_id)
+        if device is None:
+            return False
+        report = JoystickPositionV2.from_buffer_copy(data._obj)
+        if cls.record_reports:
+            cls.reports.append(report)
+
+        # Apply the report to the device state
+        for axis_id in device.axis_ids:
+            device.axes[axis_id] = \
+                getattr(report, ReportBuffer.axis_fields[axis_id])
+        for button_id in device.buttons:
+            index, bit = divmod(button_id - 1, 32)
+            field = getattr(report, ReportBuffer.button_fields[index])
+            device.buttons[button_id] = bool(field & (1 << bit))
+        for hat_id in device.hats:
+            value = getattr(report, ReportBuffer.hat_fields[hat_id - 1])
+            device.hats[hat_id] = \
+                -1 if value == ReportBuffer.hat_neutral else value
+        return True
+
+    @classmethod
+    def GetVJDStatus(cls, vjoy_id):
+        device = cls.devices.get(vjoy_id)
+        if device is None:
+            return VJoyState.Missing.value
+        elif device.owner_pid == 0:
+            return VJoyState.Free.value
+        elif device.owner_pid == os.getpid():
+            return VJoyState.Owned.value
+        return VJoyState.Bust.value
+
+    # Reset functions
+    @classmethod
+    def ResetVJD(cls, vjoy_id):
+        device = cls.devices.get(vjoy_id)
+        if device is None:
+            return False
+        device.reset()
+        return True
+
+    @classmethod
+    def ResetAll(cls):
+        for device in cls.devices.values():
+            device.reset()
+
+    @classmethod
+    def ResetButtons(cls, vjoy_id):
+        device = cls.devices.get(vjoy_id)
+        if device is None:
+            return False
+        device.buttons = {i: False for i in device.buttons}
+        return True
+
+    @classmethod
+    def ResetPovs(cls, vjoy_id):
+        device = cls.devices.get(vjoy_id)
+        if device is None:
+            return False
+        device.hats = {i: -1 for i in device.hats}
+        return True
+
+    # Set values
+    @classmethod
+    def SetAxis(cls, value, vjoy_id, axis_id):
+        cls.call_counts["SetAxis"] += 1
+        device = cls.devices.get(vjoy_id)
+        if device is None or axis_id not in device.axis_ids:
+            return False
+        device.axes[axis_id] = value
+        return True
+
+    @classmethod
+    def SetBtn(cls, is_pressed, vjoy_id, button_id):
+        cls.call_counts["SetBtn"] += 1
+        device = cls.devices.get(vjoy_id)
+        if device is None or button_id not in device.buttons:
+            return False
+        device.buttons[button_id] = bool(is_pressed)
+        return True
+
+    @classmethod
+    def SetDiscPov(cls, value, vjoy_id, hat_id):
+        cls.call_counts["SetDiscPov"] += 1
+        return False
+
+    @classmethod
+    def SetContPov(cls, value, vjoy_id, hat_id):
+        cls.call_counts["SetContPov"] += 1
+        device = cls.devices.get(vjoy_id)
+        if device is None or hat_id not in device.hats:
+            return False
+        device.hats[hat_id] = value
+        return True
+
+
+# Name under which vjoy.vjoy expects the interface
+VJoyInterface = MemoryVJoyInterface
+
+
+def install():
+    """Replaces the ctypes based vJoy interface with the in-memory one.
+
+    Has to be called before vjoy.vjoy is imported for the first time.
+    """
+    sys.modules["vjoy.vjoy_interface"] = sys.modules[__name__]
@@ -24,8 +24,10 @@ import time
 import os
 
 from vjoy.vjoy_interface import VJoyState, VJoyInterface
+from vjoy.vjoy_report import ReportBuffer
 from gremlin.error import VJoyError
 import gremlin.common
+import gremlin.scheduler
 import gremlin.spline
 
 
@@ -40,6 +42,54 @@ def _error_string(vid, iid, value):
     return "vjoy: {} input: {} value: {}".format(vid, iid, value)
 
 
+# Per thread record of the devices modified while batching updates
+_batch_state = threading.local()
+
+# Function called with the input type, vJoy id, and input id every time a
+# value is written to a device, used to trace input to output latencies
+output_hook = None
+
+
+def begin_batch():
+    """Starts collecting the changes made to vJoy devices by this thread.
+
+    Until the matching end_batch call, changes are only recorded in the
+    device's report and submitted as a whole once the batch ends. Calls can
+    be nested in which case the outermost batch performs the submission.
+    """
+    if getattr(_batch_state, "depth", 0) == 0:
+        _batch_state.depth = 0
+        _batch_state.devices = set()
+    _batch_state.depth += 1
+
+
+def end_batch():
+    """Ends a batch started with begin_batch and submits all changes.
+
+    Every device modified during the batch is updated with a single call
+    containing its complete state.
+    """
+    depth = getattr(_batch_state, "depth", 0)
+    if depth == 0:
+        return
+    _batch_state.depth = depth - 1
+    if _batch_state.depth > 0:
+        return
+
+    devices = _batch_state.devices
+    _batch_state.devices = None
+    for device in devices:
+        device.submit_report()
+
+
+def _batch_devices():
+    """Returns the set of devices modified in this thread's active batch.
+
+    :return set of modified devices or None if no batch is active
+    """
+    return getattr(_batch_state, "devices", None)
+
+
 class AxisName(enum.Enum):
 
     """Enumeration of the valid axis names."""
@@ -146,6 +196,10 @@ class Axis:
     """Represents an analog axis in vJoy, allows setting the value
     of the axis."""
 
+    # Number of intervals of the lookup table replacing the evaluation of
+    # deadzone and response curve, 0 evaluates both directly
+    lookup_resolution = 0
+
     def __init__(self, vjoy_dev, axis_id):
         """Creates a new object.
 
@@ -157,6 +211,11 @@ class Axis:
         self.axis_id = axis_id
         self._value = 0.0
 
+        # Last raw value submitted to the driver and submission statistics
+        self._submitted_value = None
+        self.write_count = 0
+        self.skip_count = 0
+
         # Retrieve axis minimum and maximum values
         tmp = ctypes.c_ulong()
         VJoyInterface.GetVJDAxisMin(
@@ -175,6 +234,7 @@ class Axis:
 
         self._deadzone_fn = lambda x: deadzone(x, -1.0, -0.0, 0.0, 1.0)
         self._response_curve_fn = lambda x: x
+        self._transform_fn = self._compile_transform()
 
         # If this is not the case our value setter needs to change
         if self._min_value != 0:
@@ -196,6 +256,7 @@ class Axis:
         else:
             logging.getLogger("system").error("Invalid spline type specified")
             self._response_curve_fn = lambda x: x
+        self._transform_fn = self._compile_transform()
 
     def set_deadzone(self, low, center_low, center_high, high):
         """Sets the deadzone for the axis.
@@ -208,6 +269,25 @@ class Axis:
         self._deadzone_fn = lambda x: deadzone(
             x, low, center_low, center_high, high
         )
+        self._transform_fn = self._compile_transform()
+
+    def _compile_transform(self):
+        """Returns the function applying deadzone and response curve.
+
+        Depending on the lookup resolution this is either the composition
+        of both functions or a lookup table approximating it.
+
+        :return function mapping an input value to the axis value
+        """
+        deadzone_fn = self._deadzone_fn
+        response_curve_fn = self._response_curve_fn
+        transform_fn = lambda x: response_curve_fn(deadzone_fn(x))
+        if Axis.lookup_resolution > 0:
+            transform_fn = gremlin.spline.LookupTable(
+                transform_fn,
+                Axis.lookup_resolution
+            )
+        return transform_fn
 
     @property
     def value(self):
@@ -236,21 +316,9 @@ class Axis:
 
         # Normalize value to [-1, 1] and apply response curve and deadzone
         # settings
-        self._value = self._response_curve_fn(
-            self._deadzone_fn(min(1.0, max(-1.0, value)))
-        )
+        self._value = self._transform_fn(min(1.0, max(-1.0, value)))
 
-        if not VJoyInterface.SetAxis(
-                int(self._half_range + self._half_range * self._value),
-                self.vjoy_id,
-                self.axis_id
-        ):
-            raise VJoyError(
-                "Failed setting axis value - {}".format(
-                    _error_string(self.vjoy_id, self.axis_id, self._value)
-                )
-            )
-        self.vjoy_dev.used()
+        self._submit()
 
     def set_absolute_value(self, value):
         """Sets the position of the axis based on a value between [-1, 1].
@@ -272,16 +340,29 @@ class Axis:
         # settings
         self._value = value
 
-        if not VJoyInterface.SetAxis(
-                int(self._half_range + self._half_range * self._value),
-                self.vjoy_id,
-                self.axis_id
-        ):
+        self._submit()
+
+
+    def invalidate_cache(self):
+        """Forces the next value to be submitted to the driver."""
+        self._submitted_value = None
+
+    def _submit(self):
+        """Submits the current value to the driver if it changed."""
+        raw_value = int(self._half_range + self._half_range * self._value)
+        if raw_value == self._submitted_value:
+            self.skip_count += 1
+        elif not self.vjoy_dev.write_axis(self.axis_id, raw_value):
             raise VJoyError(
                 "Failed setting axis value - {}".format(
                     _error_string(self.vjoy_id, self.axis_id, self._value)
                 )
             )
+        else:
+            self._submitted_value = raw_value
+            self.write_count += 1
+            if output_hook is not None:
+                output_hook("Axis", self.vjoy_id, self.axis_id)
         self.vjoy_dev.used()
 
 
@@ -300,6 +381,11 @@ class Button:
         self.button_id = button_id
         self._is_pressed = False
 
+        # Last state submitted to the driver and submission statistics
+        self._submitted_value = None
+        self.write_count = 0
+        self.skip_count = 0
+
     @property
     def is_pressed(self):
         """Returns whether or not the button is pressed.
@@ -318,18 +404,25 @@ class Button:
         assert(isinstance(is_pressed, bool))
         self.vjoy_dev.ensure_ownership()
         self._is_pressed = is_pressed
-        if not VJoyInterface.SetBtn(
-                self._is_pressed,
-                self.vjoy_id,
-                self.button_id
-        ):
+        if self._is_pressed == self._submitted_value:
+            self.skip_count += 1
+        elif not self.vjoy_dev.write_button(self.button_id, self._is_pressed):
             raise VJoyError(
                 "Failed setting button value - {}".format(
                     _error_string(self.vjoy_id, self.button_id, self._is_pressed)
                 )
             )
+        else:
+            self._submitted_value = self._is_pressed
+            self.write_count += 1
+            if output_hook is not None:
+                output_hook("Button", self.vjoy_id, self.button_id)
         self.vjoy_dev.used()
 
+    def invalidate_cache(self):
+        """Forces the next state to be submitted to the driver."""
+        self._submitted_value = None
+
 
 class Hat:
 
@@ -371,6 +464,11 @@ class Hat:
         self._direction = (0, 0)
         self.hat_type = hat_type
 
+        # Last direction submitted to the driver and submission statistics
+        self._submitted_value = None
+        self.write_count = 0
+        self.skip_count = 0
+
     @property
     def direction(self):
         """Returns the current direction of the hat.
@@ -388,7 +486,9 @@ class Hat:
         """
         self.vjoy_dev.ensure_ownership()
 
-        if self.hat_type == HatType.Discrete:
+        if direction == self._submitted_value:
+            self.skip_count += 1
+        elif self.hat_type == HatType.Discrete:
             self._set_discrete_direction(direction)
         elif self.hat_type == HatType.Continuous:
             self._set_continuous_direction(direction)
@@ -398,6 +498,10 @@ class Hat:
             ))
         self.vjoy_dev.used()
 
+    def invalidate_cache(self):
+        """Forces the next direction to be submitted to the driver."""
+        self._submitted_value = None
+
     def _set_discrete_direction(self, direction):
         """Sets the direction of a discrete hat.
 
@@ -421,6 +525,10 @@ class Hat:
                     _error_string(self.vjoy_id, self.axis_id, self._direction)
                 )
             )
+        self._submitted_value = direction
+        self.write_count += 1
+        if output_hook is not None:
+            output_hook("Hat", self.vjoy_id, self.hat_id)
 
     def _set_continuous_direction(self, direction):
         """Sets the direction of a continuous hat.
@@ -435,16 +543,19 @@ class Hat:
             )
 
         self._direction = direction
-        if not VJoyInterface.SetContPov(
-                Hat.to_continuous_direction[direction],
-                self.vjoy_id,
-                self.hat_id
+        if not self.vjoy_dev.write_continuous_hat(
+                self.hat_id,
+                Hat.to_continuous_direction[direction]
         ):
             raise VJoyError(
                 "Failed to set hat direction - {}".format(
                     _error_string(self.vjoy_id, self.axis_id, self._direction)
                 )
             )
+        self._submitted_value = direction
+        self.write_count += 1
+        if output_hook is not None:
+            output_hook("Hat", self.vjoy_id, self.hat_id)
 
 
 class VJoy:
@@ -499,6 +610,9 @@ class VJoy:
         self.vjoy_id = vjoy_id
         self.pid = os.getpid()
 
+        # Complete device state, used to submit batched changes in one go
+        self._report = ReportBuffer(vjoy_id, VJoyInterface)
+
         # Initialize all controls
         self._axis_lookup = {}
         self._axis_names = {}
@@ -508,11 +622,10 @@ class VJoy:
 
         # Timestamp of the last time the device was used
         self._last_active = time.time()
-        self._keep_alive_timer = threading.Timer(
+        self._keep_alive_timer = gremlin.scheduler.Scheduler().schedule(
             VJoy.keep_alive_timeout,
             self._keep_alive
         )
-        self._keep_alive_timer.start()
 
         # Reset all controls
         self.reset()
@@ -540,6 +653,8 @@ class VJoy:
                     "Failed to re-acquire the vJoy device - vid: {}".format(
                         self.vjoy_id
                 ))
+            # The driver state no longer matches what was submitted
+            self.invalidate_caches()
 
     @property
     def axis_count(self):
@@ -716,6 +831,7 @@ class VJoy:
 
         # Restore input states based on what we recorded
         if success:
+            self.invalidate_caches()
             for i in self._axis:
                 self._axis[i].set_absolute_value(axis_states[i])
             for i in self._button:
@@ -727,6 +843,109 @@ class VJoy:
                 "Could not reset vJoy device, are we using it?"
             )
 
+    def invalidate_caches(self):
+        """Forces every input to submit its next value to the driver.
+
+        Needs to be called whenever the driver state may have changed without
+        the input objects being involved.
+        """
+        for axis in self._axis.values():
+            axis.invalidate_cache()
+        for button in self._button.values():
+            button.invalidate_cache()
+        for hat in self._hat.values():
+            hat.invalidate_cache()
+
+    def output_statistics(self):
+        """Returns the number of submitted and skipped writes per input.
+
+        Writes are skipped when the value to set is identical to the one
+        last submitted to the driver.
+
+        :return dictionary with an "axis", "button", and "hat" entry, each
+            mapping input ids to a (written, skipped) tuple
+        """
+        return {
+            "axis": {
+                aid: (axis.write_count, axis.skip_count)
+                for aid, axis in self._axis.items()
+            },
+            "button": {
+                bid: (button.write_count, button.skip_count)
+                for bid, button in self._button.items()
+            },
+            "hat": {
+                hid: (hat.write_count, hat.skip_count)
+                for hid, hat in self._hat.items()
+            }
+        }
+
+    def write_axis(self, axis_id, value):
+        """Sets the raw value of an axis.
+
+        If a batch is active on the calling thread the value is only recorded
+        and submitted when the batch ends.
+
+        :param axis_id the usage id of the axis
+        :param value the raw integer value of the axis
+        :return True if the value was set or recorded, False otherwise
+        """
+        self._report.set_axis(axis_id, value)
+        devices = _batch_devices()
+        if devices is not None:
+            devices.add(self)
+            return True
+        return VJoyInterface.SetAxis(value, self.vjoy_id, axis_id)
+
+    def write_button(self, button_id, is_pressed):
+        """Sets the state of a button.
+
+        If a batch is active on the calling thread the state is only recorded
+        and submitted when the batch ends.
+
+        :param button_id the id of the button
+        :param is_pressed True if the button is pressed, False otherwise
+        :return True if the state was set or recorded, False otherwise
+        """
+        self._report.set_button(button_id, is_pressed)
+        devices = _batch_devices()
+        if devices is not None:
+            devices.add(self)
+            return True
+        return VJoyInterface.SetBtn(is_pressed, self.vjoy_id, button_id)
+
+    def write_continuous_hat(self, hat_id, value):
+        """Sets the raw value of a continuous hat.
+
+        If a batch is active on the calling thread the value is only recorded
+        and submitted when the batch ends.
+
+        :param hat_id the id of the hat
+        :param value the hat angle in hundredths of a degree or -1 if centered
+        :return True if the value was set or recorded, False otherwise
+        """
+        self._report.set_hat(hat_id, value)
+        devices = _batch_devices()
+        if devices is not None:
+            devices.add(self)
+            return True
+        return VJoyInterface.SetContPov(value, self.vjoy_id, hat_id)
+
+    def submit_report(self):
+        """Submits the complete device state in a single update.
+
+        The update is skipped if nothing changed since the last submission.
+        If the update fails the values recorded as submitted by the inputs
+        are discarded, as the driver never received them.
+        """
+        if self.vjoy_id is None:
+            return
+        if not self._report.submit():
+            self.invalidate_caches()
+            raise VJoyError(
+                "Failed updating device state - vid: {}".format(self.vjoy_id)
+            )
+
     def used(self):
         """Updates the timestamp of the last time the device has been used."""
         self._last_active = time.time()
@@ -749,13 +968,11 @@ class VJoy:
         If the device hasn't been used in the last 60 seconds the device will
         be reset to ensure it doesn't time out.
         """
+        if self.vjoy_id is None:
+            return
         if self._last_active + VJoy.keep_alive_timeout < time.time():
             self.reset()
-        self._keep_alive_timer = threading.Timer(
-            VJoy.keep_alive_timeout,
-            self._keep_alive
-        )
-        self._keep_alive_timer.start()
+        self._keep_alive_timer.reschedule(VJoy.keep_alive_timeout)
 
     def _init_axes(self):
         """Retrieves all axes present on the vJoy device and creates their
@@ -0,0 +1,178 @@
+# -*- coding: utf-8; -*-
+
+# Copyright (C) 2015 - 2019 Lionel Ott
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+
+import ctypes
+import threading
+
+
+class JoystickPositionV2(ctypes.Structure):
+
+    """Mapping for the JOYSTICK_POSITION_V2 C structure used by UpdateVJD.
+
+    Fixed width types are used in place of the Windows LONG and DWORD types
+    to keep the layout identical on every platform.
+    """
+
+    _fields_ = [
+        ("bDevice", ctypes.c_uint8),
+        ("wThrottle", ctypes.c_int32),
+        ("wRudder", ctypes.c_int32),
+        ("wAileron", ctypes.c_int32),
+        ("wAxisX", ctypes.c_int32),
+        ("wAxisY", ctypes.c_int32),
+        ("wAxisZ", ctypes.c_int32),
+        ("wAxisXRot", ctypes.c_int32),
+        ("wAxisYRot", ctypes.c_int32),
+        ("wAxisZRot", ctypes.c_int32),
+        ("wSlider", ctypes.c_int32),
+        ("wDial", ctypes.c_int32),
+        ("wWheel", ctypes.c_int32),
+        ("wAxisVX", ctypes.c_int32),
+        ("wAxisVY", ctypes.c_int32),
+        ("wAxisVZ", ctypes.c_int32),
+        ("wAxisVBRX", ctypes.c_int32),
+        ("wAxisVBRY", ctypes.c_int32),
+        ("wAxisVBRZ", ctypes.c_int32),
+        ("lButtons", ctypes.c_int32),
+        ("bHats", ctypes.c_uint32),
+        ("bHatsEx1", ctypes.c_uint32),
+        ("bHatsEx2", ctypes.c_uint32),
+        ("bHatsEx3", ctypes.c_uint32),
+        ("lButtonsEx1", ctypes.c_int32),
+        ("lButtonsEx2", ctypes.c_int32),
+        ("lButtonsEx3", ctypes.c_int32)
+    ]
+
+
+class ReportBuffer:
+
+    """Holds the complete state of a single vJoy device.
+
+    Every change made to the device's inputs is recorded in the buffer which
+    therefore always mirrors the state of the device. This allows submitting
+    a set of changes with a single UpdateVJD call rather than one call per
+    modified input.
+
+    The backend is any object providing an UpdateVJD(vjoy_id, report)
+    function, normally the VJoyInterface class, which allows replacing the
+    driver with an in-memory implementation.
+    """
+
+    # Report field names corresponding to the vJoy axis usage ids
+    axis_fields = {
+        0x30: "wAxisX",
+        0x31: "wAxisY",
+        0x32: "wAxisZ",
+        0x33: "wAxisXRot",
+        0x34: "wAxisYRot",
+        0x35: "wAxisZRot",
+        0x36: "wSlider",
+        0x37: "wDial"
+    }
+
+    # Report field names holding the state of 32 buttons each
+    button_fields = ["lButtons", "lButtonsEx1", "lButtonsEx2", "lButtonsEx3"]
+
+    # Report field names holding the state of each continuous hat
+    hat_fields = ["bHats", "bHatsEx1", "bHatsEx2", "bHatsEx3"]
+
+    # Value representing a centered continuous hat
+    hat_neutral = 0xFFFFFFFF
+
+    def __init__(self, vjoy_id, backend):
+        """Creates a new instance.
+
+        :param vjoy_id id of the vJoy device the report belongs to
+        :param backend object providing the UpdateVJD function
+        """
+        self.vjoy_id = vjoy_id
+        self._backend = backend
+        self._lock = threading.Lock()
+        self._report = JoystickPositionV2()
+        self._report.bDevice = vjoy_id
+        for field in ReportBuffer.hat_fields:
+            setattr(self._report, field, ReportBuffer.hat_neutral)
+        self._buttons = [0] * len(ReportBuffer.button_fields)
+        self._is_dirty = False
+
+    @property
+    def is_dirty(self):
+        """Returns whether or not changes were made since the last submission.
+
+        :return True if there are unsubmitted changes, False otherwise
+        """
+        return self._is_dirty
+
+    def set_axis(self, axis_id, value):
+        """Records the value of an axis.
+
+        :param axis_id the usage id of the axis
+        :param value the integer value of the axis
+        """
+        with self._lock:
+            setattr(self._report, ReportBuffer.axis_fields[axis_id], value)
+            self._is_dirty = True
+
+    def set_button(self, button_id, is_pressed):
+        """Records the state of a button.
+
+        :param button_id the index of the button, starting at 1
+        :param is_pressed True if the button is pressed, False otherwise
+        """
+        index, bit = divmod(button_id - 1, 32)
+        with self._lock:
+            if is_pressed:
+                self._buttons[index] |= 1 << bit
+            else:
+                self._buttons[index] &= ~(1 << bit)
+            setattr(
+                self._report,
+                ReportBuffer.button_fields[index],
+                ctypes.c_int32(self._buttons[index]).value
+            )
+            self._is_dirty = True
+
+    def set_hat(self, hat_id, value):
+        """Records the value of a continuous hat.
+
+        :param hat_id the index of the hat, starting at 1
+        :param value the angle of the hat in hundredths of a degree, or -1
+            if the hat is centered
+        """
+        if value < 0:
+            value = ReportBuffer.hat_neutral
+        with self._lock:
+            setattr(self._report, ReportBuffer.hat_fields[hat_id - 1], value)
+            self._is_dirty = True
+
+    def submit(self):
+        """Sends the complete state to the device if it changed.
+
+        :return True if the submission succeeded or was not needed, False
+            otherwise
+        """
+        with self._lock:
+            if not self._is_dirty:
+                return True
+            # Remains dirty if the update fails, such that the next
+            # submission retries it
+            self._is_dirty = not self._backend.UpdateVJD(
+                self.vjoy_id,
+                ctypes.byref(self._report)
+            )
+            return not self._is_dirty